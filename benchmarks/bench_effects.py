@@ -0,0 +1,90 @@
+"""
+Sing-mode f0/volume tweaks: the per-frame Python loops sing3/sing4 used to run vs the
+vectorized llm_bridge.effects chains.
+
+    python benchmarks/bench_effects.py [--frames 50000] [--repeat 5]
+"""
+import argparse
+import math
+import random
+import sys
+import time
+from pathlib import Path
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root / 'src'))
+
+import numpy as np
+from llm_bridge.effects import SING3_EFFECTS, SING4_EFFECTS, EffectChain, Fade, Portamento
+
+
+def make_query(frames: int) -> dict:
+    rng = random.Random(0)
+    f0 = [0.0 if rng.random() < 0.2 else rng.uniform(200.0, 500.0) for _ in range(frames)]
+    volume = [rng.uniform(0.0, 1.0) for _ in range(frames)]
+    return {"f0": f0, "volume": volume}
+
+
+def loop_sing3(query: dict) -> dict:
+    query["f0"] = [f * 1.2 if f > 0 else 0 for f in query["f0"]]
+    query["volume"] = [v * 0.8 for v in query["volume"]]
+    return query
+
+
+def loop_sing4(query: dict) -> dict:
+    f0 = query.get("f0", [])
+    for i in range(len(f0)):
+        if f0[i] > 0:
+            wobble = 1.0 + 0.01 * math.sin(2 * math.pi * i / 120)
+            f0[i] *= wobble
+    query["f0"] = f0
+    if "volume" in query:
+        query["volume"] = [v * 0.95 for v in query["volume"]]
+    return query
+
+
+def best_of(fn, base: dict, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        query = {"f0": list(base["f0"]), "volume": list(base["volume"])}
+        t0 = time.perf_counter()
+        fn(query)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Benchmark f0/volume effects")
+    p.add_argument("--frames", type=int, default=50000)
+    p.add_argument("--repeat", type=int, default=5)
+    a = p.parse_args(argv)
+
+    base = make_query(a.frames)
+    f0 = np.asarray(base["f0"])
+    volume = np.asarray(base["volume"])
+    cases = [("sing3", loop_sing3, SING3_EFFECTS), ("sing4", loop_sing4, SING4_EFFECTS)]
+    print(f"frames: {a.frames}")
+    for name, loop, chain in cases:
+        expected = loop({"f0": list(base["f0"]), "volume": list(base["volume"])})
+        got = chain.apply({"f0": list(base["f0"]), "volume": list(base["volume"])})
+        for field in ("f0", "volume"):
+            if not np.allclose(got[field], expected[field], rtol=1e-12, atol=0):
+                print(f"MISMATCH: {name} {field} differs from the loop version")
+                return 1
+        t_loop = best_of(loop, base, a.repeat)
+        t_chain = best_of(chain.apply, base, a.repeat)
+        t_arrays = best_of(lambda q: chain.process(f0, volume), base, a.repeat)
+        print(f"{name}: loop {t_loop * 1e3:8.3f} ms | chain (lists) {t_chain * 1e3:8.3f} ms | "
+              f"chain (arrays) {t_arrays * 1e3:7.3f} ms | {t_loop / t_arrays:5.1f}x")
+
+    full = EffectChain(list(SING4_EFFECTS.effects) + [Portamento(8), Fade(in_frames=50, out_frames=100)])
+    t0 = time.perf_counter()
+    for _ in range(a.repeat):
+        full.process(f0, volume)
+    print(f"vibrato+gain+portamento+fade (arrays, no list conversion): "
+          f"{(time.perf_counter() - t0) / a.repeat * 1e3:.3f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
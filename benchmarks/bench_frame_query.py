@@ -0,0 +1,114 @@
+"""
+Frame audio queries on long songs: engine dicts (Python float lists, per-element
+validation, json.dumps) vs the array-backed FrameAudioQuery.
+
+    python benchmarks/bench_frame_query.py [--frames 60000] [--repeat 5]
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root / 'src'))
+
+import numpy as np
+from llm_bridge.frame_query import FrameAudioQuery
+
+
+def make_engine_query(frames: int, frames_per_phoneme: int = 12) -> dict:
+    """Shaped like a /sing_frame_audio_query response."""
+    rng = random.Random(0)
+    phonemes = []
+    left = frames
+    while left > 0:
+        n = min(frames_per_phoneme, left)
+        phonemes.append({"phoneme": rng.choice(["a", "i", "u", "k", "s", "pau"]), "frame_length": n,
+                         "note_id": str(len(phonemes))})
+        left -= n
+    return {
+        "f0": [0.0 if rng.random() < 0.2 else rng.uniform(200.0, 500.0) for _ in range(frames)],
+        "volume": [rng.uniform(0.0, 1.0) for _ in range(frames)],
+        "phonemes": phonemes,
+        "volumeScale": 1.0,
+        "outputSamplingRate": 24000,
+        "outputStereo": False,
+    }
+
+
+def validate_loop(query: dict) -> None:
+    """The per-element validation validate_frame_audio_query used to do."""
+    total_frames = 0
+    for p in query["phonemes"]:
+        if not isinstance(p.get("phoneme"), str) or not isinstance(p.get("frame_length"), int):
+            raise ValueError(p)
+        total_frames += p["frame_length"]
+    if len(query["f0"]) != total_frames or len(query["volume"]) != total_frames:
+        raise ValueError("length")
+    if not all(isinstance(x, (float, int)) for x in query["f0"]):
+        raise ValueError("f0")
+    if not all(isinstance(x, (float, int)) for x in query["volume"]):
+        raise ValueError("volume")
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def traced_bytes(build) -> int:
+    tracemalloc.start()
+    obj = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del obj
+    return size
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Benchmark FrameAudioQuery vs dict queries")
+    p.add_argument("--frames", type=int, default=60000)
+    p.add_argument("--repeat", type=int, default=5)
+    a = p.parse_args(argv)
+
+    raw = json.dumps(make_engine_query(a.frames))
+    as_dict = json.loads(raw)
+    query = FrameAudioQuery.from_dict(as_dict).validate()
+
+    # round trip: to_json() must decode back to the engine dict (at the serialized precision)
+    decoded = json.loads(query.to_json())
+    if decoded["phonemes"] != as_dict["phonemes"] or \
+            not np.allclose(decoded["f0"], as_dict["f0"], atol=1e-3) or \
+            not np.allclose(decoded["volume"], as_dict["volume"], atol=1e-6):
+        print("MISMATCH: FrameAudioQuery.to_json() does not round-trip")
+        return 1
+
+    mem_dict = traced_bytes(lambda: json.loads(raw))
+    mem_query = traced_bytes(lambda: FrameAudioQuery.from_dict(json.loads(raw)))
+    body_dict = len(json.dumps(as_dict).encode())
+    body_query = len(query.to_json())
+
+    t_validate_loop = best_of(lambda: validate_loop(as_dict), a.repeat)
+    t_validate = best_of(query.validate, a.repeat)
+    t_encode_dict = best_of(lambda: json.dumps(as_dict).encode(), a.repeat)
+    t_encode = best_of(query.to_json, a.repeat)
+    t_from_dict = best_of(lambda: FrameAudioQuery.from_dict(as_dict), a.repeat)
+
+    print(f"frames: {a.frames}, phonemes: {len(as_dict['phonemes'])}")
+    print(f"memory   dict {mem_dict / 1e6:8.2f} MB | FrameAudioQuery {mem_query / 1e6:6.2f} MB")
+    print(f"validate loop {t_validate_loop * 1e3:8.3f} ms | vectorized {t_validate * 1e3:8.3f} ms")
+    print(f"encode   json.dumps(dict) {t_encode_dict * 1e3:8.3f} ms ({body_dict / 1e3:.0f} kB) | "
+          f"to_json() {t_encode * 1e3:8.3f} ms ({body_query / 1e3:.0f} kB)")
+    print(f"from_dict {t_from_dict * 1e3:8.3f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
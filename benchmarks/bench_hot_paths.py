@@ -0,0 +1,354 @@
+"""
+Micro-benchmarks for the pure-Python hot paths, on fixed inputs, fully offline.
+
+Reports ops/sec (median of --repeat timeit runs, with their spread) and per-call
+allocations under tracemalloc: peak bytes allocated during one call, and bytes still
+held afterwards (e.g. memo entries). Cases whose optional dependency is missing are
+skipped.
+
+    python benchmarks/bench_hot_paths.py [--repeat 9] [--only roman] [--json out.json]
+    python benchmarks/bench_hot_paths.py --baseline out.json [--tolerance 0.3]
+
+Microsecond timings easily move 20-60% between two runs on the same machine (CPU
+frequency scaling, other processes), mostly for all cases at once. So with --baseline,
+runs of all cases are interleaved, each case's change is taken relative to the median
+change of all cases (the machine-wide drift), and a case is flagged (exit code 1) only
+when that is slower by more than --tolerance or the spread either run measured for it,
+whichever is larger. Baselines are machine specific: save one before a change and
+compare after it on the same machine.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import timeit
+import tracemalloc
+from pathlib import Path
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root / 'src'))
+
+REPLIES = [
+    "HELLO! 今日はどうだった？",
+    "Thank you so much, またね。SEE YOU tomorrow!",
+    "ICE CREAM食べたいな〜 chocolate がいい",
+    "今からGAMEしようよ、OK?",
+    "The CPU is hot... AI も休憩が必要かも",
+    "Good night, sweet dreams. おやすみ！",
+    "コーヒーとTEAどっちが好き？ I like COFFEE.",
+    "ちょっとまってね、すぐ戻るよ！",
+]
+WORDS = ["konnichiwa", "arigatou", "sayonara", "kyou", "shinkansen", "tsukue", "chotto", "hello world"]
+LYRICS = "キラキラ ヒカル ヨゾラノ ホシヨ マバタキシテハ ミンナヲミテル ハローワールド ラララ "
+# Larger than the transliterator memo (4096), so cycling through it measures the real work
+CORPUS_SIZE = 8192
+
+
+def _cycle(items):
+    """Zero-argument callable returning the next item, round robin."""
+    state = {"i": -1}
+    n = len(items)
+
+    def next_item():
+        state["i"] = (state["i"] + 1) % n
+        return items[state["i"]]
+    return next_item
+
+
+def _unique_lines(rng, n: int) -> list:
+    return [f"{rng.choice(REPLIES)} #{i}" for i in range(n)]
+
+
+class UDPSink:
+    """Bound localhost UDP socket drained on a daemon thread; stands in for VRChat's OSC port."""
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.settimeout(0.2)
+        self.port = self.sock.getsockname()[1]
+        self.received = 0
+        self._closed = False
+        threading.Thread(target=self._drain, name="bench-udp-sink", daemon=True).start()
+
+    def _drain(self) -> None:
+        while not self._closed:
+            try:
+                self.sock.recv(65535)
+                self.received += 1
+            except OSError:
+                continue
+
+    def close(self) -> None:
+        self._closed = True
+        self.sock.close()
+
+
+# ---------------------------------------------
+# Cases: setup(rng, cleanup) -> zero-argument callable
+# ---------------------------------------------
+def setup_chunk(rng, cleanup):
+    from osc_chatbox.osc_io import _chunk
+    text = "".join(rng.choice(REPLIES) for _ in range(200))
+    return lambda: list(_chunk(text, 144))
+
+
+def setup_say(rng, cleanup):
+    from osc_chatbox.osc_io import ChatboxClient
+    sink = UDPSink()
+    # no rate limit: measures paging, queueing and the OSC/UDP send until the last page is out
+    client = ChatboxClient(port=sink.port, max_len=144, delay=0.0)
+    cleanup.append(client.close)
+    cleanup.append(sink.close)
+    texts = _cycle([rng.choice(REPLIES) * rng.randint(1, 6) for _ in range(64)])
+    return lambda: client.say(texts()).wait(5)
+
+
+def setup_parse_input(rng, cleanup):
+    from llm_bridge.utils import parse_input
+    markers = ["t:", "T:", "t:h", "ht:", "h", "S", ""]
+    inputs = _cycle([f"{rng.choice(markers)} {' '.join(rng.sample(WORDS, 3))}" for _ in range(1024)])
+    return lambda: parse_input(inputs())
+
+
+def setup_safety_filter(rng, cleanup):
+    from llm_bridge.utils import safety_filter
+    replies = _cycle([" ".join(rng.choice(REPLIES) for _ in range(rng.randint(1, 12))) for _ in range(256)])
+    return lambda: safety_filter(replies())
+
+
+def setup_parse_llm_json(rng, cleanup):
+    from llm_bridge.utils import parse_llm_json_response
+    raws = []
+    for i in range(256):
+        body = json.dumps({"reply": f"{rng.choice(REPLIES)} {i}", "emotion": "happy", "mode": "talk"},
+                          ensure_ascii=False)
+        raws.append(f"```json\n{body}\n```" if i % 2 else body)
+    raws[::16] = [f"not json {i}" for i in range(len(raws[::16]))]   # the plain-text fallback
+    raws = _cycle(raws)
+    return lambda: parse_llm_json_response(raws())
+
+
+def setup_roman_to_kana(rng, cleanup):
+    from llm_bridge.utils import roman_to_kana
+    words = _cycle([f"{rng.choice(WORDS)} {rng.choice(WORDS)}{i}" for i in range(CORPUS_SIZE)])
+    return lambda: roman_to_kana(words())
+
+
+def _score(lyrics: str) -> dict:
+    from llm_bridge.utils import build_voicevox_score
+    return build_voicevox_score(lyrics)
+
+
+def setup_convert_lyrics(rng, cleanup):
+    from llm_bridge.utils import convert_lyrics_to_kana
+    # musicxml_to_voicevox_json output: C4 notes with one-character lyrics
+    score = _score(LYRICS * 2)
+    return lambda: convert_lyrics_to_kana({"notes": [dict(n) for n in score["notes"]]})
+
+
+def setup_musicxml(rng, cleanup):
+    from llm_bridge.utils import text_to_musicxml, musicxml_to_voicevox_json
+    tmp = tempfile.TemporaryDirectory()
+    cleanup.append(tmp.cleanup)
+    path = text_to_musicxml(LYRICS, os.path.join(tmp.name, "bench.musicxml"))
+    return lambda: musicxml_to_voicevox_json(path)
+
+
+def setup_frame_query(rng, cleanup):
+    from llm_bridge.utils import build_frame_audio_query_from_kana
+    return lambda: build_frame_audio_query_from_kana(LYRICS * 4)
+
+
+def setup_validate(rng, cleanup):
+    from llm_bridge.utils import build_frame_audio_query_from_kana, validate_frame_audio_query
+    query = build_frame_audio_query_from_kana(LYRICS * 4)
+    return lambda: validate_frame_audio_query(query)
+
+
+def setup_preprocess(rng, cleanup):
+    from llm_bridge.voicevox_tts import VoiceVoxTTS
+    # _preprocess only uses the shared transliterator: skip __init__ (HTTP pool, cache, warm-up)
+    tts = VoiceVoxTTS.__new__(VoiceVoxTTS)
+    lines = _cycle(_unique_lines(rng, CORPUS_SIZE))
+    return lambda: tts._preprocess(lines())
+
+
+# name -> (setup, modules it needs)
+CASES = {
+    "osc_io._chunk": (setup_chunk, ("pythonosc",)),
+    "ChatboxClient.say": (setup_say, ("pythonosc",)),
+    "parse_input": (setup_parse_input, ()),
+    "safety_filter": (setup_safety_filter, ()),
+    "parse_llm_json_response": (setup_parse_llm_json, ()),
+    "roman_to_kana": (setup_roman_to_kana, ()),
+    "convert_lyrics_to_kana": (setup_convert_lyrics, ("romkan",)),
+    "musicxml_to_voicevox_json": (setup_musicxml, ("music21",)),
+    "build_frame_audio_query_from_kana": (setup_frame_query, ("numpy",)),
+    "validate_frame_audio_query": (setup_validate, ("numpy",)),
+    "VoiceVoxTTS._preprocess": (setup_preprocess, ("requests",)),
+}
+
+
+def missing(modules) -> list:
+    out = []
+    for name in modules:
+        try:
+            __import__(name)
+        except ImportError:
+            out.append(name)
+    return out
+
+
+def calibrate(fn, min_time: float) -> int:
+    """Calls per timing run, so that one run takes >= min_time."""
+    timer = timeit.Timer(fn)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    return number
+
+
+def measure(fns: dict, repeat: int, min_time: float) -> dict:
+    """
+    {name: (median ops/sec, spread, calls per run)}. Runs are interleaved round robin
+    (one run of every case per round), so a machine-wide slowdown hits all cases alike
+    instead of whichever case happened to be running. spread is the interquartile
+    range of the runs / median (robust to a single outlier run).
+    """
+    timers = {name: (timeit.Timer(fn), calibrate(fn, min_time)) for name, fn in fns.items()}
+    rates = {name: [] for name in fns}
+    for _ in range(repeat):
+        for name, (timer, number) in timers.items():
+            rates[name].append(number / timer.timeit(number))
+    out = {}
+    for name, values in rates.items():
+        median = statistics.median(values)
+        q1, _, q3 = statistics.quantiles(values, n=4) if len(values) > 1 else (median, median, median)
+        out[name] = (median, (q3 - q1) / median, timers[name][1])
+    return out
+
+
+def allocations(fn, calls: int) -> tuple:
+    """(max peak bytes of one call, retained bytes per call) under tracemalloc."""
+    tracemalloc.start()
+    try:
+        fn()
+        base = tracemalloc.get_traced_memory()[0]
+        peak = 0
+        for _ in range(calls):
+            start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            fn()
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - start)
+        retained = (tracemalloc.get_traced_memory()[0] - base) / calls
+    finally:
+        tracemalloc.stop()
+    return peak, retained
+
+
+def run_cases(names, repeat: int, min_time: float, alloc_calls: int) -> dict:
+    results, fns, cleanup = {}, {}, []
+    try:
+        for name in names:
+            setup, needs = CASES[name]
+            lacking = missing(needs)
+            if lacking:
+                results[name] = {"skipped": f"missing {', '.join(lacking)}"}
+                continue
+            fn = fns[name] = setup(random.Random(0), cleanup)
+            fn()   # warm caches, lazy imports and compiled regexes outside the measurement
+        timings = measure(fns, repeat, min_time)
+        for name, fn in fns.items():
+            ops, spread, number = timings[name]
+            peak, retained = allocations(fn, min(alloc_calls, number))
+            results[name] = {"ops_per_sec": round(ops, 1), "spread": round(spread, 3),
+                             "us_per_call": round(1e6 / ops, 3), "calls_per_run": number,
+                             "peak_bytes": peak, "retained_bytes": round(retained, 1)}
+    finally:
+        for close in reversed(cleanup):
+            close()
+    return {name: results[name] for name in names}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Names of cases slower than baseline beyond the noise. Each case's speed ratio is
+    divided by the median ratio of all compared cases (the machine-wide drift, when
+    there are at least 3), and flagged below 1 - max(tolerance, either run's spread).
+    """
+    ratios = {}
+    for name, result in results.items():
+        before, now = baseline.get(name, {}).get("ops_per_sec"), result.get("ops_per_sec")
+        if before and now:
+            ratios[name] = now / before
+    if not ratios:
+        print("\nno cases in common with the baseline")
+        return []
+    drift = statistics.median(ratios.values()) if len(ratios) >= 3 else 1.0
+    print(f"\nmachine-wide drift vs baseline: {drift - 1.0:+.1%} (divided out below)")
+    if drift < 1.0 - tolerance:
+        print("  everything is slower: a noisy machine, or a regression in shared code; re-run to tell")
+    regressions = []
+    print(f"{'case':36} {'baseline':>12} {'now':>12} {'change':>8} {'allowed':>8}")
+    for name, ratio in ratios.items():
+        old, result = baseline[name], results[name]
+        allowed = max(tolerance, old.get("spread", 0.0), result["spread"])
+        change = ratio / drift - 1.0
+        flag = ""
+        if change < -allowed:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:36} {old['ops_per_sec']:12,.0f} {result['ops_per_sec']:12,.0f} "
+              f"{change:+7.1%} {-allowed:+7.0%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Micro-benchmarks for the pure-Python hot paths")
+    p.add_argument("--repeat", type=int, default=9, help="timing runs per case (the median is kept)")
+    p.add_argument("--min-time", type=float, default=0.1, help="seconds per timing run")
+    p.add_argument("--alloc-calls", type=int, default=200, help="calls traced for allocations")
+    p.add_argument("--only", action="append", default=[], metavar="TEXT", help="cases whose name contains TEXT")
+    p.add_argument("--json", metavar="PATH", help="write results as JSON")
+    p.add_argument("--baseline", metavar="PATH", help="JSON from an earlier run to compare with")
+    p.add_argument("--tolerance", type=float, default=0.3,
+                   help="allowed slowdown vs baseline after removing drift; widened to the measured spread")
+    a = p.parse_args(argv)
+
+    names = [n for n in CASES if not a.only or any(o.lower() in n.lower() for o in a.only)]
+    if not names:
+        print(f"no case matches {a.only}; cases: {', '.join(CASES)}")
+        return 2
+
+    results = run_cases(names, a.repeat, a.min_time, a.alloc_calls)
+    print(f"{'case':36} {'ops/sec':>12} {'spread':>7} {'us/call':>10} {'peak B':>10} {'retained B':>11}")
+    for name, result in results.items():
+        if "skipped" in result:
+            print(f"{name:36} skipped ({result['skipped']})")
+            continue
+        print(f"{name:36} {result['ops_per_sec']:12,.0f} {result['spread']:7.0%} {result['us_per_call']:10.2f} "
+              f"{result['peak_bytes']:10,} {result['retained_bytes']:11,.1f}")
+
+    if a.json:
+        report = {"python": platform.python_version(), "implementation": platform.python_implementation(),
+                  "machine": platform.machine(), "system": platform.system(), "cases": results}
+        Path(a.json).write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(f"\nwrote {a.json}")
+
+    if a.baseline:
+        baseline = json.loads(Path(a.baseline).read_text(encoding="utf-8"))
+        regressions = compare(results, baseline.get("cases", {}), a.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond the noise: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+Compiled English -> katakana lexicon: build time, file size, heap used after opening,
+and lookup cost (cold mmap probe vs memoized) against a plain dict of the same entries.
+
+    python benchmarks/bench_lexicon.py [--entries 100000] [--lookups 20000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root / 'src'))
+
+from llm_bridge.lexicon import Lexicon, compile_lexicon
+
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+KANA = "アイウエオカキクケコサシスセソタチツテトナニヌネノハヒフヘホマミムメモラリルレロワン"
+
+
+def make_entries(n: int) -> dict:
+    rng = random.Random(0)
+    entries = {}
+    while len(entries) < n:
+        word = "".join(rng.choice(LETTERS) for _ in range(rng.randint(3, 12))).upper()
+        entries[word] = "".join(rng.choice(KANA) for _ in range(rng.randint(2, 8)))
+    return entries
+
+
+def per_call_us(fn, items) -> float:
+    t0 = time.perf_counter()
+    for item in items:
+        fn(item)
+    return (time.perf_counter() - t0) / len(items) * 1e6
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Benchmark the compiled lexicon")
+    p.add_argument("--entries", type=int, default=100000)
+    p.add_argument("--lookups", type=int, default=20000)
+    a = p.parse_args(argv)
+
+    tracemalloc.start()
+    entries = make_entries(a.entries)
+    dict_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    rng = random.Random(1)
+    keys = list(entries)
+    hot = rng.sample(keys, 200)
+    words = [rng.choice(hot) if rng.random() < 0.9 else rng.choice(keys) for _ in range(a.lookups)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "lexicon.bin")
+        t0 = time.perf_counter()
+        compile_lexicon(entries.items(), path)
+        t_build = time.perf_counter() - t0
+
+        tracemalloc.start()
+        lexicon = Lexicon(path)
+        t0 = time.perf_counter()
+        len(lexicon)   # opens the mmap
+        t_open = time.perf_counter() - t0
+        open_bytes, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        for word in hot:
+            if lexicon.get(word.lower()) != entries[word]:
+                print(f"MISMATCH: {word}")
+                return 1
+        cold = Lexicon(path, cache_size=0)
+        print(f"entries: {a.entries}, file {os.path.getsize(path) / 1e6:.1f} MB, build {t_build:.2f} s, "
+              f"open {t_open * 1e3:.3f} ms")
+        print(f"heap     dict {dict_bytes / 1e6:7.2f} MB | lexicon {open_bytes / 1e3:6.1f} kB")
+        print(f"lookup   dict {per_call_us(entries.get, words):6.3f} us | mmap probe "
+              f"{per_call_us(cold.get, words):6.3f} us | memoized {per_call_us(lexicon.get, words):6.3f} us "
+              f"(90% of lookups on 200 hot words)")
+        lexicon.close()
+        cold.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
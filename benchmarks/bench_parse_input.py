@@ -0,0 +1,114 @@
+"""
+Input parsing per chat turn: the old parse_input (writes the global chat_state, and
+chat.py rebuilt a prefix regex every turn) vs the precompiled parse_command.
+Checks that both agree on a generated corpus first.
+
+    python benchmarks/bench_parse_input.py [--inputs 20000] [--repeat 5]
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root / 'src'))
+
+from constants import PREFIX_TO_EMOTION
+from llm_bridge.utils import parse_command
+
+
+class _State:
+    pass
+
+
+def old_parse_input(user_input: str, chat_state) -> None:
+    text = user_input.strip()
+    chat_state.emotion = "neutral"
+    chat_state.call_llm = False
+    cleaned = text
+    llm_match = re.search(r'(^| )([a-zA-Z]?t:|t:[a-zA-Z]?)( |$)', text, re.IGNORECASE)
+    if llm_match:
+        token = llm_match.group(2)
+        chat_state.call_llm = True
+        if token.lower().startswith("t:") and len(token) > 2:
+            letter = token[2].lower()
+            if letter in PREFIX_TO_EMOTION:
+                chat_state.emotion = PREFIX_TO_EMOTION[letter]
+        elif token.lower().endswith("t:") and len(token) > 2:
+            letter = token[0].lower()
+            if letter in PREFIX_TO_EMOTION:
+                chat_state.emotion = PREFIX_TO_EMOTION[letter]
+        cleaned = text.replace(token, "").strip()
+    if not chat_state.call_llm:
+        tokens = cleaned.split()
+        if tokens:
+            if len(tokens[0]) == 1 and tokens[0].lower() in PREFIX_TO_EMOTION:
+                chat_state.emotion = PREFIX_TO_EMOTION[tokens[0].lower()]
+                tokens = tokens[1:]
+            elif len(tokens[-1]) == 1 and tokens[-1].lower() in PREFIX_TO_EMOTION:
+                chat_state.emotion = PREFIX_TO_EMOTION[tokens[-1].lower()]
+                tokens = tokens[:-1]
+            cleaned = " ".join(tokens)
+    chat_state.cleaned_input = cleaned
+
+
+def old_turn(user_input: str, state) -> None:
+    """What chat.py did per turn: parse_input, then a freshly built prefix regex."""
+    old_parse_input(user_input, state)
+    if state.call_llm:
+        re.sub(r'^(t:|[{}])'.format("".join(PREFIX_TO_EMOTION.keys())), "", user_input.strip(), flags=re.IGNORECASE)
+
+
+def make_inputs(n: int) -> list:
+    rng = random.Random(0)
+    words = ["hello", "how", "are", "you", "today", "t", "h", "x", "sing", "me", "a", "song", "こんにちは", "ok"]
+    markers = ["t:", "T:", "t:h", "T:s", "ht:", "At:", "t:z", "h", "S", "q", ""]
+    out = []
+    for _ in range(n):
+        body = " ".join(rng.choice(words) for _ in range(rng.randint(0, 8)))
+        marker = rng.choice(markers)
+        where = rng.random()
+        text = f"{marker} {body}" if where < 0.5 else f"{body} {marker}" if where < 0.8 else body
+        out.append(("  " if rng.random() < 0.1 else "") + text)
+    return out
+
+
+def best_of(fn, items, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for item in items:
+            fn(item)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Benchmark input parsing")
+    p.add_argument("--inputs", type=int, default=20000)
+    p.add_argument("--repeat", type=int, default=5)
+    a = p.parse_args(argv)
+
+    inputs = make_inputs(a.inputs)
+    state = _State()
+    for text in inputs:
+        old_parse_input(text, state)
+        parsed = parse_command(text)
+        if (parsed.call_llm, parsed.emotion, parsed.text) != (state.call_llm, state.emotion, state.cleaned_input):
+            print(f"MISMATCH on {text!r}: {parsed} vs {vars(state)}")
+            return 1
+
+    t_old = best_of(lambda t: old_turn(t, state), inputs, a.repeat)
+    t_parse_old = best_of(lambda t: old_parse_input(t, state), inputs, a.repeat)
+    t_new = best_of(parse_command, inputs, a.repeat)
+    print(f"inputs: {a.inputs} (all parsed identically)")
+    print(f"old parse_input            {a.inputs / t_parse_old / 1e3:8.1f} k/s")
+    print(f"old parse_input + re.sub   {a.inputs / t_old / 1e3:8.1f} k/s   (per chat.py turn)")
+    print(f"parse_command              {a.inputs / t_new / 1e3:8.1f} k/s   ({t_old / t_new:.1f}x per turn)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""
+Sing-mode score building: direct build_voicevox_score vs the MusicXML round trip
+(text_to_musicxml -> musicxml_to_voicevox_json -> convert_lyrics_to_kana).
+
+    python benchmarks/bench_score_builder.py [--chars 400] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root / 'src'))
+
+from llm_bridge.utils import build_voicevox_score, text_to_musicxml, musicxml_to_voicevox_json, convert_lyrics_to_kana
+
+SAMPLE = "キラキラ ヒカル ヨゾラノ ホシヨ マバタキシテハ ミンナヲミテル ハローワールド ラララ "
+
+
+def roundtrip(lyrics: str, path: str) -> dict:
+    musicxml_file = text_to_musicxml(lyrics, path)
+    voicevox_json = musicxml_to_voicevox_json(musicxml_file)
+    return convert_lyrics_to_kana(voicevox_json)
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Benchmark sing score building")
+    p.add_argument("--chars", type=int, default=400, help="lyrics length")
+    p.add_argument("--repeat", type=int, default=5)
+    a = p.parse_args(argv)
+
+    lyrics = (SAMPLE * (a.chars // len(SAMPLE) + 1))[:a.chars]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.musicxml")
+        expected = roundtrip(lyrics, path)
+        direct = build_voicevox_score(lyrics)
+        if direct != expected:
+            print("MISMATCH: direct builder output differs from the MusicXML round trip")
+            return 1
+        t_roundtrip = best_of(lambda: roundtrip(lyrics, path), a.repeat)
+    t_direct = best_of(lambda: build_voicevox_score(lyrics), max(a.repeat, 50))
+
+    notes = len(direct["notes"])
+    print(f"lyrics: {a.chars} chars, {notes} notes")
+    print(f"musicxml round trip: {t_roundtrip * 1e3:10.3f} ms")
+    print(f"build_voicevox_score: {t_direct * 1e3:9.3f} ms")
+    print(f"speedup: {t_roundtrip / t_direct:.0f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+Startup-time budget check for the entry scripts.
+
+Imports each script in a fresh interpreter under `python -X importtime`, reports the
+cumulative import time of the script module, and fails (exit 1) if it exceeds its
+budget or if a heavy dependency got imported eagerly.
+
+    python benchmarks/bench_startup.py [--repeat 3] [--budget chat=150 ...]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+root = Path(__file__).resolve().parents[1]
+
+# entry module -> import budget in ms (cumulative, excluding interpreter startup)
+BUDGETS_MS = {
+    "scripts.send_chatbox": 80,
+    "scripts.chat": 150,
+    "scripts.gui": 250,
+    "scripts.ask_and_send": 2000,   # imports the OpenRouter adapter (openai) directly
+}
+
+# Modules that must only be imported once they are actually used
+HEAVY = ("music21", "romkan", "numpy", "sounddevice", "soundfile", "openai", "huggingface_hub")
+FORBIDDEN = {
+    "scripts.send_chatbox": HEAVY + ("asyncio",),
+    "scripts.chat": HEAVY,
+    "scripts.gui": HEAVY,
+    "scripts.ask_and_send": HEAVY[:5],
+}
+
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure(module: str) -> tuple:
+    """Returns (cumulative ms of `module`, set of top-level modules imported)."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(root / "src"), str(root)]))
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=root, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    cumulative = None
+    imported = set()
+    for line in proc.stderr.splitlines():
+        m = LINE.match(line)
+        if not m:
+            continue
+        name = m.group(4)
+        imported.add(name.split(".")[0])
+        if name == module:
+            cumulative = int(m.group(2)) / 1000
+    return cumulative, imported
+
+
+def can_import(name: str) -> bool:
+    try:
+        __import__(name)
+        return True
+    except Exception:
+        return False
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Check entry-script import time against budgets")
+    p.add_argument("--repeat", type=int, default=3, help="runs per script (best is kept)")
+    p.add_argument("--budget", action="append", default=[], metavar="MODULE=MS",
+                   help="override a budget, e.g. chat=200")
+    a = p.parse_args(argv)
+
+    budgets = dict(BUDGETS_MS)
+    for item in a.budget:
+        name, ms = item.split("=", 1)
+        budgets[name if name.startswith("scripts.") else f"scripts.{name}"] = float(ms)
+
+    failed = False
+    for module, budget in budgets.items():
+        if module == "scripts.gui" and not can_import("tkinter"):
+            print(f"{module:24s} skipped (tkinter not available)")
+            continue
+        try:
+            runs = [measure(module) for _ in range(a.repeat)]
+        except RuntimeError as e:
+            print(f"{module:24s} ERROR {e}")
+            failed = True
+            continue
+        best = min(ms for ms, _ in runs)
+        eager = sorted(set(FORBIDDEN.get(module, ())) & runs[0][1])
+        ok = best <= budget and not eager
+        failed |= not ok
+        note = f"  eager imports: {', '.join(eager)}" if eager else ""
+        print(f"{module:24s} {best:8.1f} ms  (budget {budget:g} ms)  {'OK' if ok else 'FAIL'}{note}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""
+English/romaji -> katakana on chat-sized inputs: the old per-token _preprocess and
+slice-based roman_to_kana vs the precompiled Transliterator (cold and memoized).
+
+    python benchmarks/bench_transliterate.py [--lines 2000] [--repeat 5]
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root / 'src'))
+
+from constants import EN_DICT, ROMAJI_TO_KATAKANA
+from llm_bridge.transliterate import Transliterator
+
+REPLIES = [
+    "HELLO! 今日はどうだった？",
+    "Thank you so much, またね。SEE YOU tomorrow!",
+    "ICE CREAM食べたいな〜 chocolate がいい",
+    "今からGAMEしようよ、OK?",
+    "The CPU is hot... AI も休憩が必要かも",
+    "Good night, sweet dreams. おやすみ！",
+    "コーヒーとTEAどっちが好き？ I like COFFEE.",
+    "ちょっとまってね、すぐ戻るよ！",
+]
+WORDS = ["konnichiwa", "arigatou", "sayonara", "kyou", "shinkansen", "tsukue", "chotto", "hello world"]
+
+
+def old_preprocess(text: str) -> str:
+    result = []
+    for token in text.split():
+        upper_token = token.upper()
+        if upper_token in EN_DICT:
+            result.append(EN_DICT[upper_token])
+        elif token.isascii() and token.isupper():
+            result.append(" ".join([EN_DICT.get(c, f"{c}") for c in upper_token]))
+        else:
+            result.append(token)
+    return " ".join(result)
+
+
+def old_roman_to_kana(text: str) -> str:
+    text = text.lower()
+    kana_text = []
+    i = 0
+    while i < len(text):
+        if i+2 < len(text) and text[i:i+3] in ROMAJI_TO_KATAKANA:
+            kana_text.append(ROMAJI_TO_KATAKANA[text[i:i+3]])
+            i += 3
+        elif i+1 < len(text) and text[i:i+2] in ROMAJI_TO_KATAKANA:
+            kana_text.append(ROMAJI_TO_KATAKANA[text[i:i+2]])
+            i += 2
+        elif text[i] in ROMAJI_TO_KATAKANA:
+            kana_text.append(ROMAJI_TO_KATAKANA[text[i]])
+            i += 1
+        elif text[i] in " ~!,.?":
+            kana_text.append(text[i])
+            i += 1
+        else:
+            kana_text.append("ン")
+            i += 1
+    return "".join(kana_text)
+
+
+def per_call_us(fn, items, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for item in items:
+            fn(item)
+        best = min(best, time.perf_counter() - t0)
+    return best / len(items) * 1e6
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Benchmark the katakana transliterator")
+    p.add_argument("--lines", type=int, default=2000)
+    p.add_argument("--repeat", type=int, default=5)
+    a = p.parse_args(argv)
+
+    rng = random.Random(0)
+    # unique lines, so the memo does not help the "cold" numbers
+    lines = [f"{rng.choice(REPLIES)} #{i}" for i in range(a.lines)]
+    romaji = [f"{rng.choice(WORDS)} {rng.choice(WORDS)}{i}" for i in range(a.lines)]
+
+    t0 = time.perf_counter()
+    Transliterator()
+    print(f"build: {(time.perf_counter() - t0) * 1e3:.2f} ms ({len(EN_DICT)} phrases, {len(ROMAJI_TO_KATAKANA)} romaji)")
+
+    fresh = Transliterator(cache_size=0)   # no memo: every call does the work
+    warm = Transliterator()
+    warm.transliterate_many(lines)
+    warm.transliterate_many(romaji)
+    for text in romaji:
+        if fresh.roman_to_kana(text) != old_roman_to_kana(text):
+            print(f"MISMATCH: roman_to_kana({text!r})")
+            return 1
+
+    print(f"_preprocess   old {per_call_us(old_preprocess, lines, a.repeat):7.2f} us | "
+          f"transliterate {per_call_us(fresh.transliterate, lines, a.repeat):7.2f} us | "
+          f"memoized {per_call_us(warm.transliterate, lines, a.repeat):5.2f} us")
+    print(f"roman_to_kana old {per_call_us(old_roman_to_kana, romaji, a.repeat):7.2f} us | "
+          f"trie regex    {per_call_us(fresh.roman_to_kana, romaji, a.repeat):7.2f} us | "
+          f"memoized {per_call_us(warm.roman_to_kana, romaji, a.repeat):5.2f} us")
+    print("sample:", REPLIES[1], "->", fresh.transliterate(REPLIES[1]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,22 +1,19 @@
+import asyncio
 import os
 import sys
 import threading
-import json
-import re
 from pathlib import Path
 
 root = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(root / 'src'))
 
-from llm_bridge.state import chat_state
+import metrics
 from osc_chatbox.config import SETTINGS
 from osc_chatbox.osc_io import ChatboxClient
-from llm_bridge.openrouter_adapter import OpenRouterClient
-from llm_bridge.hf_adapter import HuggingFaceClient
 from llm_bridge.history import ConversationHistory
-from llm_bridge.utils import parse_input, retry_with_backoff, text_to_musicxml, musicxml_to_voicevox_json, convert_lyrics_to_kana
-from llm_bridge.voicevox_tts import VoiceVoxTTS
-from constants import EMOTION_TO_SPEAKER, PREFIX_TO_EMOTION
+from llm_bridge.pipeline import TurnPipeline
+from llm_bridge.resilience import GuardedLLMClient, breaker_status
+from llm_bridge.response_cache import with_response_cache
 
 # ---------------------------------------------
 # Initialize LLM provider
@@ -24,10 +21,19 @@ from constants import EMOTION_TO_SPEAKER, PREFIX_TO_EMOTION
 def get_llm(provider="none"):
     provider = provider or SETTINGS.llm_provider
     print("DEBUG: Using LLM provider =", provider)
+    # Adapters are imported here so only the selected provider's SDK gets loaded
     if provider.lower() == "openrouter":
+        from llm_bridge.openrouter_adapter import OpenRouterClient
         return OpenRouterClient()
     elif provider.lower() == "huggingface":
+        from llm_bridge.hf_adapter import HuggingFaceClient
         return HuggingFaceClient()
+    elif provider.lower() == "local":
+        # any OpenAI-compatible server (llama.cpp, Ollama, vLLM, ...)
+        from llm_bridge.openrouter_adapter import OpenRouterClient
+        return OpenRouterClient(api_key=os.getenv("LOCAL_LLM_API_KEY", "local"),
+                                model=os.getenv("LOCAL_LLM_MODEL"),
+                                base_url=os.getenv("LOCAL_LLM_BASE_URL", "http://127.0.0.1:11434/v1"))
     else:
         raise ValueError(f"Unknown LLM_PROVIDER: {provider}")
 
@@ -35,9 +41,49 @@ def get_llm(provider="none"):
 # ---------------------------------------------
 # Main interactive chat loop
 # ---------------------------------------------
+def _read_lines(loop, lines: asyncio.Queue) -> None:
+    # input() blocks, so it runs on its own daemon thread; None marks end of input
+    while True:
+        try:
+            line = input("You: ")
+        except EOFError:
+            line = None
+        loop.call_soon_threadsafe(lines.put_nowait, line)
+        if line is None:
+            return
+
+
+async def chat(pipeline: TurnPipeline) -> None:
+    await pipeline.start()
+    lines = asyncio.Queue()
+    threading.Thread(target=_read_lines, args=(asyncio.get_running_loop(), lines), daemon=True).start()
+    print("Interactive chat, Ctrl+C to exit.")
+    try:
+        while True:
+            user_input = await lines.get()
+            if user_input is None:
+                return
+            user_input = user_input.strip()
+            if user_input:
+                # a new message supersedes the turn still in flight
+                await pipeline.submit(user_input)
+    finally:
+        await pipeline.stop()
+
+
 def main():
+    # METRICS=1 / METRICS_PORT=9464 (Prometheus text at /metrics), see src/metrics.py
+    metrics.start_from_env()
     history = ConversationHistory()
-    llm = get_llm(provider=SETTINGS.llm_provider)
+    # Each provider behind its own circuit breaker and adaptive timeout
+    llm = GuardedLLMClient(get_llm(provider=SETTINGS.llm_provider), name=SETTINGS.llm_provider)
+    # LLM_HEDGE_PROVIDERS=huggingface,local: fire these too when the primary is slow to answer
+    hedge = [p.strip() for p in os.getenv("LLM_HEDGE_PROVIDERS", "").split(",") if p.strip()]
+    hedged = None
+    if hedge:
+        from llm_bridge.hedged import HedgedLLMClient
+        llm = hedged = HedgedLLMClient(llm, [GuardedLLMClient(get_llm(p), name=p) for p in hedge])
+    llm = with_response_cache(llm)
     osc = ChatboxClient(
         host=SETTINGS.vrchat_ip,
         port=SETTINGS.osc_in_port,
@@ -46,87 +92,35 @@ def main():
     )
 
     # Initialize TTS (Shikoku Metan)
-    tts = VoiceVoxTTS() if SETTINGS.enable_tts else None
-
-    print("Interactive chat, Ctrl+C to exit.")
-    while True:
-        try:
-            user_input = input("You: ").strip()
-            if not user_input:
-               continue
-            
-            parse_input(user_input)
-
-            if chat_state.call_llm:
-                def call():
-                    cleaned_input = re.sub(r'^(t:|[{}])'.format("".join(PREFIX_TO_EMOTION.keys())), "", user_input.strip(), flags=re.IGNORECASE).strip()
-                    return llm.complete(cleaned_input, history=history)
-                
-                
-                raw_response = retry_with_backoff(call)
-
-                # --------------------------
-                # Normalize the response
-                # --------------------------
-                response_data = {"reply": "", "emotion": "neutral"}
-                if isinstance(raw_response, dict):
-                    response_data.update(raw_response)
-                elif isinstance(raw_response, str):
-                    # Strip ```json ... ``` code fences
-                    cleaned = re.sub(r"^```[a-zA-Z]*\n|```$", "", raw_response.strip(), flags=re.DOTALL)
-                    try:
-                        parsed = json.loads(cleaned)
-                        if isinstance(parsed, dict):
-                            response_data.update(parsed)
-                        else:
-                            response_data["reply"] = str(parsed)
-                    except json.JSONDecodeError:
-                        response_data["reply"] = cleaned
-                else:
-                    response_data["reply"] = str(raw_response)
-            
-            else:
-                    response_data = {"reply": chat_state.cleaned_input,"emotion": chat_state.emotion,"mode": "talk"}
-
-            # Extract message and emotion, map to TTS speaker number
-            message = response_data.get("reply", "").strip() or user_input
-            raw_emotion = response_data.get("emotion", "neutral").lower()
-            emotion_speaker = EMOTION_TO_SPEAKER.get(raw_emotion, EMOTION_TO_SPEAKER["neutral"])
-            history.add_turn(user_input, message)
-
-            # Print and send to VRChat
-            osc.typing(True)
-            osc.say(message)
-            osc.typing(False)
-
-            mode = response_data.get("mode", "talk") 
-            print(f"Bot [{raw_emotion}] [{mode}]: {message}")
-
-            # TTS with detected emotion
-            if tts and message:
-                if mode == "sing":
-                    # Convert bot reply to temporary ABC + MusicXML
-                    musicxml_path = "temp.musicxml"
-                    lyrics = response_data.get("lyrics", "") 
-                    musicxml_file = text_to_musicxml(lyrics, musicxml_path)
-                    voicevox_json = musicxml_to_voicevox_json(musicxml_file)
-                    voicevox_json = convert_lyrics_to_kana(voicevox_json)
-                    threading.Thread(
-                        target=tts.sing,
-                        args=(voicevox_json, lyrics, emotion_speaker),  # use emotion_speaker like talk
-                        daemon=True
-                    ).start()
-                elif mode == "talk":
-                    threading.Thread(
-                        target=tts.speak_with_emotion,
-                        args=(message, emotion_speaker),  # pass speaker number
-                        daemon=True
-                    ).start()
-
-        except KeyboardInterrupt:
-            print("\nExiting")
-            sys.exit(0)
-
+    tts = None
+    if SETTINGS.enable_tts:
+        from llm_bridge.voicevox_tts import VoiceVoxTTS
+        tts = VoiceVoxTTS()
+
+    # parse -> LLM -> safety -> chatbox -> TTS synth -> playback, see llm_bridge.pipeline
+    pipeline = TurnPipeline(llm, history, osc, tts, debug=SETTINGS.debug)
+    try:
+        asyncio.run(chat(pipeline))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if tts is not None:
+            tts.close()
+        # send the pages of the last reply that are still queued
+        osc.close(timeout=2)
+    print("\nExiting")
+    if SETTINGS.debug:
+        from llm_bridge.utils import PROMPT_METRICS
+        print("Pipeline:", pipeline.stats())
+        print("Prompt tokens:", PROMPT_METRICS.stats())
+        if hasattr(llm, "stats"):
+            print("LLM cache:", llm.stats())
+        if hedged:
+            print("LLM hedging:", hedged.stats())
+        print("LLM breakers:", breaker_status())
+    if metrics.enabled():
+        print("Spans:", metrics.summary())
+    sys.exit(0)
 
 if __name__ == "__main__":
     main()
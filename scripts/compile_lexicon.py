@@ -0,0 +1,29 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root / 'src'))
+
+from llm_bridge.lexicon import Lexicon, compile_lexicon, read_source
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile an English -> katakana text lexicon for EN_LEXICON_PATH.")
+    parser.add_argument("source", nargs="+", help="Text lexicon(s): 'WORD<TAB>カタカナ' or 'WORD カタカナ' per line; later files win.")
+    parser.add_argument("-o", "--output", required=True, help="Compiled lexicon file to write.")
+    parser.add_argument("--check", nargs="*", default=[], help="Words to look up in the compiled file.")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    entries = (entry for path in args.source for entry in read_source(path))
+    count = compile_lexicon(entries, args.output)
+    print(f"{count} entries -> {args.output} ({Path(args.output).stat().st_size / 1e6:.1f} MB, "
+          f"{time.perf_counter() - t0:.2f}s)")
+
+    lexicon = Lexicon(args.output)
+    for word in args.check:
+        print(f"  {word} -> {lexicon.get(word)}")
+    lexicon.close()
+
+if __name__ == "__main__": main()
@@ -4,19 +4,22 @@ root=Path(__file__).resolve().parents[1]; sys.path.insert(0,str(root/'src'))
 import tkinter as tk
 from tkinter import ttk
 from tkinter.scrolledtext import ScrolledText
+import metrics
 from osc_chatbox.config import SETTINGS
 from osc_chatbox.osc_io import ChatboxClient
-from llm_bridge.openrouter_adapter import OpenRouterClient
-from llm_bridge.hf_adapter import HuggingFaceClient
 from llm_bridge.history import ConversationHistory
+from llm_bridge.resilience import GuardedLLMClient, breaker_status
+from llm_bridge.response_cache import with_response_cache
 from llm_bridge.utils import retry_with_backoff,safety_filter
-from llm_bridge.tts import TTSClient
 
 def get_llm(provider="none"):
     provider=(provider or SETTINGS.llm_provider).lower()
-    if provider=="openrouter": return OpenRouterClient()
-    elif provider=="huggingface": return HuggingFaceClient()
+    if provider=="openrouter":
+        from llm_bridge.openrouter_adapter import OpenRouterClient; client=OpenRouterClient()
+    elif provider=="huggingface":
+        from llm_bridge.hf_adapter import HuggingFaceClient; client=HuggingFaceClient()
     else: raise ValueError(f"Unknown LLM_PROVIDER: {provider}")
+    return with_response_cache(GuardedLLMClient(client,name=provider))
 
 class App(tk.Tk):
     def __init__(self):
@@ -33,13 +36,19 @@ class App(tk.Tk):
         self.log=ScrolledText(self,width=100,height=26,state=tk.DISABLED); self.log.pack(fill=tk.BOTH,expand=True,padx=8,pady=6)
         self.h=ConversationHistory(); self.llm=get_llm(self.provider_var.get())
         self.osc=ChatboxClient(host=SETTINGS.vrchat_ip,port=SETTINGS.osc_in_port,max_len=SETTINGS.chatbox_max_len,debug=SETTINGS.debug)
-        self.tts=TTSClient() if self.tts_var.get() else None
+        self.tts=self._make_tts() if self.tts_var.get() else None
         def on_provider_change(*_):
             try:
                 self.llm=get_llm(self.provider_var.get()); self.append("[system] Switched provider to: "+self.provider_var.get())
             except Exception as e:
                 self.append("[error] "+str(e))
         self.provider_var.trace_add("write", on_provider_change)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+    def on_close(self):
+        if self.tts is not None: self.tts.close()
+        self.osc.close(timeout=2); self.destroy()
+    def _make_tts(self):
+        from llm_bridge.tts import TTSClient; return TTSClient()
     def append(self,text):
         self.log.configure(state=tk.NORMAL); self.log.insert(tk.END,text+"\n"); self.log.configure(state=tk.DISABLED); self.log.see(tk.END)
     def on_send_return(self,event): self.on_send()
@@ -49,16 +58,20 @@ class App(tk.Tk):
         self.prompt.delete(0,tk.END); self.append("You: "+q)
         threading.Thread(target=self._llm_call_and_send,args=(q,),daemon=True).start()
     def _llm_call_and_send(self,q):
+        with metrics.trace(): self._llm_turn(q)
+    def _llm_turn(self,q):
         def call(): return self.llm.complete(q,history=self.h)
         try: r=retry_with_backoff(call)
         except Exception as e:
-            self.append("[error] LLM call failed: "+str(e)); return
+            self.append("[error] LLM call failed: "+str(e))
+            self.append("[system] Breakers: "+", ".join(f"{n}={b['state']}" for n,b in breaker_status().items())); return
         safe=safety_filter(r); self.h.add_turn(q,safe); self.append("Bot: "+safe)
         try:
-            self.osc.typing(True); self.osc.say(safe)
+            self.osc.typing(True); self.osc.say(safe, replace=True)
         finally:
             self.osc.typing(False)
         if self.tts_var.get():
-            if self.tts is None: self.tts=TTSClient()
+            if self.tts is None: self.tts=self._make_tts()
             self.tts.speak(safe)
-if __name__=="__main__": App().mainloop()
+if __name__=="__main__":
+    metrics.start_from_env(); App().mainloop()
@@ -10,5 +10,5 @@ def main(argv=None):
     try:
         client.typing(True); client.say(args.say, press_enter=True)
     finally:
-        client.typing(False)
+        client.typing(False); client.close()
 if __name__ == "__main__": main()
@@ -98,6 +98,11 @@ PREFIX_TO_EMOTION = {
     "y": "crying"
 }
 
+# Style used for /sing_frame_audio_query: the engine's singing-teacher model, which turns a
+# score into phonemes/f0/volume. The voice itself comes from the SINGING_SPEAKERS style
+# passed to /frame_synthesis.
+SING_TEACHER_SPEAKER = 6000
+
 SINGING_SPEAKERS = {
     "shikoku_metan": [3002, 3000, 3006, 3004, 3037],
     "zunda_mon": [3003, 3001, 3007, 3005, 3038, 3075, 3076],
@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+class AudioCache:
+    """
+    Content-addressed cache of synthesized audio, in front of VOICEVOX.
+
+    Keys are sha256 hashes of (kind, preprocessed kana or score, speaker/style id, query
+    params), see make_key(). Two tiers:
+      - memory: LRU of decoded float32 arrays, bounded by total array bytes
+      - disk (optional): one 16-bit FLAC per key in `disk_dir`, evicted oldest-used
+        first once the directory exceeds `disk_bytes`
+    A memory hit skips both HTTP round-trips and the WAV decode.
+    """
+    def __init__(self, memory_bytes: int = 64 * 1024 * 1024, disk_dir: str = None,
+                 disk_bytes: int = 256 * 1024 * 1024):
+        self.memory_bytes = memory_bytes
+        self.disk_dir = disk_dir
+        self.disk_bytes = disk_bytes
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()   # key -> (data, samplerate)
+        self._memory_used = 0
+        self._disk = OrderedDict()     # key -> file size, oldest-used first
+        self._disk_used = 0
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._load_disk_index()
+
+    @classmethod
+    def from_env(cls) -> "AudioCache":
+        """VOICEVOX_CACHE_MB (memory, default 64), VOICEVOX_CACHE_DIR + VOICEVOX_DISK_CACHE_MB (disk, default 256)."""
+        return cls(memory_bytes=int(float(os.getenv("VOICEVOX_CACHE_MB", "64")) * 1024 * 1024),
+                   disk_dir=os.getenv("VOICEVOX_CACHE_DIR") or None,
+                   disk_bytes=int(float(os.getenv("VOICEVOX_DISK_CACHE_MB", "256")) * 1024 * 1024))
+
+    @staticmethod
+    def make_key(kind: str, content, speaker: int, params: dict = None) -> str:
+        payload = json.dumps([kind, content, speaker, params or {}], sort_keys=True,
+                             ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    # ------------------------
+    # Lookup / store
+    # ------------------------
+    def get(self, key: str):
+        """Return (data, samplerate) or None. Returned arrays are read-only."""
+        with self._lock:
+            hit = self._memory.get(key)
+            if hit is not None:
+                self._memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return hit
+            on_disk = key in self._disk
+        if on_disk:
+            import soundfile as sf
+            try:
+                data, samplerate = sf.read(self._path(key), dtype="float32", always_2d=True)
+            except (RuntimeError, OSError):
+                with self._lock:
+                    self._forget_disk(key)
+            else:
+                try:
+                    os.utime(self._path(key))
+                except OSError:
+                    pass   # evicted by another thread since the read; the data is still good
+                with self._lock:
+                    if key in self._disk:
+                        self._disk.move_to_end(key)
+                    self.counters["disk_hits"] += 1
+                    return self._remember(key, data, samplerate)
+        with self._lock:
+            self.counters["misses"] += 1
+        return None
+
+    def put(self, key: str, data, samplerate: int):
+        """Store decoded audio; returns the (read-only) cached (data, samplerate)."""
+        import numpy as np
+        data = np.ascontiguousarray(data, dtype=np.float32)
+        with self._lock:
+            self.counters["stores"] += 1
+            entry = self._remember(key, data, samplerate)
+            write_disk = self.disk_dir is not None and key not in self._disk
+        if write_disk:
+            self._write_disk(key, data, samplerate)
+        return entry
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+            lookups = counters["memory_hits"] + counters["disk_hits"] + counters["misses"]
+            counters.update({
+                "hit_ratio": (counters["memory_hits"] + counters["disk_hits"]) / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_used,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_used,
+            })
+        return counters
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._memory_used = 0
+            for key in list(self._disk):
+                self._forget_disk(key)
+
+    # ------------------------
+    # Memory tier (call with lock held)
+    # ------------------------
+    def _remember(self, key: str, data, samplerate: int):
+        data.flags.writeable = False
+        entry = (data, samplerate)
+        if data.nbytes > self.memory_bytes:
+            return entry
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_used -= old[0].nbytes
+        self._memory[key] = entry
+        self._memory_used += data.nbytes
+        while self._memory_used > self.memory_bytes:
+            _, (evicted, _) = self._memory.popitem(last=False)
+            self._memory_used -= evicted.nbytes
+            self.counters["evictions"] += 1
+        return entry
+
+    # ------------------------
+    # Disk tier
+    # ------------------------
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.flac")
+
+    def _load_disk_index(self) -> None:
+        files = []
+        for name in os.listdir(self.disk_dir):
+            if name.endswith(".flac"):
+                st = os.stat(os.path.join(self.disk_dir, name))
+                files.append((st.st_mtime, name[:-5], st.st_size))
+        for _, key, size in sorted(files):
+            self._disk[key] = size
+            self._disk_used += size
+
+    def _write_disk(self, key: str, data, samplerate: int) -> None:
+        import soundfile as sf
+        path = self._path(key)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            sf.write(tmp, data, samplerate, format="FLAC", subtype="PCM_16")
+            os.replace(tmp, path)
+            size = os.path.getsize(path)
+        except (RuntimeError, OSError) as e:
+            print(f"[cache] could not write {path}: {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        with self._lock:
+            # another thread may have stored the same key meanwhile; count the file once
+            self._disk_used += size - self._disk.pop(key, 0)
+            self._disk[key] = size
+            while self._disk_used > self.disk_bytes and len(self._disk) > 1:
+                oldest = next(iter(self._disk))
+                self._forget_disk(oldest)
+                self.counters["evictions"] += 1
+
+    def _forget_disk(self, key: str) -> None:
+        size = self._disk.pop(key, 0)
+        self._disk_used -= size
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
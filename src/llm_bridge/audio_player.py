@@ -0,0 +1,158 @@
+import threading
+from collections import deque
+import numpy as np
+import sounddevice as sd
+import metrics
+
+
+class PlaybackHandle:
+    """One queued buffer. wait() blocks until it finished playing or was cancelled."""
+    def __init__(self, frames: int, samplerate: int):
+        self.frames = frames
+        self.samplerate = samplerate
+        self.cancelled = False
+        self._done = threading.Event()
+
+    @property
+    def duration(self) -> float:
+        return self.frames / self.samplerate
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout=None) -> bool:
+        return self._done.wait(timeout)
+
+
+class _Buffer:
+    __slots__ = ("handle", "data", "pos")
+
+    def __init__(self, handle: PlaybackHandle, data):
+        self.handle = handle
+        self.data = data
+        self.pos = 0
+
+
+class AudioPlayer:
+    """
+    Long-lived output stream for one device.
+
+    Device info is queried once; buffers are queued and copied straight into the
+    PortAudio callback's output block (mono is broadcast, other layouts are mapped
+    column by column), so playing a clip neither reopens the device nor allocates a
+    fanned-out copy. flush() drops everything queued, so a new reply can barge in.
+    The stream is only reopened when a buffer arrives at a different samplerate.
+    """
+    def __init__(self, device=None, latency="low"):
+        self.device = device
+        self.latency = latency
+        dev_info = sd.query_devices(device, "output")
+        self.channels = dev_info["max_output_channels"]
+        if self.channels == 0:
+            raise ValueError(f"Device {device} has 0 output channels!")
+        self.samplerate = None
+        self._stream = None
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._open_lock = threading.Lock()
+        self._maps = {}
+        self.underruns = 0
+        self.played = 0
+
+    # ------------------------
+    # Public API
+    # ------------------------
+    def play(self, data, samplerate: int, flush: bool = False) -> PlaybackHandle:
+        """Queue a (frames, channels) or (frames,) float32 buffer. Returns immediately."""
+        data = np.asarray(data, dtype=np.float32)
+        if data.ndim == 1:
+            data = data[:, np.newaxis]
+        samplerate = int(samplerate)
+        handle = PlaybackHandle(len(data), samplerate)
+        if flush:
+            self.flush()
+        with self._open_lock:
+            if samplerate != self.samplerate:
+                self._reopen(samplerate)
+        with self._lock:
+            self._queue.append(_Buffer(handle, data))
+        return handle
+
+    def flush(self) -> int:
+        """Cancel everything queued or playing. Returns the number of buffers dropped."""
+        with self._lock:
+            dropped = list(self._queue)
+            self._queue.clear()
+        for buf in dropped:
+            buf.handle.cancelled = True
+            buf.handle._done.set()
+        return len(dropped)
+
+    def pending_seconds(self) -> float:
+        with self._lock:
+            return sum((len(b.data) - b.pos) / b.handle.samplerate for b in self._queue)
+
+    def stats(self) -> dict:
+        with self._lock:
+            queued = len(self._queue)
+        return {"device": self.device, "channels": self.channels, "samplerate": self.samplerate,
+                "queued": queued, "played": self.played, "underruns": self.underruns}
+
+    def close(self) -> None:
+        self.flush()
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+    # ------------------------
+    # Stream management
+    # ------------------------
+    def _reopen(self, samplerate: int) -> None:
+        # Let what is already queued at the old rate finish first
+        with self._lock:
+            tail = self._queue[-1].handle if self._queue else None
+        if tail is not None:
+            tail.wait()
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+        with metrics.span("audio_device_open_seconds", device=self.device):
+            self._stream = sd.OutputStream(samplerate=samplerate, channels=self.channels, dtype="float32",
+                                           device=self.device, latency=self.latency, callback=self._callback)
+            self.samplerate = samplerate
+            self._stream.start()
+
+    def _channel_map(self, src_channels: int):
+        # Same layout as the old np.tile/np.hstack fan-out: output column i <- source column i % n
+        mapping = self._maps.get(src_channels)
+        if mapping is None:
+            mapping = self._maps[src_channels] = [i % src_channels for i in range(self.channels)]
+        return mapping
+
+    def _callback(self, outdata, frames, time_info, status) -> None:
+        if status.output_underflow:
+            self.underruns += 1
+        filled = 0
+        finished = []
+        with self._lock:
+            while filled < frames and self._queue:
+                buf = self._queue[0]
+                n = min(frames - filled, len(buf.data) - buf.pos)
+                chunk = buf.data[buf.pos:buf.pos + n]
+                src_channels = chunk.shape[1]
+                if src_channels == 1 or src_channels == self.channels:
+                    outdata[filled:filled + n] = chunk
+                else:
+                    for out_ch, src_ch in enumerate(self._channel_map(src_channels)):
+                        outdata[filled:filled + n, out_ch] = chunk[:, src_ch]
+                buf.pos += n
+                filled += n
+                if buf.pos >= len(buf.data):
+                    self._queue.popleft()
+                    finished.append(buf.handle)
+        if filled < frames:
+            outdata[filled:] = 0
+        for handle in finished:
+            self.played += 1
+            handle._done.set()
@@ -1,6 +1,25 @@
+import json
 from abc import ABC, abstractmethod
 
+def fallback_answer(prompt: str) -> dict:
+    """What the adapters answer when the provider fails: the user input echoed back."""
+    return {"reply": prompt, "emotion": "neutral", "mode": "talk"}
+
+def is_fallback(answer, prompt: str) -> bool:
+    """True for fallback_answer(prompt), either as a dict or as the JSON text stream() yields."""
+    if isinstance(answer, str):
+        return answer == json.dumps(fallback_answer(prompt), ensure_ascii=False)
+    return isinstance(answer, dict) and answer == fallback_answer(prompt)
+
 class LLMClient(ABC):
     @abstractmethod
     def complete(self, prompt: str, history=None) -> str:
         raise NotImplementedError
+
+    def stream(self, prompt: str, history=None):
+        """
+        Yield the raw answer text in pieces as it is generated.
+        Default: one piece, the JSON of complete(); adapters override with real streaming.
+        """
+        result = self.complete(prompt, history=history)
+        yield result if isinstance(result, str) else json.dumps(result, ensure_ascii=False)
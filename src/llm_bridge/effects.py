@@ -0,0 +1,130 @@
+from dataclasses import dataclass
+import numpy as np
+
+# VOICEVOX frame queries run at 24000 Hz / 256 samples = 93.75 frames per second
+FRAME_RATE = 93.75
+
+
+class Effect:
+    """One step of an EffectChain. process() gets and returns float64 (f0, volume) arrays."""
+    def process(self, f0: np.ndarray, volume: np.ndarray):
+        raise NotImplementedError
+
+
+@dataclass(frozen=True)
+class Vibrato(Effect):
+    """f0 *= 1 + depth * sin(2*pi*i / period) on voiced frames (i = frame index)."""
+    depth: float = 0.01
+    period: float = 120.0
+
+    def process(self, f0, volume):
+        wobble = 1.0 + self.depth * np.sin((2 * np.pi / self.period) * np.arange(len(f0)))
+        return np.where(f0 > 0, f0 * wobble, f0), volume
+
+
+@dataclass(frozen=True)
+class PitchShift(Effect):
+    """Scale voiced f0 by `ratio` (or by `semitones`, if given). Unvoiced frames become 0."""
+    ratio: float = 1.0
+    semitones: float = None
+
+    def process(self, f0, volume):
+        ratio = 2.0 ** (self.semitones / 12) if self.semitones is not None else self.ratio
+        return np.where(f0 > 0, f0 * ratio, 0.0), volume
+
+
+@dataclass(frozen=True)
+class Gain(Effect):
+    """volume *= factor"""
+    factor: float = 1.0
+
+    def process(self, f0, volume):
+        return f0, volume * self.factor
+
+
+@dataclass(frozen=True)
+class Fade(Effect):
+    """Linear volume ramp over the first `in_frames` and last `out_frames` frames."""
+    in_frames: int = 0
+    out_frames: int = 0
+
+    def process(self, f0, volume):
+        n = len(volume)
+        envelope = np.ones(n)
+        if self.in_frames > 0:
+            k = min(self.in_frames, n)
+            envelope[:k] = np.arange(k) / self.in_frames
+        if self.out_frames > 0:
+            k = min(self.out_frames, n)
+            envelope[n - k:] *= np.arange(k, 0, -1) / self.out_frames
+        return f0, volume * envelope
+
+
+@dataclass(frozen=True)
+class Portamento(Effect):
+    """
+    Glide between notes: moving average of log-f0 over `frames` voiced frames.
+    Unvoiced frames are skipped (and stay 0), so the glide spans consonant gaps.
+    """
+    frames: int = 8
+
+    def process(self, f0, volume):
+        voiced = f0 > 0
+        if self.frames <= 1 or voiced.sum() < 2:
+            return f0, volume
+        log_f0 = np.log(f0[voiced])
+        half = self.frames // 2
+        padded = np.pad(log_f0, (half, self.frames - 1 - half), mode="edge")
+        csum = np.concatenate(([0.0], np.cumsum(padded)))
+        smoothed = (csum[self.frames:] - csum[:-self.frames]) / self.frames
+        out = f0.copy()
+        out[voiced] = np.exp(smoothed)
+        return out, volume
+
+
+class EffectChain:
+    """
+    Ordered list of effects applied to a frame audio query's f0/volume.
+    Each effect is one vectorized pass over the whole song.
+    """
+    def __init__(self, effects=()):
+        self.effects = tuple(effects)
+
+    def __bool__(self) -> bool:
+        return bool(self.effects)
+
+    def __repr__(self) -> str:
+        return f"EffectChain({list(self.effects)!r})"
+
+    def describe(self) -> list:
+        """Stable description of the chain, e.g. for cache keys."""
+        return [repr(e) for e in self.effects]
+
+    def process(self, f0, volume):
+        f0 = np.asarray(f0, dtype=np.float64)
+        volume = np.asarray(volume, dtype=np.float64)
+        for effect in self.effects:
+            f0, volume = effect.process(f0, volume)
+        return f0, volume
+
+    def apply(self, query):
+        """
+        Apply in place to a FrameAudioQuery, or to a /sing_frame_audio_query dict
+        (whose f0/volume stay JSON lists).
+        """
+        if not self.effects:
+            return query
+        if not isinstance(query, dict):
+            f0, volume = self.process(query.f0, query.volume)
+            query.f0 = f0.astype(np.float32)
+            query.volume = volume.astype(np.float32)
+            return query
+        f0, volume = self.process(query.get("f0", []), query.get("volume", []))
+        query["f0"] = f0.tolist()
+        query["volume"] = volume.tolist()
+        return query
+
+
+# Tweaks used by the sing variants
+SING3_EFFECTS = EffectChain([PitchShift(ratio=1.2), Gain(0.8)])
+SING4_EFFECTS = EffectChain([Vibrato(depth=0.01, period=120), Gain(0.95)])
@@ -0,0 +1,187 @@
+import json
+import numpy as np
+
+# Keys of voicevox_engine's FrameAudioQuery that are stored as attributes
+_KNOWN_KEYS = ("f0", "volume", "phonemes", "volumeScale", "outputSamplingRate", "outputStereo")
+# Serialized precision: 0.0001 Hz for f0, 6 decimals for volume (float32 holds ~7 digits)
+F0_DECIMALS = 4
+VOLUME_DECIMALS = 6
+
+
+def encode_float_array(values: np.ndarray, decimals: int = 4) -> bytes:
+    """
+    JSON-encode a float array with `decimals` fixed decimals, without going through
+    Python floats: every number is rendered into a fixed-width column of a uint8
+    matrix (leading zeros become spaces, which JSON allows) and the matrix is
+    returned as bytes, several times faster than json.dumps(values.tolist()).
+    """
+    n = len(values)
+    if n == 0:
+        return b"[]"
+    values = np.asarray(values, dtype=np.float64)
+    if not np.isfinite(values).all():
+        raise ValueError("array contains NaN or infinity")
+    scale = 10 ** decimals
+    scaled = np.rint(np.abs(values) * scale).astype(np.int64)
+    negative = (values < 0) & (scaled > 0)
+
+    int_digits = len(str(int(scaled.max()) // scale))
+    total = int_digits + decimals
+    powers = 10 ** np.arange(total - 1, -1, -1, dtype=np.int64)
+    digits = (scaled[:, None] // powers) % 10
+
+    # [sign/space][int digits][.][decimals][,]
+    width = int_digits + decimals + 3
+    out = np.full((n, width), ord(" "), dtype=np.uint8)
+    out[:, 1:1 + int_digits] = digits[:, :int_digits] + ord("0")
+    # blank leading zeros of the integer part (the units digit always stays)
+    leading = (scaled[:, None] // powers[:int_digits - 1]) == 0
+    out[:, 1:int_digits][leading] = ord(" ")
+    out[:, 1 + int_digits] = ord(".")
+    out[:, 2 + int_digits:2 + total] = digits[:, int_digits:] + ord("0")
+    out[:, -1] = ord(",")
+    out[-1, -1] = ord("]")
+    if negative.any():
+        # minus goes right before the first digit
+        first_digit = 1 + leading.sum(axis=1)
+        rows = np.flatnonzero(negative)
+        out[rows, first_digit[rows] - 1] = ord("-")
+    return b"[" + out.tobytes()
+
+
+class FrameAudioQuery:
+    """
+    Array-backed form of voicevox_engine's FrameAudioQuery (/sing_frame_audio_query ->
+    /frame_synthesis).
+
+    f0/volume are contiguous float32 arrays and the phoneme list is stored as parallel
+    arrays (phonemes, frame_lengths, note_ids), so validation is a handful of vectorized
+    checks and to_json() renders bytes directly. from_dict()/to_dict() round-trip with
+    the engine's dicts (f0 to 4 decimals, volume to 6, same as to_json()); unknown keys
+    are kept in `extra`.
+    """
+    __slots__ = ("f0", "volume", "phonemes", "frame_lengths", "note_ids",
+                 "volume_scale", "output_sampling_rate", "output_stereo", "extra")
+
+    def __init__(self, f0, volume, phonemes, frame_lengths, note_ids=None,
+                 volume_scale: float = 1.0, output_sampling_rate: int = 24000,
+                 output_stereo: bool = False, extra: dict = None):
+        self.f0 = np.ascontiguousarray(f0, dtype=np.float32)
+        self.volume = np.ascontiguousarray(volume, dtype=np.float32)
+        self.phonemes = list(phonemes)
+        self.frame_lengths = np.ascontiguousarray(frame_lengths, dtype=np.int32)
+        self.note_ids = list(note_ids) if note_ids is not None else None
+        self.volume_scale = float(volume_scale)
+        self.output_sampling_rate = int(output_sampling_rate)
+        self.output_stereo = bool(output_stereo)
+        self.extra = dict(extra or {})
+
+    def __len__(self) -> int:
+        return len(self.f0)
+
+    def __repr__(self) -> str:
+        return (f"FrameAudioQuery(frames={len(self.f0)}, phonemes={len(self.phonemes)}, "
+                f"outputSamplingRate={self.output_sampling_rate})")
+
+    # ------------------------
+    # Construction
+    # ------------------------
+    @classmethod
+    def from_dict(cls, query: dict) -> "FrameAudioQuery":
+        """From a /sing_frame_audio_query response (or an equivalent dict)."""
+        missing = [k for k in ("phonemes", "f0", "volume") if k not in query]
+        if missing:
+            raise ValueError("Missing one of required keys: phonemes, f0, volume")
+        entries = query["phonemes"]
+        has_note_ids = any("note_id" in p for p in entries)
+        try:
+            phonemes = [p["phoneme"] for p in entries]
+            frame_lengths = [p["frame_length"] for p in entries]
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"phoneme entry missing 'phoneme'/'frame_length': {e}") from None
+        if not all(isinstance(p, str) for p in phonemes):
+            raise ValueError("phoneme entry 'phoneme' must be a string")
+        if not all(type(n) is int for n in frame_lengths):
+            raise ValueError("phoneme entry 'frame_length' must be an int")
+        try:
+            f0 = np.asarray(query["f0"], dtype=np.float32)
+            volume = np.asarray(query["volume"], dtype=np.float32)
+        except (TypeError, ValueError):
+            raise ValueError("f0/volume arrays must contain numbers (float)") from None
+        return cls(f0, volume, phonemes, frame_lengths,
+                   note_ids=[p.get("note_id") for p in entries] if has_note_ids else None,
+                   volume_scale=query.get("volumeScale", 1.0),
+                   output_sampling_rate=query.get("outputSamplingRate", 24000),
+                   output_stereo=query.get("outputStereo", False),
+                   extra={k: v for k, v in query.items() if k not in _KNOWN_KEYS})
+
+    @classmethod
+    def constant(cls, phonemes, frame_length: int, f0_value: float, volume_value: float,
+                 **kwargs) -> "FrameAudioQuery":
+        """Every phoneme `frame_length` frames long, flat f0/volume."""
+        frame_lengths = np.full(len(phonemes), frame_length, dtype=np.int32)
+        total = int(frame_lengths.sum())
+        return cls(np.full(total, f0_value, dtype=np.float32), np.full(total, volume_value, dtype=np.float32),
+                   phonemes, frame_lengths, **kwargs)
+
+    # ------------------------
+    # Validation / serialization
+    # ------------------------
+    @property
+    def total_frames(self) -> int:
+        return int(self.frame_lengths.sum())
+
+    def validate(self) -> "FrameAudioQuery":
+        """Raise ValueError when the query is invalid for /frame_synthesis."""
+        if len(self.frame_lengths) != len(self.phonemes):
+            raise ValueError(f"{len(self.phonemes)} phonemes but {len(self.frame_lengths)} frame lengths")
+        if self.note_ids is not None and len(self.note_ids) != len(self.phonemes):
+            raise ValueError(f"{len(self.phonemes)} phonemes but {len(self.note_ids)} note ids")
+        if self.f0.dtype != np.float32 or self.volume.dtype != np.float32:
+            raise ValueError("f0/volume must be float32 arrays")
+        if self.f0.ndim != 1 or self.volume.ndim != 1:
+            raise ValueError("f0/volume must be one-dimensional")
+        total_frames = self.total_frames
+        if len(self.f0) != total_frames:
+            raise ValueError(f"f0 length ({len(self.f0)}) != total_frames ({total_frames})")
+        if len(self.volume) != total_frames:
+            raise ValueError(f"volume length ({len(self.volume)}) != total_frames ({total_frames})")
+        if (self.frame_lengths < 0).any():
+            raise ValueError("frame_length must not be negative")
+        if not (np.isfinite(self.f0).all() and np.isfinite(self.volume).all()):
+            raise ValueError("f0/volume must be finite numbers")
+        return self
+
+    def _phoneme_dicts(self) -> list:
+        lengths = self.frame_lengths.tolist()
+        if self.note_ids is None:
+            return [{"phoneme": p, "frame_length": n} for p, n in zip(self.phonemes, lengths)]
+        return [{"phoneme": p, "frame_length": n, "note_id": i}
+                for p, n, i in zip(self.phonemes, lengths, self.note_ids)]
+
+    def to_dict(self) -> dict:
+        query = {
+            "f0": np.round(self.f0.astype(np.float64), F0_DECIMALS).tolist(),
+            "volume": np.round(self.volume.astype(np.float64), VOLUME_DECIMALS).tolist(),
+            "phonemes": self._phoneme_dicts(),
+            "volumeScale": self.volume_scale,
+            "outputSamplingRate": self.output_sampling_rate,
+            "outputStereo": self.output_stereo,
+        }
+        query.update(self.extra)
+        return query
+
+    def to_json(self) -> bytes:
+        """Request body for /frame_synthesis."""
+        tail = {
+            "phonemes": self._phoneme_dicts(),
+            "volumeScale": self.volume_scale,
+            "outputSamplingRate": self.output_sampling_rate,
+            "outputStereo": self.output_stereo,
+        }
+        tail.update(self.extra)
+        return b"".join((
+            b'{"f0":', encode_float_array(self.f0, F0_DECIMALS),
+            b',"volume":', encode_float_array(self.volume, VOLUME_DECIMALS),
+            b",", json.dumps(tail, ensure_ascii=False, separators=(",", ":"))[1:].encode("utf-8"),
+        ))
@@ -0,0 +1,138 @@
+import json
+import os
+import queue
+import threading
+import time
+from metrics import LatencyTracker
+from .base import LLMClient, fallback_answer, is_fallback
+from .resilience import start_stream
+from .utils import parse_llm_json_response
+
+
+class HedgedLLMClient(LLMClient):
+    """
+    Sends each request to the primary client and, if no first token has arrived
+    after the hedge delay, to the next secondary as well (one more per delay).
+
+    The hedge delay is the primary's p95 first-token latency over recent requests,
+    clamped to [min_delay, max_delay]; until `min_samples` requests were seen it is
+    `initial_delay`. A client that fails (raises, ends without output or answers with
+    the adapters' fallback echo) fires the next one right away. The first client to
+    produce a valid token wins; the others are closed at their next token.
+    """
+    def __init__(self, primary: LLMClient, secondaries, initial_delay: float = None,
+                 min_delay: float = None, max_delay: float = None, quantile: float = 0.95,
+                 min_samples: int = 5, window: int = 50, clock=time.monotonic):
+        self.clients = [primary, *secondaries]
+        self.model = getattr(primary, "model", None)
+        self.initial_delay = initial_delay if initial_delay is not None else float(os.getenv("LLM_HEDGE_DELAY_SEC", "1.5"))
+        self.min_delay = min_delay if min_delay is not None else float(os.getenv("LLM_HEDGE_MIN_DELAY_SEC", "0.3"))
+        self.max_delay = max_delay if max_delay is not None else float(os.getenv("LLM_HEDGE_MAX_DELAY_SEC", "4.0"))
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.clock = clock
+        self.latency = [LatencyTracker(window) for _ in self.clients]
+        self._lock = threading.Lock()
+        self.counters = {"requests": 0, "hedged": 0, "failovers": 0, "failed": 0}
+        self.wins = [0] * len(self.clients)
+
+    def hedge_delay(self) -> float:
+        primary = self.latency[0]
+        if len(primary) < self.min_samples:
+            return self.initial_delay
+        return min(self.max_delay, max(self.min_delay, primary.quantile(self.quantile)))
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def stream(self, prompt: str, history=None):
+        self._count("requests")
+        out = queue.Queue()
+        cancels, started, timed = [], [], set()
+
+        def fire(index):
+            cancels.append(threading.Event())
+            started.append(self.clock())
+            start_stream(self.clients[index], prompt, history, out, cancels[index], tag=index)
+
+        def first_token(index):
+            if index not in timed:
+                timed.add(index)
+                self.latency[index].record(self.clock() - started[index])
+
+        fire(0)
+        hedge_at = self.clock() + self.hedge_delay()
+        failed = set()
+        winner, first, last_error = None, None, None
+        try:
+            while winner is None:
+                can_hedge = len(cancels) < len(self.clients)
+                try:
+                    kind, index, payload = out.get(timeout=max(0.0, hedge_at - self.clock()) if can_hedge else None)
+                except queue.Empty:
+                    self._count("hedged")
+                    fire(len(cancels))
+                    hedge_at = self.clock() + self.hedge_delay()
+                    continue
+                if index in failed:
+                    continue
+                if kind == "delta":
+                    if not payload:
+                        continue
+                    if not is_fallback(payload, prompt):
+                        first_token(index)
+                        winner, first = index, payload
+                        break
+                    cancels[index].set()
+                elif kind == "error":
+                    last_error = payload
+                # error, end without output, or fallback echo: this client is out
+                failed.add(index)
+                if len(cancels) < len(self.clients):
+                    self._count("failovers")
+                    fire(len(cancels))
+                    hedge_at = self.clock() + self.hedge_delay()
+                elif len(failed) == len(cancels):
+                    self._count("failed")
+                    if last_error is not None:
+                        raise last_error   # let retry_with_backoff see it
+                    print("All LLM providers failed, using user input as fallback.")
+                    yield json.dumps(fallback_answer(prompt), ensure_ascii=False)
+                    return
+
+            with self._lock:
+                self.wins[winner] += 1
+            for index, cancel in enumerate(cancels):
+                if index != winner:
+                    cancel.set()
+                    if index not in failed:
+                        # a cancelled loser never reports its first token; its wait so far is
+                        # a lower bound, without which the p95 would only see the fast requests
+                        first_token(index)
+            yield first
+            while True:
+                kind, index, payload = out.get()
+                if index != winner:
+                    continue
+                if kind == "delta":
+                    yield payload
+                elif kind == "end":
+                    return
+                else:
+                    raise payload
+        finally:
+            # also runs when the caller stops early (GeneratorExit)
+            for cancel in cancels:
+                cancel.set()
+
+    def complete(self, prompt: str, history=None) -> dict:
+        return parse_llm_json_response("".join(self.stream(prompt, history=history)).strip())
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.counters)
+            stats["wins"] = {type(c).__name__ + f"[{i}]": w for i, (c, w) in enumerate(zip(self.clients, self.wins))}
+        stats["hedge_delay"] = round(self.hedge_delay(), 3)
+        stats["p95_first_token"] = [self.latency[i].quantile(0.95) for i in range(len(self.clients))]
+        return stats
@@ -1,8 +1,9 @@
+import json
 import os
 from huggingface_hub import InferenceClient
 from huggingface_hub.utils import HfHubHTTPError
-from .base import LLMClient
-from .utils import complete_with_client
+from .base import LLMClient, fallback_answer
+from .utils import complete_with_client, stream_with_client
 import requests
 
 class HuggingFaceClient(LLMClient):
@@ -15,7 +16,19 @@ class HuggingFaceClient(LLMClient):
 
     def complete(self, prompt: str, history=None) -> dict:
         try:
-            return complete_with_client(self.client, self.model, prompt)
+            return complete_with_client(self.client, self.model, prompt, history)
         except (HfHubHTTPError, requests.HTTPError) as e:
             print(f"Using user input as fallback.")
-            return {"reply": prompt, "emotion": "neutral", "mode": "talk"}
\ No newline at end of file
+            return fallback_answer(prompt)
+
+    def stream(self, prompt: str, history=None):
+        started = False
+        try:
+            for delta in stream_with_client(self.client, self.model, prompt, history):
+                started = True
+                yield delta
+        except (HfHubHTTPError, requests.HTTPError) as e:
+            if started:
+                raise
+            print(f"Using user input as fallback.")
+            yield json.dumps(fallback_answer(prompt), ensure_ascii=False)
@@ -1,12 +1,122 @@
 import os
+import re
+import threading
 from collections import deque
+
+_SENTENCE_RE = re.compile(r'(?<=[。！？!?.\n])')
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate without a tokenizer: ~4 ASCII chars per token, one token per
+    non-ASCII char (kana/kanji usually take 1-2 tokens each).
+    """
+    if not text:
+        return 0
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+def message_tokens(messages) -> int:
+    """Estimated prompt tokens for a chat message list (4 tokens of framing per message)."""
+    return sum(4 + estimate_tokens(m["content"]) for m in messages)
+
+class Turn:
+    """One user/assistant exchange; its token count is computed once, when added."""
+    __slots__ = ("user", "assistant", "tokens")
+    def __init__(self, user, assistant):
+        self.user = user
+        self.assistant = assistant
+        self.tokens = 8 + estimate_tokens(user) + estimate_tokens(assistant)
+
+    def fit(self, budget: int) -> None:
+        """Cut the texts (user side to at most half, if both are long) so the turn fits `budget` tokens."""
+        allowance = max(0, budget - 8)
+        user_cap = max(allowance // 2, allowance - estimate_tokens(self.assistant))
+        self.user = _truncate(self.user, user_cap)
+        self.assistant = _truncate(self.assistant, allowance - estimate_tokens(self.user))
+        self.tokens = 8 + estimate_tokens(self.user) + estimate_tokens(self.assistant)
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """Longest prefix of `text` (plus "…") within `max_tokens` estimated tokens."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    if max_tokens <= 1:
+        return ""
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if estimate_tokens(text[:mid]) <= max_tokens - 1:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo] + "…"
+
+def _first_sentence(text: str, max_chars: int = 80) -> str:
+    text = " ".join(str(text).split())
+    first = _SENTENCE_RE.split(text, maxsplit=1)[0].strip()
+    return first if len(first) <= max_chars else first[:max_chars - 1] + "…"
+
 class ConversationHistory:
-    def __init__(self, max_turns=None):
+    """
+    Recent turns sent to the LLM with every request, under a token budget.
+
+    Turns are kept newest-last with their token counts cached on the Turn objects.
+    Once there are more than `max_turns` turns or they exceed the budget, the oldest
+    are rolled into an extractive summary (first sentence of each side), which has
+    its own cap of `token_budget // 4` tokens and drops its oldest lines first.
+    The newest turn is always kept; if it alone is over the turns' share, its texts
+    are cut to fit. Summary + turns therefore never exceed `token_budget`, however
+    long the session.
+    """
+    def __init__(self, max_turns=None, token_budget=None):
         self.max_turns = max_turns or int(os.getenv('HISTORY_MAX_TURNS','5'))
-        self.turns = deque(maxlen=self.max_turns)
-    def add_turn(self, u, b): self.turns.append((u, b))
+        self.token_budget = token_budget or int(os.getenv('HISTORY_TOKEN_BUDGET','1200'))
+        self.summary_budget = self.token_budget // 4
+        self.turns = deque()
+        self.tokens = 0                   # sum of turn.tokens
+        self._summary = deque()           # (line, tokens), oldest first
+        self.summary_tokens = 0
+        self._summary_message = None      # cached rendered summary
+        self._lock = threading.Lock()
+
+    def add_turn(self, u, b):
+        turn = Turn(u, b)
+        with self._lock:
+            self.turns.append(turn)
+            self.tokens += turn.tokens
+            turns_budget = self.token_budget - self.summary_budget
+            while len(self.turns) > 1 and (len(self.turns) > self.max_turns or self.tokens > turns_budget):
+                self._roll_into_summary(self.turns.popleft())
+            if self.tokens > turns_budget:
+                self.tokens -= turn.tokens
+                turn.fit(turns_budget)
+                self.tokens += turn.tokens
+
+    def _roll_into_summary(self, turn):
+        self.tokens -= turn.tokens
+        line = f"User: {_first_sentence(turn.user)} / You: {_first_sentence(turn.assistant)}"
+        tokens = estimate_tokens(line) + 1
+        self._summary.append((line, tokens))
+        self.summary_tokens += tokens
+        while self._summary and self.summary_tokens > self.summary_budget:
+            _, dropped = self._summary.popleft()
+            self.summary_tokens -= dropped
+        self._summary_message = None
+
+    def summary(self) -> str:
+        if self._summary_message is None and self._summary:
+            self._summary_message = "Earlier in this conversation:\n" + "\n".join(l for l, _ in self._summary)
+        return self._summary_message or ""
+
     def as_messages(self):
-        msgs = []
-        for u,b in self.turns:
-            msgs.append({'role':'user','content':u}); msgs.append({'role':'assistant','content':b})
-        return msgs
+        with self._lock:
+            msgs = []
+            if self._summary:
+                msgs.append({'role':'system','content':self.summary()})
+            for t in self.turns:
+                msgs.append({'role':'user','content':t.user}); msgs.append({'role':'assistant','content':t.assistant})
+            return msgs
+
+    def clear(self):
+        with self._lock:
+            self.turns.clear(); self.tokens = 0
+            self._summary.clear(); self.summary_tokens = 0; self._summary_message = None
@@ -0,0 +1,232 @@
+import json
+from typing import NamedTuple
+from llm_bridge.utils import parse_llm_json_response
+
+# Fields whose text is emitted piece by piece; every other field is emitted once, when complete.
+STREAMED_KEYS = ("reply", "lyrics")
+
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+# Parser states
+_PREFIX, _FENCE, _RAW, _KEY_WAIT, _KEY, _COLON, _VALUE_WAIT, _STRING, _OTHER, _AFTER, _DONE = range(11)
+
+
+class StreamEvent(NamedTuple):
+    key: str      # field name, e.g. "reply" or "emotion"
+    value: object # streamed keys: new text since the last event; other keys: the full value
+    done: bool    # True once the field's value is complete
+
+
+class ReplyStreamParser:
+    """
+    Incremental parser for the {"reply", "emotion", "mode", "lyrics"} answer
+    requested by JSON_PROMPT_TEMPLATE.
+
+        parser = ReplyStreamParser()
+        for delta in llm.stream(prompt):
+            for event in parser.feed(delta):
+                ...
+        data = parser.finish()
+
+    feed() reports "emotion"/"mode" as soon as their string closes and "reply"/"lyrics"
+    text as it grows. A leading ``` fence is skipped; an answer that is not a JSON
+    object is streamed entirely as "reply". finish() returns exactly what
+    parse_llm_json_response() gives for the full text, including its fallback.
+    """
+    def __init__(self):
+        self._raw = []
+        self._state = _PREFIX
+        self._prefix = []
+        self._key = []
+        self._value = []
+        self._other = []
+        self._other_depth = 0
+        self._other_in_str = False
+        self._other_esc = False
+        self._esc = None
+        self._high_surrogate = None
+        self._current = None
+        self._emitted = 0
+        self.fields = {}
+
+    # ------------------------
+    # Public API
+    # ------------------------
+    @property
+    def reply(self) -> str:
+        if self._current == "reply" and self._state in (_STRING, _RAW):
+            return "".join(self._value)
+        return self.fields.get("reply", "")
+
+    @property
+    def emotion(self):
+        return self.fields.get("emotion")
+
+    @property
+    def mode(self):
+        return self.fields.get("mode")
+
+    def feed(self, chunk: str) -> list:
+        """Consume the next piece of model output; return the StreamEvents it completes."""
+        self._raw.append(chunk)
+        events = []
+        for ch in chunk:
+            self._step(ch, events)
+        if self._state in (_STRING, _RAW) and self._current in STREAMED_KEYS:
+            self._emit_delta(events, done=False)
+        return events
+
+    def finish(self) -> dict:
+        return parse_llm_json_response("".join(self._raw).strip())
+
+    # ------------------------
+    # State machine
+    # ------------------------
+    def _emit_delta(self, events: list, done: bool) -> None:
+        text = "".join(self._value)
+        if len(text) > self._emitted or done:
+            events.append(StreamEvent(self._current, text[self._emitted:], done))
+            self._emitted = len(text)
+
+    def _step(self, ch: str, events: list) -> None:
+        state = self._state
+        if state == _STRING:
+            self._string_char(ch, events)
+        elif state == _RAW:
+            self._value.append(ch)
+        elif state == _PREFIX:
+            self._prefix_char(ch)
+        elif state == _FENCE:
+            if ch == "\n":
+                self._state = _PREFIX
+        elif state == _KEY_WAIT:
+            if ch == '"':
+                self._key = []
+                self._state = _KEY
+            elif ch == "}":
+                self._state = _DONE
+        elif state == _KEY:
+            if self._esc is not None or ch == "\\":
+                self._key.append(ch)
+                self._esc = None if self._esc is not None else ""
+            elif ch == '"':
+                self._current = json.loads('"' + "".join(self._key) + '"')
+                self._state = _COLON
+            else:
+                self._key.append(ch)
+        elif state == _COLON:
+            if ch == ":":
+                self._state = _VALUE_WAIT
+        elif state == _VALUE_WAIT:
+            if ch == '"':
+                self._value = []
+                self._emitted = 0
+                self._esc = None
+                self._high_surrogate = None
+                self._state = _STRING
+            elif not ch.isspace():
+                self._other = [ch]
+                self._other_depth = 1 if ch in "[{" else 0
+                self._other_in_str = False
+                self._other_esc = False
+                self._state = _OTHER
+        elif state == _OTHER:
+            self._other_char(ch, events)
+        elif state == _AFTER:
+            if ch == ",":
+                self._state = _KEY_WAIT
+            elif ch == "}":
+                self._state = _DONE
+
+    def _prefix_char(self, ch: str) -> None:
+        self._prefix.append(ch)
+        head = "".join(self._prefix).lstrip()
+        if not head or "```".startswith(head):
+            return
+        if head.startswith("```"):
+            self._prefix = []
+            self._state = _FENCE
+        elif head == "{":
+            self._state = _KEY_WAIT
+        else:
+            # Not JSON: mirror parse_llm_json_response's fallback and treat it all as reply
+            self._current = "reply"
+            self._value = [head]
+            self._emitted = 0
+            self._state = _RAW
+
+    def _string_char(self, ch: str, events: list) -> None:
+        esc = self._esc
+        if esc is None:
+            if ch == "\\":
+                self._esc = ""
+            elif ch == '"':
+                self._close_string(events)
+            else:
+                self._value.append(ch)
+            return
+        if esc == "" and ch != "u":
+            self._value.append(_ESCAPES.get(ch, ch))
+            self._esc = None
+            return
+        esc += ch
+        if len(esc) < 5:
+            self._esc = esc
+            return
+        self._esc = None
+        try:
+            cp = int(esc[1:], 16)
+        except ValueError:
+            return
+        if 0xD800 <= cp < 0xDC00:
+            self._high_surrogate = cp
+            return
+        if 0xDC00 <= cp < 0xE000 and self._high_surrogate is not None:
+            cp = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (cp - 0xDC00)
+        self._high_surrogate = None
+        self._value.append(chr(cp))
+
+    def _close_string(self, events: list) -> None:
+        key = self._current
+        value = "".join(self._value)
+        self.fields[key] = value
+        if key in STREAMED_KEYS:
+            self._emit_delta(events, done=True)
+        else:
+            events.append(StreamEvent(key, value, True))
+        self._state = _AFTER
+
+    def _other_char(self, ch: str, events: list) -> None:
+        if self._other_in_str:
+            self._other.append(ch)
+            if self._other_esc:
+                self._other_esc = False
+            elif ch == "\\":
+                self._other_esc = True
+            elif ch == '"':
+                self._other_in_str = False
+            return
+        if self._other_depth == 0 and (ch in ",}" or ch.isspace()):
+            self._close_other(events)
+            self._state = _AFTER
+            self._step(ch, events)
+            return
+        self._other.append(ch)
+        if ch == '"':
+            self._other_in_str = True
+        elif ch in "[{":
+            self._other_depth += 1
+        elif ch in "]}":
+            self._other_depth -= 1
+            if self._other_depth == 0:
+                self._close_other(events)
+                self._state = _AFTER
+
+    def _close_other(self, events: list) -> None:
+        raw = "".join(self._other)
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            value = raw
+        self.fields[self._current] = value
+        events.append(StreamEvent(self._current, value, True))
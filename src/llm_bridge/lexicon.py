@@ -0,0 +1,172 @@
+import mmap
+import os
+import struct
+import sys
+import threading
+import zlib
+from array import array
+from functools import lru_cache
+
+# File layout (little-endian):
+#   header  MAGIC, uint32 entries, uint32 slots (power of two)
+#   slots   `slots` x (uint32 crc32(key), uint32 record offset, uint32 key length << 16 | value length),
+#           offset 0 = empty; open addressing, linear probing. Fixed width, so a probe is three
+#           integer reads from a uint32 view of the mapping, with no struct unpacking.
+#   records key, value (UTF-8), sorted by key
+MAGIC = b"ENKANA02"
+_HEADER = struct.Struct("<8sII")
+_SLOT = struct.Struct("<III")
+
+
+def normalize_key(word: str) -> str:
+    return " ".join(word.upper().split())
+
+
+def read_source(path: str):
+    """
+    Yield (english, katakana) from a text lexicon: one entry per line, tab separated
+    (or "WORD カタカナ" separated by the last whitespace, as in bep-eng.dic).
+    Blank lines and lines starting with # are skipped.
+    """
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if "\t" in line:
+                word, _, kana = line.partition("\t")
+            else:
+                word, _, kana = line.rpartition(" ")
+            word, kana = normalize_key(word), kana.strip()
+            if word and kana:
+                yield word, kana
+
+
+def compile_lexicon(entries, out_path: str) -> int:
+    """Write (english, katakana) pairs to the mmap-able table at `out_path`. Later duplicates win."""
+    table = {}
+    for word, kana in entries:
+        table[normalize_key(word)] = kana
+    slots = 8
+    while slots < 2 * len(table):
+        slots *= 2
+    mask = slots - 1
+
+    records = bytearray()
+    index = [(0, 0, 0)] * slots
+    base = _HEADER.size + slots * _SLOT.size
+    for word in sorted(table):
+        key = word.encode("utf-8")
+        value = table[word].encode("utf-8")
+        if len(key) > 0xFFFF or len(value) > 0xFFFF:
+            raise ValueError(f"lexicon entry too long: {word[:40]!r}")
+        h = zlib.crc32(key)
+        slot = h & mask
+        while index[slot][1]:
+            slot = (slot + 1) & mask
+        index[slot] = (h, base + len(records), len(key) << 16 | len(value))
+        records += key + value
+
+    tmp = f"{out_path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(table), slots))
+        f.write(b"".join(_SLOT.pack(*slot) for slot in index))
+        f.write(records)
+    os.replace(tmp, out_path)
+    return len(table)
+
+
+class Lexicon:
+    """
+    Read-only English -> katakana table compiled by compile_lexicon().
+
+    The file is memory-mapped on the first lookup, so only the pages that lookups
+    touch are read and nothing is loaded into the heap. A lookup hashes the key and
+    probes the slot table (usually one probe, ~2 us in CPython); the LRU memo in
+    front makes repeated words (most of a chat) a dict hit, well under a microsecond.
+    """
+    def __init__(self, path: str, cache_size: int = 8192):
+        self.path = path
+        self._mm = None
+        self._views = ()
+        self._slots = None
+        self._entries = 0
+        self._mask = 0
+        self._lock = threading.Lock()
+        self.get = lru_cache(maxsize=cache_size)(self._lookup)
+
+    def __contains__(self, word: str) -> bool:
+        return self.get(word) is not None
+
+    def __len__(self) -> int:
+        self._open()
+        return self._entries
+
+    def _open(self):
+        if self._mm is None:
+            with self._lock:
+                if self._mm is None:
+                    with open(self.path, "rb") as f:
+                        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    magic, entries, slots = _HEADER.unpack_from(mm, 0)
+                    if magic != MAGIC:
+                        mm.close()
+                        if magic.startswith(MAGIC[:6]):
+                            raise ValueError(f"{self.path} is an older lexicon format; "
+                                             "rebuild it with scripts/compile_lexicon.py")
+                        raise ValueError(f"{self.path} is not a compiled lexicon")
+                    end = _HEADER.size + slots * _SLOT.size
+                    if sys.byteorder == "little":
+                        whole = memoryview(mm)
+                        self._slots = whole[_HEADER.size:end].cast("I")
+                        self._views = (self._slots, whole)
+                    else:
+                        self._slots = array("I", mm[_HEADER.size:end])
+                        self._slots.byteswap()
+                    self._entries, self._mask = entries, slots - 1
+                    self._mm = mm
+        return self._mm
+
+    def _lookup(self, word: str):
+        """Katakana for `word` (case-insensitive), or None."""
+        mm = self._mm or self._open()
+        # a single word (the common case) normalizes to just its upper case
+        key = (word.upper() if word.isalpha() else normalize_key(word)).encode("utf-8")
+        h = zlib.crc32(key)
+        slots, mask = self._slots, self._mask
+        slot = h & mask
+        while True:
+            i = 3 * slot
+            offset = slots[i + 1]
+            if not offset:
+                return None
+            if slots[i] == h:
+                lengths = slots[i + 2]
+                end = offset + (lengths >> 16)
+                if mm[offset:end] == key:
+                    return mm[end:end + (lengths & 0xFFFF)].decode("utf-8")
+            slot = (slot + 1) & mask
+
+    def cache_info(self):
+        return self.get.cache_info()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._mm is not None:
+                for view in self._views:
+                    view.release()   # mmap.close() refuses while views are exported
+                self._views, self._slots = (), None
+                self._mm.close()
+                self._mm = None
+        self.get.cache_clear()
+
+
+def get_lexicon():
+    """Lexicon at EN_LEXICON_PATH, or None when unset/missing. Not opened until the first lookup."""
+    path = os.getenv("EN_LEXICON_PATH")
+    if not path:
+        return None
+    if not os.path.exists(path):
+        print(f"[lexicon] EN_LEXICON_PATH={path} not found, using EN_DICT only")
+        return None
+    return Lexicon(path)
@@ -1,19 +1,34 @@
+import json
 import os
 from openai import OpenAI, OpenAIError
-from .base import LLMClient
-from .utils import complete_with_client
+from .base import LLMClient, fallback_answer
+from .utils import complete_with_client, stream_with_client
 
 class OpenRouterClient(LLMClient):
-    def __init__(self, api_key=None, model=None):
+    def __init__(self, api_key=None, model=None, base_url=None):
+        """base_url: any OpenAI-compatible endpoint (e.g. a local server); defaults to OpenRouter."""
         self.api_key = api_key or os.getenv("OPENROUTER_API_KEY") or os.getenv("HF_API_KEY")
         self.model = model or os.getenv("HF_MODEL", "shisa-ai/shisa-v2-llama3.3-70b:free")
+        self.base_url = base_url or "https://openrouter.ai/api/v1"
         if not self.api_key:
             raise ValueError("OpenRouter API key not provided.")
-        self.client = OpenAI(api_key=self.api_key, base_url="https://openrouter.ai/api/v1")
+        self.client = OpenAI(api_key=self.api_key, base_url=self.base_url)
 
     def complete(self, prompt: str, history=None) -> dict:
         try:
-            return complete_with_client(self.client, self.model, prompt)
+            return complete_with_client(self.client, self.model, prompt, history)
         except OpenAIError as e:
             print(f"Using user input as fallback.")
-            return {"reply": prompt, "emotion": "neutral", "mode": "talk"}
\ No newline at end of file
+            return fallback_answer(prompt)
+
+    def stream(self, prompt: str, history=None):
+        started = False
+        try:
+            for delta in stream_with_client(self.client, self.model, prompt, history):
+                started = True
+                yield delta
+        except OpenAIError as e:
+            if started:
+                raise
+            print(f"Using user input as fallback.")
+            yield json.dumps(fallback_answer(prompt), ensure_ascii=False)
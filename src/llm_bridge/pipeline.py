@@ -0,0 +1,298 @@
+import asyncio
+import itertools
+import os
+import time
+from collections import deque
+import metrics
+from constants import EMOTION_TO_SPEAKER
+from llm_bridge.resilience import breaker_status
+from llm_bridge.tts_worker import OrderedTTSPool
+from llm_bridge.utils import parse_command, retry_with_backoff, safety_filter, build_voicevox_score, split_into_clauses
+
+STAGES = ("parse", "llm", "safety", "chatbox", "synth", "playback")
+
+
+class Turn:
+    """One user message on its way through the pipeline, with per-stage timestamps."""
+    __slots__ = ("id", "trace_id", "user_input", "created", "stamps", "cancelled", "parsed", "renderer",
+                 "response", "message", "emotion", "speaker_pool", "mode", "early", "handle")
+
+    def __init__(self, turn_id: int, user_input: str):
+        self.id = turn_id
+        self.trace_id = metrics.new_trace_id()   # tags every span recorded while working on this turn
+        self.user_input = user_input
+        self.created = time.perf_counter()
+        self.stamps = {}          # stage -> (start, end), seconds since created
+        self.cancelled = False
+        self.parsed = None
+        self.renderer = None
+        self.response = None
+        self.message = ""
+        self.emotion = "neutral"
+        self.speaker_pool = EMOTION_TO_SPEAKER["neutral"]
+        self.mode = "talk"
+        self.early = {}           # emotion/lyrics known before the answer finished streaming
+        self.handle = None        # PlaybackHandle of the latest queued segment
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+    def timeline(self) -> str:
+        stamps = sorted(self.stamps.items(), key=lambda item: item[1])
+        return " ".join(f"{stage} {start * 1e3:.0f}-{end * 1e3:.0f}ms" for stage, (start, end) in stamps)
+
+
+class TurnPipeline:
+    """
+    Chat turns as stages connected by bounded asyncio queues:
+
+        parse -> llm -> safety -> chatbox -> synth -> playback
+
+    Each stage is one task working on one turn at a time, so turns stay in order and a
+    slow stage holds back the ones before it (backpressure up to submit()). Blocking work
+    runs in threads. submit() cancels every turn still in flight: stages drop cancelled
+    turns, the LLM stream stops at its next token and no further audio is queued; audio
+    already playing is cut when the new turn's first audio arrives (barge-in).
+    """
+    def __init__(self, llm, history, osc, tts=None, queue_size: int = None, debug: bool = False):
+        self.llm = llm
+        self.history = history
+        self.osc = osc
+        self.tts = tts
+        self.debug = debug
+        self.queue_size = queue_size or int(os.getenv("PIPELINE_QUEUE_SIZE", "2"))
+        self._ids = itertools.count(1)
+        self._active = []
+        self._playing = None      # turn whose audio is on the output device
+        self._queues = None
+        self._tasks = []
+        # Clause synthesis workers: VOICEVOX_SYNTH_WORKERS (2), see tts_worker.OrderedTTSPool.
+        # Always "block" (not from env): dropping or merging would lose clauses from the middle of a reply.
+        self.synth_pool = OrderedTTSPool(tts.synthesize_clause, workers=int(os.getenv("VOICEVOX_SYNTH_WORKERS", "2")),
+                                         policy="block", name="voicevox") if tts else None
+        self.latency = {stage: metrics.LatencyTracker(window=200) for stage in STAGES}
+        self.counters = {"submitted": 0, "completed": 0, "cancelled": 0, "failed": 0}
+
+    async def start(self) -> None:
+        self._queues = [asyncio.Queue(self.queue_size) for _ in STAGES]
+        handlers = (self._parse, self._llm, self._safety, self._chatbox, self._synth, self._playback)
+        for index, (stage, handler) in enumerate(zip(STAGES, handlers)):
+            out = self._queues[index + 1] if index + 1 < len(STAGES) else None
+            self._tasks.append(asyncio.create_task(self._run_stage(stage, handler, self._queues[index], out)))
+
+    async def stop(self) -> None:
+        for turn in self._active:
+            turn.cancel()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.synth_pool:
+            self.synth_pool.close()
+
+    async def submit(self, user_input: str) -> Turn:
+        """Supersede in-flight turns and queue this one; waits while the parse queue is full."""
+        for turn in self._active:
+            turn.cancel()
+        turn = Turn(next(self._ids), user_input)
+        self._active.append(turn)
+        self.counters["submitted"] += 1
+        await self._queues[0].put(turn)
+        return turn
+
+    async def _run_stage(self, stage: str, handler, inq: asyncio.Queue, out) -> None:
+        while True:
+            item = await inq.get()
+            turn = item[0] if isinstance(item, tuple) else item
+            try:
+                if turn.cancelled:
+                    self._finish(turn, "cancelled")
+                    continue
+                start = time.perf_counter() - turn.created
+                try:
+                    # threads started from here (asyncio.to_thread) inherit the trace id
+                    with metrics.trace(turn.trace_id):
+                        forward = await handler(item)
+                except Exception as e:
+                    print(f"[pipeline] turn {turn.id} failed in {stage}: {e}")
+                    self._finish(turn, "failed")
+                    continue
+                end = time.perf_counter() - turn.created
+                first_start = turn.stamps.get(stage, (start, end))[0]
+                turn.stamps[stage] = (first_start, end)
+                if turn.cancelled:
+                    self._finish(turn, "cancelled")
+                elif forward is None:
+                    self._finish(turn, "completed")
+                elif forward and out is not None:
+                    await out.put(item)
+            finally:
+                inq.task_done()
+
+    def _finish(self, turn: Turn, outcome: str) -> None:
+        if turn in self._active:
+            self._active.remove(turn)
+            self.counters[outcome] += 1
+            with metrics.trace(turn.trace_id):
+                for stage, (start, end) in turn.stamps.items():
+                    self.latency[stage].record(end - start)
+                    metrics.observe("turn_stage_seconds", end - start, stage=stage)
+            if self.debug:
+                print(f"[pipeline] turn {turn.id} ({turn.trace_id}) {outcome}: {turn.timeline()}")
+
+    # ------------------------
+    # Stages: return True to pass the turn on, None when it is done,
+    # False when the stage itself hands work on (synth -> playback segments)
+    # ------------------------
+    async def _parse(self, turn: Turn):
+        from osc_chatbox.stream_render import ChatboxStreamRenderer
+        turn.parsed = parse_command(turn.user_input)
+        turn.renderer = ChatboxStreamRenderer(self.osc)
+        if not turn.parsed.call_llm:
+            turn.response = {"reply": turn.parsed.text, "emotion": turn.parsed.emotion, "mode": "talk"}
+        return True
+
+    async def _llm(self, turn: Turn):
+        if turn.response is None:
+            self.osc.typing(True)
+            turn.response = await asyncio.to_thread(self._call_llm, turn)
+        return True
+
+    def _call_llm(self, turn: Turn) -> dict:
+        from llm_bridge.json_stream import ReplyStreamParser
+
+        def call():
+            turn.early.clear()
+            parser = ReplyStreamParser()
+            stream = self.llm.stream(turn.parsed.prompt, history=self.history)
+            try:
+                for delta in stream:
+                    if turn.cancelled:
+                        return None   # superseded: stop generating
+                    for event in parser.feed(delta):
+                        if event.key == "reply":
+                            turn.renderer.update(parser.reply)
+                        elif event.key == "emotion":
+                            turn.early["emotion"] = str(event.value).lower()
+                            if self.tts and parser.mode != "sing":
+                                self._pick_early_speaker(turn)
+                        elif event.key == "lyrics" and event.done and self.tts and parser.mode == "sing":
+                            turn.early["lyrics"] = parser.fields["lyrics"]
+                            turn.early["voicevox_json"] = build_voicevox_score(turn.early["lyrics"])
+            finally:
+                stream.close()
+            return parser.finish()
+
+        try:
+            raw = retry_with_backoff(call)
+        except Exception as e:
+            # every provider down or out of time: answer with the user's own words
+            print(f"LLM failed ({e}); breakers: {breaker_status()}")
+            raw = None if turn.cancelled else {"reply": turn.parsed.text, "emotion": turn.parsed.emotion, "mode": "talk"}
+        response = {"reply": "", "emotion": "neutral"}
+        response.update(raw or {})
+        return response
+
+    def _pick_early_speaker(self, turn: Turn) -> None:
+        # the emotion streams before the reply: choose the voice now and have the engine
+        # load its model while the rest of the answer is generated
+        pool = EMOTION_TO_SPEAKER.get(turn.early["emotion"], EMOTION_TO_SPEAKER["neutral"])
+        turn.early["speaker"] = speaker = self.tts.pick_speaker(pool)
+        warmup = getattr(self.tts, "warmup", None)
+        if warmup is not None:
+            warmup.start([speaker])
+
+    async def _safety(self, turn: Turn):
+        response = turn.response
+        message = str(response.get("reply", "")).strip() or turn.user_input
+        turn.message = safety_filter(message)
+        turn.emotion = str(response.get("emotion", "neutral")).lower()
+        turn.speaker_pool = EMOTION_TO_SPEAKER.get(turn.emotion, EMOTION_TO_SPEAKER["neutral"])
+        turn.mode = response.get("mode", "talk")
+        self.history.add_turn(turn.user_input, turn.message)
+        return True
+
+    async def _chatbox(self, turn: Turn):
+        # Queued on the sender thread; a newer reply replaces unsent pages of this one
+        self.osc.typing(True)
+        turn.renderer.commit(turn.message)
+        self.osc.typing(False)
+        print(f"Bot [{turn.emotion}] [{turn.mode}]: {turn.message}")
+        return True if self.tts and turn.message and turn.mode in ("talk", "sing") else None
+
+    async def _synth(self, turn: Turn):
+        playback = self._queues[STAGES.index("playback")]
+        if turn.mode == "sing":
+            lyrics = turn.response.get("lyrics", "")
+            if turn.early.get("lyrics") == lyrics:
+                voicevox_json = turn.early["voicevox_json"]   # built while the answer was streaming
+            else:
+                voicevox_json = build_voicevox_score(lyrics)
+            audio = await asyncio.to_thread(self.tts.synthesize_song, voicevox_json)
+            await playback.put((turn, audio, None, True))
+            return False
+        # Clauses are synthesized `workers` at a time on the pool and consumed in order;
+        # one more than the pool can work on is submitted ahead, so it never queues up.
+        if "speaker" in turn.early and turn.early["emotion"] == turn.emotion:
+            speaker = turn.early["speaker"]   # picked (and warming up) while the answer streamed
+        else:
+            speaker = self.tts.pick_speaker(turn.speaker_pool)
+        window, ready = deque(), None
+        clauses = iter(split_into_clauses(turn.message))
+        while not turn.cancelled:
+            while len(window) <= self.synth_pool.workers:
+                clause = next(clauses, None)
+                if clause is None:
+                    break
+                # submit() may block on a full queue: keep it off the event loop
+                job = await asyncio.to_thread(self.synth_pool.submit, clause, speaker, tag=turn.id)
+                if job is not None:
+                    window.append(job)
+            if not window:
+                break
+            audio = await asyncio.to_thread(window.popleft().wait)
+            if audio is None:
+                continue   # nothing speakable, or failed
+            if ready is not None:
+                # playback holds at most queue_size segments: synthesis pauses when it is full
+                await playback.put((turn, ready, 21, False))
+            ready = audio
+        if turn.cancelled:
+            self.synth_pool.cancel(tag=turn.id)
+            return False
+        if ready is None:
+            return None   # nothing speakable
+        await playback.put((turn, ready, 21, True))
+        return False
+
+    async def _playback(self, item):
+        turn, (data, samplerate), device, last = item
+        if self._playing is not turn:
+            if self._playing is not None:
+                self.tts.stop()   # barge in over the previous reply
+            self._playing = turn
+        previous, turn.handle = turn.handle, self.tts.play(data, samplerate, device_index=device, wait=False)
+        # wait for the previous segment before taking the next, so the device holds at most one ahead
+        if previous is not None:
+            await self._wait_playing(turn, previous)
+        if last:
+            await self._wait_playing(turn, turn.handle)
+            return None
+        return False
+
+    async def _wait_playing(self, turn: Turn, handle) -> None:
+        # stops waiting once the turn is superseded, so the newer turn's audio can barge in
+        while not await asyncio.to_thread(handle.wait, 0.1):
+            if turn.cancelled:
+                return
+
+    def stats(self) -> dict:
+        stages = {}
+        for stage, tracker in self.latency.items():
+            if len(tracker):
+                stages[stage] = metrics.latency_ms(tracker)
+        depth = {stage: q.qsize() for stage, q in zip(STAGES, self._queues or [])}
+        stats = {**self.counters, "in_flight": len(self._active), "queue_depth": depth, "stage_latency": stages}
+        if self.synth_pool:
+            stats["synth_pool"] = self.synth_pool.stats()
+        return stats
@@ -0,0 +1,246 @@
+import contextvars
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from metrics import LatencyTracker
+from .base import LLMClient, is_fallback
+
+
+class CircuitOpenError(RuntimeError):
+    """The provider's breaker is open: it failed recently and is skipped without a request."""
+
+
+class ProviderError(RuntimeError):
+    """The provider answered, but not usefully (empty answer or the fallback echo)."""
+
+
+# ---------------------------------------------
+# Per-turn deadline
+# ---------------------------------------------
+_TURN_DEADLINE = contextvars.ContextVar("llm_turn_deadline", default=None)
+
+@contextmanager
+def turn_deadline(seconds: float):
+    """Every guarded LLM call made inside the block (also from threads started with a copied context) shares this deadline."""
+    token = _TURN_DEADLINE.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _TURN_DEADLINE.reset(token)
+
+def deadline_remaining():
+    """Seconds left of the current turn's deadline, or None outside turn_deadline()."""
+    deadline = _TURN_DEADLINE.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def start_stream(client: LLMClient, prompt: str, history, out: queue.Queue, cancel: threading.Event, tag=None):
+    """
+    Iterate client.stream() on a daemon thread, putting ("delta"|"end"|"error", tag, payload)
+    on `out`. Setting `cancel` closes the generator at its next piece; the close happens on
+    the worker thread because a generator cannot be closed while another thread is inside it.
+    The caller's contextvars (turn deadline, trace id) are copied to the thread.
+    """
+    def pump():
+        try:
+            gen = client.stream(prompt, history=history)
+            try:
+                for delta in gen:
+                    if cancel.is_set():
+                        break
+                    out.put(("delta", tag, delta))
+            finally:
+                gen.close()
+            out.put(("end", tag, None))
+        except Exception as e:
+            out.put(("error", tag, e))
+    context = contextvars.copy_context()
+    threading.Thread(target=context.run, args=(pump,), daemon=True).start()
+
+
+# ---------------------------------------------
+# Circuit breakers
+# ---------------------------------------------
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures; open -> half_open once
+    `reset_after` seconds passed, letting a single probe request through; the probe's
+    outcome closes the breaker again or re-opens it for another `reset_after`.
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = None, reset_after: float = None, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold or int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+        self.reset_after = reset_after if reset_after is not None else float(os.getenv("LLM_BREAKER_RESET_SEC", "30"))
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0          # consecutive
+        self.opened_at = None
+        self.counters = {"successes": 0, "failures": 0, "rejected": 0, "opened": 0}
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_after:
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.counters["rejected"] += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.counters["successes"] += 1
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.counters["failures"] += 1
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.counters["opened"] += 1
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+                self._probing = False
+
+    def status(self) -> dict:
+        with self._lock:
+            status = {"state": self.state, "consecutive_failures": self.failures, **self.counters}
+            if self.state == self.OPEN:
+                status["retry_in"] = round(max(0.0, self.opened_at + self.reset_after - self.clock()), 1)
+        return status
+
+
+_BREAKERS = {}
+_BREAKERS_LOCK = threading.Lock()
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Process-wide breaker per provider name, so every client of a provider shares its state."""
+    with _BREAKERS_LOCK:
+        breaker = _BREAKERS.get(name)
+        if breaker is None:
+            breaker = _BREAKERS[name] = CircuitBreaker(name)
+        return breaker
+
+def breaker_status() -> dict:
+    """{provider: breaker status} for every provider used so far."""
+    with _BREAKERS_LOCK:
+        breakers = list(_BREAKERS.values())
+    return {b.name: b.status() for b in breakers}
+
+
+# ---------------------------------------------
+# Adaptive timeouts
+# ---------------------------------------------
+class AdaptiveTimeout:
+    """
+    First-token timeout derived from observed latency: `multiplier` x the p99 of recent
+    first-token latencies, clamped to [min_timeout, max_timeout]. Until `min_samples`
+    successes were seen it is `initial`.
+    """
+    def __init__(self, initial: float = None, min_timeout: float = None, max_timeout: float = None,
+                 quantile: float = 0.99, multiplier: float = 2.0, min_samples: int = 5, window: int = 100):
+        self.initial = initial if initial is not None else float(os.getenv("LLM_TIMEOUT_SEC", "15"))
+        self.min_timeout = min_timeout if min_timeout is not None else float(os.getenv("LLM_MIN_TIMEOUT_SEC", "2"))
+        self.max_timeout = max_timeout if max_timeout is not None else float(os.getenv("LLM_MAX_TIMEOUT_SEC", "30"))
+        self.quantile = quantile
+        self.multiplier = multiplier
+        self.min_samples = min_samples
+        self.latency = LatencyTracker(window)
+
+    def record(self, seconds: float) -> None:
+        self.latency.record(seconds)
+
+    def current(self) -> float:
+        if len(self.latency) < self.min_samples:
+            return self.initial
+        return min(self.max_timeout, max(self.min_timeout, self.multiplier * self.latency.quantile(self.quantile)))
+
+
+class GuardedLLMClient(LLMClient):
+    """
+    LLMClient wrapper that turns a provider's slowness and failures into fast exceptions:
+      - CircuitOpenError right away while the provider's breaker is open
+      - TimeoutError when no first token arrives within the adaptive timeout (or the
+        turn deadline, whichever is sooner), when the stream stalls for max_timeout, or
+        when the turn deadline passes mid-stream
+      - ProviderError for an empty answer or the adapters' fallback echo
+    Each outcome is recorded on the breaker; first-token latencies feed the timeout.
+    """
+    def __init__(self, client: LLMClient, name: str = None, timeout: AdaptiveTimeout = None, clock=time.monotonic):
+        self.client = client
+        self.name = name or type(client).__name__
+        self.model = getattr(client, "model", None)
+        self.breaker = get_breaker(self.name)
+        self.timeout = timeout or AdaptiveTimeout()
+        self.clock = clock
+
+    def stream(self, prompt: str, history=None):
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"{self.name}: circuit open")
+        timeout = self.timeout.current()
+        remaining = deadline_remaining()
+        if remaining is not None:
+            timeout = min(timeout, remaining)
+        out, cancel = queue.Queue(), threading.Event()
+        started = self.clock()
+        start_stream(self.client, prompt, history, out, cancel)
+        try:
+            while True:
+                try:
+                    kind, _, payload = out.get(timeout=max(0.0, started + timeout - self.clock()))
+                except queue.Empty:
+                    self.breaker.record_failure()
+                    raise TimeoutError(f"{self.name}: no answer within {timeout:.1f}s")
+                if kind == "delta" and not payload:
+                    continue
+                if kind == "delta" and not is_fallback(payload, prompt):
+                    break
+                self.breaker.record_failure()
+                if kind == "error":
+                    raise payload
+                raise ProviderError(f"{self.name}: {'no answer' if kind == 'end' else 'fallback answer'}")
+            self.timeout.record(self.clock() - started)
+            self.breaker.record_success()
+            yield payload
+            while True:
+                wait = self.timeout.max_timeout
+                remaining = deadline_remaining()
+                by_deadline = remaining is not None and remaining < wait
+                if by_deadline:
+                    wait = max(0.0, remaining)
+                try:
+                    kind, _, payload = out.get(timeout=wait)
+                except queue.Empty:
+                    if by_deadline:
+                        # the turn ran out of time; not necessarily the provider's fault
+                        raise TimeoutError(f"{self.name}: turn deadline passed mid-stream")
+                    self.breaker.record_failure()
+                    raise TimeoutError(f"{self.name}: stream stalled")
+                if kind == "delta":
+                    yield payload
+                elif kind == "end":
+                    return
+                else:
+                    self.breaker.record_failure()
+                    raise payload
+        finally:
+            cancel.set()
+
+    def complete(self, prompt: str, history=None) -> dict:
+        from .utils import parse_llm_json_response
+        return parse_llm_json_response("".join(self.stream(prompt, history=history)).strip())
+
+    def status(self) -> dict:
+        return {**self.breaker.status(), "timeout": round(self.timeout.current(), 2)}
@@ -0,0 +1,195 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from .base import LLMClient
+from .utils import parse_llm_json_response, prepare_system_prompt
+
+
+def history_fingerprint(history) -> str:
+    """sha256 of the conversation so far ("" for no history)."""
+    if history is None:
+        return ""
+    messages = history.as_messages() if hasattr(history, "as_messages") else list(history)
+    if not messages:
+        return ""
+    payload = "\0".join([f"{m['role']}\0{m['content']}" for m in messages])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Exact-match cache of parsed LLM answers.
+
+    Two tiers, both with a TTL:
+      - memory: LRU of up to `max_entries` answers
+      - sqlite (optional): `db_path`, survives restarts; hits are promoted to memory
+    """
+    def __init__(self, max_entries: int = 512, ttl: float = 3600.0, db_path: str = None, clock=time.time):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()   # key -> (expires_at, answer)
+        self._db = None
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "expired": 0, "evictions": 0}
+        if db_path:
+            import sqlite3
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS responses "
+                             "(key TEXT PRIMARY KEY, answer TEXT NOT NULL, expires_at REAL NOT NULL)")
+            self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (self.clock(),))
+            self._db.commit()
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        """LLM_CACHE_SIZE (entries, default 512), LLM_CACHE_TTL (seconds, default 3600), LLM_CACHE_DB (sqlite path)."""
+        return cls(max_entries=int(os.getenv("LLM_CACHE_SIZE", "512")),
+                   ttl=float(os.getenv("LLM_CACHE_TTL", "3600")),
+                   db_path=os.getenv("LLM_CACHE_DB") or None)
+
+    @staticmethod
+    def key_prefix(provider: str, model: str, system_prompt: str):
+        """sha256 state over the parts fixed per client; pass it to make_key() for each request."""
+        h = hashlib.sha256()
+        for part in (provider, model, system_prompt):
+            h.update(f"{part}\0".encode("utf-8"))
+        return h
+
+    @staticmethod
+    def make_key(prefix, prompt: str, history_fp: str = "") -> str:
+        h = prefix.copy()
+        h.update(f"{prompt}\0{history_fp}\0".encode("utf-8"))
+        return h.hexdigest()
+
+    def get(self, key: str):
+        """Cached answer dict (a copy) or None."""
+        now = self.clock()
+        with self._lock:
+            hit = self._memory.get(key)
+            if hit is not None:
+                if hit[0] > now:
+                    self._memory.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    return dict(hit[1])
+                del self._memory[key]
+                self.counters["expired"] += 1
+            if self._db is not None:
+                row = self._db.execute("SELECT answer, expires_at FROM responses WHERE key = ? AND expires_at > ?",
+                                       (key, now)).fetchone()
+                if row is not None:
+                    answer = json.loads(row[0])
+                    self._remember(key, row[1], answer)
+                    self.counters["disk_hits"] += 1
+                    return dict(answer)
+            self.counters["misses"] += 1
+        return None
+
+    def put(self, key: str, answer: dict) -> None:
+        expires_at = self.clock() + self.ttl
+        with self._lock:
+            self.counters["stores"] += 1
+            self._remember(key, expires_at, dict(answer))
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?)",
+                                 (key, json.dumps(answer, ensure_ascii=False), expires_at))
+                self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+            lookups = counters["memory_hits"] + counters["disk_hits"] + counters["misses"]
+            counters.update({
+                "hit_ratio": (counters["memory_hits"] + counters["disk_hits"]) / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            })
+            if self._db is not None:
+                counters["disk_entries"] = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return counters
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _remember(self, key: str, expires_at: float, answer: dict) -> None:
+        # call with lock held
+        self._memory[key] = (expires_at, answer)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.counters["evictions"] += 1
+
+
+class CachedLLMClient(LLMClient):
+    """
+    LLMClient wrapper that answers repeated prompts from a ResponseCache.
+
+    The key covers provider, model, the rendered system prompt, the prompt and a
+    fingerprint of the history, so the same words in a different conversation still
+    go to the LLM. The adapters' fallback (user input echoed back as the reply) is
+    never cached. stream() yields the cached answer as one JSON piece on a hit.
+    """
+    def __init__(self, client: LLMClient, cache: ResponseCache = None):
+        self.client = client
+        self.cache = cache or ResponseCache.from_env()
+        self.provider = type(client).__name__
+        self.model = getattr(client, "model", None)
+        # rendered and hashed once: the template only depends on constants
+        self.system_prompt = prepare_system_prompt()
+        self._key_prefix = ResponseCache.key_prefix(self.provider, self.model, self.system_prompt)
+
+    def _key(self, prompt: str, history) -> str:
+        return ResponseCache.make_key(self._key_prefix, prompt.strip(), history_fingerprint(history))
+
+    def _store(self, key: str, prompt: str, answer) -> None:
+        if not isinstance(answer, dict):
+            return
+        if str(answer.get("reply", "")).strip() == prompt.strip():
+            return   # fallback echo
+        self.cache.put(key, answer)
+
+    def complete(self, prompt: str, history=None) -> dict:
+        key = self._key(prompt, history)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        answer = self.client.complete(prompt, history=history)
+        self._store(key, prompt, answer)
+        return answer
+
+    def stream(self, prompt: str, history=None):
+        key = self._key(prompt, history)
+        cached = self.cache.get(key)
+        if cached is not None:
+            yield json.dumps(cached, ensure_ascii=False)
+            return
+        pieces = []
+        for delta in self.client.stream(prompt, history=history):
+            pieces.append(delta)
+            yield delta
+        # only reached when the whole answer was consumed
+        self._store(key, prompt, parse_llm_json_response("".join(pieces).strip()))
+
+    def stats(self) -> dict:
+        return self.cache.stats()
+
+
+def with_response_cache(client: LLMClient) -> LLMClient:
+    """Wrap `client` in a CachedLLMClient configured from env; LLM_CACHE_SIZE=0 turns caching off."""
+    cache = ResponseCache.from_env()
+    if cache.max_entries <= 0:
+        cache.close()
+        return client
+    return CachedLLMClient(client, cache)
@@ -0,0 +1,110 @@
+import os
+import random
+import threading
+from collections import OrderedDict
+
+
+class SpeakerPolicy:
+    """Chooses a VOICEVOX style id from a pool (an emotion's ids, or the singing styles)."""
+    name = "base"
+
+    def __init__(self, rng=None):
+        self.rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self.counters = {"picks": 0}
+
+    def choose(self, pool, key=None) -> int:
+        raise NotImplementedError
+
+    def _count(self, name: str) -> None:
+        # call with lock held
+        self.counters[name] = self.counters.get(name, 0) + 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"policy": self.name, **self.counters}
+
+
+class RandomPolicy(SpeakerPolicy):
+    """Uniform pick from the pool on every utterance (the original behaviour)."""
+    name = "random"
+
+    def choose(self, pool, key=None) -> int:
+        with self._lock:
+            self._count("picks")
+        return self.rng.choice(list(pool))
+
+
+class WarmFirstPolicy(SpeakerPolicy):
+    """
+    Keeps the engine on a small set of loaded models:
+      1. sticky: the style last used for this pool (`key`) in this session, if enabled
+         and still hot
+      2. hot: a style from the pool that this session has used recently
+      3. warm: a style the engine already loaded (pre-warm or an earlier synthesis)
+      4. cold: any style from the pool
+    At most `max_hot` distinct styles are hot; when a new one is needed, the least
+    recently used hot style is dropped, so a long session cycles through few models.
+    """
+    name = "warm_first"
+
+    def __init__(self, is_warm=None, max_hot: int = 8, sticky: bool = True, rng=None):
+        super().__init__(rng)
+        self.is_warm = is_warm or (lambda style: False)
+        self.max_hot = max(1, max_hot)
+        self.sticky = sticky
+        self._hot = OrderedDict()      # style -> None, least recently used first
+        self._session = {}             # pool key -> style
+
+    def choose(self, pool, key=None) -> int:
+        pool = list(pool)
+        key = key if key is not None else tuple(pool)
+        with self._lock:
+            self._count("picks")
+            style = self._session.get(key) if self.sticky else None
+            if style in pool and style in self._hot:
+                self._count("sticky")
+            else:
+                # a sticky style that was evicted would bring its model back past max_hot
+                self._session.pop(key, None)
+                hot = [s for s in pool if s in self._hot]
+                warm = [s for s in pool if self.is_warm(s)] if not hot else []
+                if hot:
+                    style = self.rng.choice(hot)
+                    self._count("hot")
+                elif warm:
+                    style = self.rng.choice(warm)
+                    self._count("warm")
+                else:
+                    style = self.rng.choice(pool)
+                    self._count("cold")
+            self._session[key] = style
+            self._hot[style] = None
+            self._hot.move_to_end(style)
+            while len(self._hot) > self.max_hot:
+                self._hot.popitem(last=False)
+                self._count("hot_evictions")
+        return style
+
+    def reset_session(self) -> None:
+        """Forget sticky voices (e.g. for a new conversation); hot styles stay hot."""
+        with self._lock:
+            self._session.clear()
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        with self._lock:
+            stats.update({"hot_styles": list(self._hot), "max_hot": self.max_hot, "sticky_voices": self.sticky})
+        return stats
+
+
+def get_speaker_policy(is_warm=None, name: str = None) -> SpeakerPolicy:
+    """VOICEVOX_SPEAKER_POLICY: warm_first (default) or random; VOICEVOX_MAX_HOT_STYLES (8), VOICEVOX_STICKY_VOICE (1)."""
+    name = (name or os.getenv("VOICEVOX_SPEAKER_POLICY", "warm_first")).lower()
+    if name == "random":
+        return RandomPolicy()
+    if name == "warm_first":
+        return WarmFirstPolicy(is_warm=is_warm,
+                               max_hot=int(os.getenv("VOICEVOX_MAX_HOT_STYLES", "8")),
+                               sticky=os.getenv("VOICEVOX_STICKY_VOICE", "1") == "1")
+    raise ValueError(f"Unknown VOICEVOX_SPEAKER_POLICY: {name}")
@@ -0,0 +1,146 @@
+import os
+import threading
+import time
+from collections import deque
+from constants import EMOTION_TO_SPEAKER, SINGING_SPEAKERS
+
+
+def resolve_styles(spec: str) -> list:
+    """
+    Style ids for a warm-up spec, in order, without duplicates. Comma separated items:
+      - "all": every talk style in EMOTION_TO_SPEAKER (neutral first)
+      - "sing": every singing style in SINGING_SPEAKERS
+      - an emotion name ("happy"): that emotion's pool
+      - a number: that style id
+    """
+    styles = []
+    for item in (part.strip().lower() for part in (spec or "").split(",")):
+        if not item:
+            continue
+        if item == "all":
+            styles += EMOTION_TO_SPEAKER["neutral"]
+            styles += [s for pool in EMOTION_TO_SPEAKER.values() for s in pool]
+        elif item == "sing":
+            styles += [s for group in SINGING_SPEAKERS.values() for s in group]
+        elif item in EMOTION_TO_SPEAKER:
+            styles += EMOTION_TO_SPEAKER[item]
+        elif item.isdigit():
+            styles.append(int(item))
+        else:
+            print(f"[warmup] ignoring unknown style spec: {item!r}")
+    return list(dict.fromkeys(styles))
+
+
+def _print_progress(done: int, total: int, style: int, ok: bool, seconds: float) -> None:
+    status = "ok" if ok else "failed"
+    print(f"[warmup] {done}/{total} style {style} {status} ({seconds:.1f}s)")
+
+
+class SpeakerWarmup:
+    """
+    Loads VOICEVOX style models ahead of their first utterance via
+    POST /initialize_speaker?speaker=ID&skip_reinit=true, at most `concurrency` at a time,
+    on daemon threads, so a slow or unreachable engine never delays interpreter exit. Tracks which styles are warm: warmed here, or used successfully
+    by a synthesis (mark_warm), since the engine then has the model loaded as well.
+    """
+    def __init__(self, http, concurrency: int = 2, progress=_print_progress):
+        self.http = http
+        self.concurrency = max(1, concurrency)
+        self.progress = progress
+        self._lock = threading.Lock()
+        self._warm = set()
+        self._failed = {}            # style -> last error
+        self._pending = set()
+        self._done = threading.Event()
+        self._done.set()
+        self._todo = deque()
+        self._workers = 0
+        self._closed = False
+        self.total = 0
+        self.completed = 0
+        self.seconds = 0.0
+
+    @classmethod
+    def from_env(cls, http) -> "SpeakerWarmup":
+        """VOICEVOX_WARMUP_CONCURRENCY (default 2)."""
+        return cls(http, concurrency=int(os.getenv("VOICEVOX_WARMUP_CONCURRENCY", "2")))
+
+    def is_warm(self, style: int) -> bool:
+        return style in self._warm
+
+    def warm_styles(self) -> set:
+        with self._lock:
+            return set(self._warm)
+
+    def mark_warm(self, style: int) -> None:
+        with self._lock:
+            self._warm.add(style)
+            self._failed.pop(style, None)
+
+    def start(self, styles) -> int:
+        """Queue styles that are not warm or already queued; returns how many were queued."""
+        with self._lock:
+            if self._closed:
+                return 0
+            todo = [s for s in dict.fromkeys(styles) if s not in self._warm and s not in self._pending]
+            if not todo:
+                return 0
+            self._pending.update(todo)
+            self._todo.extend(todo)
+            self.total += len(todo)
+            self._done.clear()
+            spawn = min(self.concurrency - self._workers, len(self._todo))
+            self._workers += spawn
+        for _ in range(spawn):
+            threading.Thread(target=self._work, name="voicevox-warmup", daemon=True).start()
+        return len(todo)
+
+    def _work(self) -> None:
+        while True:
+            with self._lock:
+                if self._closed or not self._todo:
+                    self._workers -= 1
+                    return
+                style = self._todo.popleft()
+            self._initialize(style)
+
+    def _initialize(self, style: int) -> None:
+        t0 = time.perf_counter()
+        ok = False
+        try:
+            resp = self.http.post("/initialize_speaker", params={"speaker": style, "skip_reinit": "true"})
+            resp.raise_for_status()
+            ok = True
+        except Exception as e:
+            with self._lock:
+                self._failed[style] = str(e)
+        seconds = time.perf_counter() - t0
+        with self._lock:
+            if ok:
+                self._warm.add(style)
+            self._pending.discard(style)
+            self.completed += 1
+            self.seconds += seconds
+            done, total = self.completed, self.total
+            if not self._pending:
+                self._done.set()
+        if self.progress:
+            self.progress(done, total, style, ok, seconds)
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until everything queued so far was tried; False on timeout."""
+        return self._done.wait(timeout)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"warm": len(self._warm), "pending": len(self._pending), "failed": dict(self._failed),
+                    "completed": self.completed, "total": self.total, "seconds": round(self.seconds, 2)}
+
+    def close(self) -> None:
+        """Drop styles not started yet; requests already in flight finish on their own."""
+        with self._lock:
+            self._closed = True
+            self._pending.difference_update(self._todo)
+            self._todo.clear()
+            if not self._pending:
+                self._done.set()
@@ -2,6 +2,8 @@ class ChatState:
     def __init__(self):
         self.emotion = "neutral"   # current forced emotion
         self.call_llm = False      # True = LLM, False = TTS
+        self.cleaned_input = ""    # last input with the markers removed
+        self.person = "first"      # "third" after an uppercase "T:" marker
 
 # singleton instance
 chat_state = ChatState()
\ No newline at end of file
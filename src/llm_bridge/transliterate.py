@@ -0,0 +1,126 @@
+import re
+from functools import lru_cache
+from constants import EN_DICT, ROMAJI_TO_KATAKANA
+
+# An English word (with inner apostrophes: DON'T); anything else (punctuation, kana, kanji) is a token boundary
+_WORD = r"[A-Za-z0-9]+(?:'[A-Za-z]+)*"
+# roman_to_kana keeps these as-is, every other unknown character becomes ン
+_ROMAJI_KEEP = " ~!,.?"
+
+
+def _trie_pattern(keys) -> str:
+    """
+    Regex for a character trie of `keys`. Children come before the node's own match and
+    the node group is optional, so the regex engine always takes the longest key
+    (the same result as trying 3-, then 2-, then 1-char slices).
+    """
+    trie = {}
+    for key in keys:
+        node = trie
+        for ch in key:
+            node = node.setdefault(ch, {})
+        node[None] = True
+
+    def build(node) -> str:
+        alternatives = [re.escape(ch) + build(node[ch]) for ch in sorted(c for c in node if c is not None)]
+        if not alternatives:
+            return ""
+        group = "(?:" + "|".join(alternatives) + ")"
+        return group + "?" if None in node else group
+
+    return build(trie)
+
+
+class Transliterator:
+    """
+    English/romaji -> katakana for VOICEVOX, precompiled once from the phrase and romaji tables.
+
+    Phrases are matched longest-first through a word-level trie, so multi-word entries
+    ("THANK YOU", "ICE CREAM") win over their first word; words of a phrase may only be
+    separated by whitespace. Punctuation and kana are token boundaries and do not stick
+    to words ("HELLO!" -> ハロー!). Words that are not in `phrases` are looked up in the
+    optional on-disk `lexicon` (llm_bridge.lexicon.Lexicon) before falling back to
+    spelling out acronyms. Results are memoized per input string.
+    """
+    def __init__(self, phrases: dict = EN_DICT, romaji: dict = ROMAJI_TO_KATAKANA, cache_size: int = 4096,
+                 lexicon=None):
+        self.phrases = {" ".join(k.upper().split()): v for k, v in phrases.items()}
+        self.lexicon = lexicon
+        self.romaji = dict(romaji)
+
+        # word-level trie: {WORD: {NEXT_WORD: {...}, None: kana}}
+        self._phrase_trie = {}
+        for key, kana in self.phrases.items():
+            node = self._phrase_trie
+            for word in key.split():
+                node = node.setdefault(word, {})
+            node[None] = kana
+        self._words = re.compile(f"({_WORD})")
+        self._spaces = re.compile(r"\s+")
+
+        self._romaji_table = {c: c for c in _ROMAJI_KEEP}
+        self._romaji_table.update(self.romaji)
+        romaji_trie = _trie_pattern(self.romaji)
+        self._romaji = re.compile(f"{romaji_trie}|." if romaji_trie else ".", re.DOTALL)
+
+        self.transliterate = lru_cache(maxsize=cache_size)(self._transliterate)
+        self.roman_to_kana = lru_cache(maxsize=cache_size)(self._roman_to_kana)
+
+    def transliterate_many(self, texts) -> list:
+        """Batch form of transliterate(); repeated lines are served from the memo."""
+        return [self.transliterate(t) for t in texts]
+
+    def cache_info(self) -> dict:
+        return {"transliterate": self.transliterate.cache_info(), "roman_to_kana": self.roman_to_kana.cache_info()}
+
+    def _transliterate(self, text: str) -> str:
+        # [sep, word, sep, word, ..., sep]: words at odd indexes
+        parts = self._words.split(text)
+        trie = self._phrase_trie
+        lexicon = self.lexicon
+        i = 1
+        while i < len(parts):
+            # longest phrase starting at this word; words of a phrase may only be separated by whitespace
+            node = trie.get(parts[i].upper())
+            match, end, j = None, i, i
+            while node is not None:
+                if None in node:
+                    match, end = node[None], j
+                j += 2
+                if j >= len(parts) or not parts[j - 1].isspace():
+                    break
+                node = node.get(parts[j].upper())
+            if match is not None:
+                parts[i] = match
+                for k in range(i + 1, end + 1):
+                    parts[k] = ""
+                i = end
+            else:
+                kana = lexicon.get(parts[i]) if lexicon is not None else None
+                if kana is not None:
+                    parts[i] = kana
+                elif parts[i].isupper():
+                    # acronym: spell it out letter by letter
+                    parts[i] = " ".join(self.phrases.get(c, c) for c in parts[i])
+            i += 2
+        return self._spaces.sub(" ", "".join(parts)).strip()
+
+    def _roman_to_kana(self, text: str) -> str:
+        """Greedy longest-match (3/2/1 chars) romaji -> katakana; see utils.roman_to_kana."""
+        table = self._romaji_table
+        return "".join([table.get(t, "ン") for t in self._romaji.findall(text.lower())])
+
+
+_default = None
+
+
+def get_transliterator() -> Transliterator:
+    """
+    Shared instance built from constants.EN_DICT / ROMAJI_TO_KATAKANA on first use,
+    backed by the compiled lexicon at EN_LEXICON_PATH when set.
+    """
+    global _default
+    if _default is None:
+        from llm_bridge.lexicon import get_lexicon
+        _default = Transliterator(lexicon=get_lexicon())
+    return _default
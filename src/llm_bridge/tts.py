@@ -1,11 +1,18 @@
 import pyttsx3, threading
+from llm_bridge.tts_worker import OrderedTTSPool
 class TTSClient:
     def __init__(self, rate: int = 175, volume: float = 0.9):
         self.engine = pyttsx3.init(); self.engine.setProperty("rate", rate); self.engine.setProperty("volume", volume)
         self._lock = threading.Lock()
+        # pyttsx3 speaks as it synthesizes, so one worker; a burst beyond TTS_QUEUE_SIZE is merged into one utterance
+        self.pool = OrderedTTSPool.from_env(self._speak_blocking, prefix="TTS", workers=1, max_queue=4, policy="merge", name="pyttsx3")
     def _speak_blocking(self, text: str):
         with self._lock:
             self.engine.say(text); self.engine.runAndWait()
     def speak(self, text: str):
         if not str(text).strip(): return
-        threading.Thread(target=self._speak_blocking, args=(text,), daemon=True).start()
+        return self.pool.submit(str(text))
+    def stats(self) -> dict:
+        return self.pool.stats()
+    def close(self):
+        self.pool.close()
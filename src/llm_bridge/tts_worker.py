@@ -0,0 +1,201 @@
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+import metrics
+
+POLICIES = ("block", "drop_oldest", "drop_newest", "merge")
+
+
+class TTSJob:
+    """One utterance queued on an OrderedTTSPool. wait() returns the synthesized result, or None if dropped/failed."""
+    __slots__ = ("seq", "text", "args", "tag", "enqueued", "started", "result", "error", "cancelled", "context", "_done")
+
+    def __init__(self, seq: int, text: str, args: tuple, tag):
+        self.seq = seq
+        self.text = text
+        self.args = args
+        self.tag = tag
+        self.enqueued = time.perf_counter()
+        self.started = None
+        self.result = None
+        self.error = None
+        self.cancelled = False
+        self.context = contextvars.copy_context()   # submitter's trace id follows the job to its worker
+        self._done = threading.Event()
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        self._done.wait(timeout)
+        return self.result
+
+
+class OrderedTTSPool:
+    """
+    Fixed number of synthesis workers behind a bounded queue.
+
+    Jobs are synthesized concurrently (`workers` at a time) but, when `deliver` is given,
+    handed to it strictly in submission order by a single delivery thread, so audio never
+    plays out of order. At most `max_queue` jobs wait for a worker; when the queue is full
+    `policy` decides:
+      - block:        submit() waits for room
+      - drop_oldest:  the longest-waiting job is dropped (the freshest speech wins)
+      - drop_newest:  the new job is rejected, submit() returns None
+      - merge:        the new text is appended to the last waiting job with the same
+                      args and tag (one longer utterance); drop_oldest if there is none
+    """
+    def __init__(self, synthesize, deliver=None, workers: int = 2, max_queue: int = 8,
+                 policy: str = "drop_oldest", name: str = "tts", separator: str = " "):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown TTS queue policy: {policy} (one of {', '.join(POLICIES)})")
+        self.synthesize = synthesize
+        self.deliver = deliver
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self.policy = policy
+        self.separator = separator
+        self._cond = threading.Condition()
+        self._pending = deque()        # waiting for a worker
+        self._running = set()
+        self._order = deque()          # with `deliver`: every job not yet delivered, in submission order
+        self._seq = 0
+        self._closed = False
+        self.wait_time = metrics.LatencyTracker(window=200)
+        self.synth_time = metrics.LatencyTracker(window=200)
+        self.counters = {"submitted": 0, "synthesized": 0, "delivered": 0, "dropped": 0, "merged": 0,
+                         "cancelled": 0, "failed": 0, "max_depth": 0}
+        self._threads = [threading.Thread(target=self._work, name=f"{name}-worker-{i}", daemon=True)
+                         for i in range(self.workers)]
+        if deliver is not None:
+            self._threads.append(threading.Thread(target=self._deliver, name=f"{name}-deliver", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    @classmethod
+    def from_env(cls, synthesize, deliver=None, prefix: str = "TTS", **defaults) -> "OrderedTTSPool":
+        """{prefix}_WORKERS, {prefix}_QUEUE_SIZE, {prefix}_QUEUE_POLICY override the given defaults."""
+        kwargs = dict(defaults)
+        for key, env, cast in (("workers", "WORKERS", int), ("max_queue", "QUEUE_SIZE", int),
+                               ("policy", "QUEUE_POLICY", str)):
+            value = os.getenv(f"{prefix}_{env}")
+            if value:
+                kwargs[key] = cast(value)
+        return cls(synthesize, deliver=deliver, **kwargs)
+
+    def submit(self, text: str, *args, tag=None):
+        """Queue `synthesize(text, *args)`; returns the TTSJob, or None if the policy rejected it."""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("OrderedTTSPool is closed")
+            self.counters["submitted"] += 1
+            if len(self._pending) >= self.max_queue:
+                if self.policy == "block":
+                    while len(self._pending) >= self.max_queue and not self._closed:
+                        self._cond.wait()
+                    if self._closed:
+                        raise RuntimeError("OrderedTTSPool is closed")
+                elif self.policy == "drop_newest":
+                    self.counters["dropped"] += 1
+                    return None
+                elif self.policy == "merge" and self._merge(text, args, tag):
+                    return self._pending[-1]
+                else:
+                    self._drop(self._pending.popleft(), "dropped")
+            self._seq += 1
+            job = TTSJob(self._seq, text, args, tag)
+            self._pending.append(job)
+            if self.deliver is not None:
+                self._order.append(job)
+            self.counters["max_depth"] = max(self.counters["max_depth"], len(self._pending))
+            self._cond.notify_all()
+            return job
+
+    def _merge(self, text: str, args: tuple, tag) -> bool:
+        # call with lock held
+        last = self._pending[-1]
+        if last.args != args or last.tag != tag:
+            return False
+        last.text = f"{last.text}{self.separator}{text}"
+        self.counters["merged"] += 1
+        return True
+
+    def _drop(self, job: TTSJob, reason: str) -> None:
+        # call with lock held; the job stays in _order, so delivery skips past it in turn
+        job.cancelled = True
+        self.counters[reason] += 1
+        job._done.set()
+        self._cond.notify_all()
+
+    def cancel(self, tag=None) -> int:
+        """Drop waiting jobs (all, or those with `tag`); jobs already synthesizing finish but are not delivered."""
+        with self._cond:
+            waiting = [j for j in self._pending if tag is None or j.tag == tag]
+            self._pending = deque(j for j in self._pending if j not in waiting)
+            for job in waiting:
+                self._drop(job, "cancelled")
+            for job in self._running:
+                if tag is None or job.tag == tag:
+                    job.cancelled = True
+            return len(waiting)
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                job = self._pending.popleft()
+                self._running.add(job)
+                job.started = time.perf_counter()
+                self._cond.notify_all()   # room for a blocked submit()
+            self.wait_time.record(job.started - job.enqueued)
+            job.context.run(metrics.observe, "tts_queue_wait_seconds", job.started - job.enqueued)
+            try:
+                result = job.context.run(self.synthesize, job.text, *job.args)
+            except Exception as e:
+                print(f"[tts] synthesis failed: {e}")
+                result, job.error = None, e
+            self.synth_time.record(time.perf_counter() - job.started)
+            with self._cond:
+                self._running.discard(job)
+                self.counters["failed" if job.error else "synthesized"] += 1
+                job.result = None if job.cancelled else result
+                job._done.set()
+                self._cond.notify_all()
+
+    def _deliver(self) -> None:
+        while True:
+            with self._cond:
+                while not (self._order and self._order[0].done()) and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                job = self._order.popleft()
+            if job.result is not None and not job.cancelled:
+                try:
+                    self.deliver(job.result, job)
+                except Exception as e:
+                    print(f"[tts] playback failed: {e}")
+                with self._cond:
+                    self.counters["delivered"] += 1
+
+    def stats(self) -> dict:
+        with self._cond:
+            stats = {"policy": self.policy, "workers": self.workers, "depth": len(self._pending),
+                     "max_queue": self.max_queue, **self.counters}
+        stats.update(metrics.latency_ms(self.wait_time, "wait_"))
+        stats.update(metrics.latency_ms(self.synth_time, "synth_"))
+        return stats
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            for job in self._pending:
+                job.cancelled = True
+                job._done.set()
+            self._pending.clear()
+            self._cond.notify_all()
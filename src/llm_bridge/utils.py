@@ -1,19 +1,30 @@
 import os, re, time, random
 import json
-import romkan
-from music21 import stream, note, meter, converter
+import threading
 from llm_bridge.state import chat_state
+from llm_bridge.history import message_tokens
+from llm_bridge.resilience import CircuitOpenError, deadline_remaining, turn_deadline
+import metrics
 from constants import JSON_PROMPT_TEMPLATE, EMOTION_TO_SPEAKER, MODE_TO_SPEAKER, ROMAJI_TO_KATAKANA, KANA_TO_PHONEME, PREFIX_TO_EMOTION
 
 
 
-def retry_with_backoff(func):
-    retries=int(os.getenv('MAX_RETRIES','3')); base=int(os.getenv('BACKOFF_BASE_SEC','2'))
-    for i in range(retries):
-        try: return func()
-        except Exception:
-            if i==retries-1: raise
-            time.sleep(base*(2**i)+random.random())
+def retry_with_backoff(func, deadline=None):
+    """
+    Call func, retrying failures with exponential backoff, all within one per-turn deadline
+    (LLM_TURN_DEADLINE_SEC, default 20s) that GuardedLLMClient timeouts also respect.
+    No retry once every provider's circuit is open, or when the pause would pass the deadline.
+    """
+    retries=int(os.getenv('MAX_RETRIES','3')); base=float(os.getenv('BACKOFF_BASE_SEC','2'))
+    deadline=deadline if deadline is not None else float(os.getenv('LLM_TURN_DEADLINE_SEC','20'))
+    with turn_deadline(deadline), metrics.span("llm_turn_seconds"):
+        for i in range(retries):
+            try: return func()
+            except CircuitOpenError: raise
+            except Exception:
+                pause=base*(2**i)+random.random()
+                if i==retries-1 or deadline_remaining()<=pause: raise
+                time.sleep(pause); metrics.observe("llm_retry_sleep_seconds", pause)
 
 def safety_filter(text, max_len=2048):
     if not text or not str(text).strip(): return '[Filtered: empty]'
@@ -23,54 +34,64 @@ def safety_filter(text, max_len=2048):
     return t[:max_len]
 
 import re
+from typing import NamedTuple
+
+_LLM_MARKER = re.compile(r'(^| )([a-zA-Z]?t:|t:[a-zA-Z]?)( |$)', re.IGNORECASE)
+
+class ParsedInput(NamedTuple):
+    call_llm: bool   # True = LLM, False = TTS
+    emotion: str     # forced emotion ("neutral" if none)
+    text: str        # input with the markers removed
+    person: str      # "third" if the marker was an uppercase "T:", else "first"
 
-def parse_input(user_input: str) -> None:
+    @property
+    def prompt(self) -> str:
+        """Text for the LLM; keeps the "T:" that JSON_PROMPT_TEMPLATE uses to ask for third person."""
+        return f"T: {self.text}" if self.person == "third" else self.text
+
+def parse_command(user_input: str) -> ParsedInput:
     """
-    Parse user input for LLM and emotion markers.
+    Parse user input for LLM and emotion markers. Pure function, safe from any thread.
     Supported:
       - "t:" (LLM only)
       - "t:<letter>" or "<letter>t:" (LLM + emotion)
       - "<letter>" at start or end (emotion only)
     """
     text = user_input.strip()
-    chat_state.emotion = "neutral"
-    chat_state.call_llm = False
-    cleaned = text
+    emotion = "neutral"
 
     # --- Step 1: Look for LLM markers ---
-    llm_match = re.search(r'(^| )([a-zA-Z]?t:|t:[a-zA-Z]?)( |$)', text, re.IGNORECASE)
+    llm_match = _LLM_MARKER.search(text) if ":" in text else None
     if llm_match:
         token = llm_match.group(2)
-        chat_state.call_llm = True
-        # Case: "t:<letter>"
-        if token.lower().startswith("t:") and len(token) > 2:
-            letter = token[2].lower()
-            if letter in PREFIX_TO_EMOTION:
-                chat_state.emotion = PREFIX_TO_EMOTION[letter]
-        # Case: "<letter>t:"
-        elif token.lower().endswith("t:") and len(token) > 2:
-            letter = token[0].lower()
-            if letter in PREFIX_TO_EMOTION:
-                chat_state.emotion = PREFIX_TO_EMOTION[letter]
-        cleaned = text.replace(token, "").strip()
-
-    # --- Step 2: If no LLM, check for single-letter emotion token ---
-    if not chat_state.call_llm:
-        tokens = cleaned.split()
-        if tokens:
-            # Check first token
-            if len(tokens[0]) == 1 and tokens[0].lower() in PREFIX_TO_EMOTION:
-                chat_state.emotion = PREFIX_TO_EMOTION[tokens[0].lower()]
-                tokens = tokens[1:]
-            # Check last token
-            elif len(tokens[-1]) == 1 and tokens[-1].lower() in PREFIX_TO_EMOTION:
-                chat_state.emotion = PREFIX_TO_EMOTION[tokens[-1].lower()]
-                tokens = tokens[:-1]
-            cleaned = " ".join(tokens)
-
-
-
-    chat_state.cleaned_input = cleaned
+        if len(token) > 2:
+            # "t:<letter>" or "<letter>t:"
+            letter = token[2].lower() if token[:2].lower() == "t:" else token[0].lower()
+            emotion = PREFIX_TO_EMOTION.get(letter, emotion)
+        person = "third" if "T:" in token else "first"
+        return ParsedInput(True, emotion, text.replace(token, "").strip(), person)
+
+    # --- Step 2: No LLM, check for single-letter emotion token ---
+    tokens = text.split()
+    if tokens:
+        # Check first token
+        if len(tokens[0]) == 1 and tokens[0].lower() in PREFIX_TO_EMOTION:
+            emotion = PREFIX_TO_EMOTION[tokens[0].lower()]
+            tokens = tokens[1:]
+        # Check last token
+        elif len(tokens[-1]) == 1 and tokens[-1].lower() in PREFIX_TO_EMOTION:
+            emotion = PREFIX_TO_EMOTION[tokens[-1].lower()]
+            tokens = tokens[:-1]
+    return ParsedInput(False, emotion, " ".join(tokens), "first")
+
+def parse_input(user_input: str) -> ParsedInput:
+    """parse_command() that also stores the result on the global chat_state (kept for older callers)."""
+    parsed = parse_command(user_input)
+    chat_state.emotion = parsed.emotion
+    chat_state.call_llm = parsed.call_llm
+    chat_state.cleaned_input = parsed.text
+    chat_state.person = parsed.person
+    return parsed
 
 def prepare_system_prompt() -> str:
     return JSON_PROMPT_TEMPLATE.format(
@@ -88,19 +109,127 @@ def parse_llm_json_response(raw: str) -> dict:
         data = {"reply": cleaned, "emotion": "neutral", "mode": "talk"}
     return data
 
-def complete_with_client(client, model: str, prompt: str) -> dict:
+class PromptTokenMetrics:
+    """Prompt size per request: estimated from the messages, and as reported by the API when it does."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.last = 0
+        self.max = 0
+        self.total = 0
+        self.reported_total = 0
+        self.reported_requests = 0
+
+    def record(self, estimated: int) -> None:
+        with self._lock:
+            self.requests += 1
+            self.last = estimated
+            self.max = max(self.max, estimated)
+            self.total += estimated
+
+    def record_reported(self, prompt_tokens: int) -> None:
+        with self._lock:
+            self.reported_requests += 1
+            self.reported_total += prompt_tokens
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"requests": self.requests, "last": self.last, "max": self.max,
+                    "mean": self.total / self.requests if self.requests else 0.0,
+                    "reported_mean": self.reported_total / self.reported_requests if self.reported_requests else None}
+
+PROMPT_METRICS = PromptTokenMetrics()
+
+def _build_messages(prompt: str, history=None) -> list:
+    """System prompt, then the (token-budgeted) history, then the user prompt."""
     system_prompt = prepare_system_prompt()
     user_prompt = prompt.strip()
     print(user_prompt)
+    if history is None:
+        past = []
+    elif hasattr(history, "as_messages"):
+        past = history.as_messages()
+    else:
+        past = list(history)
+    messages = [{"role": "system", "content": system_prompt}, *past, {"role": "user", "content": user_prompt}]
+    PROMPT_METRICS.record(message_tokens(messages))
+    return messages
+
+def complete_with_client(client, model: str, prompt: str, history=None) -> dict:
+    with metrics.span("llm_request_seconds", kind="complete", model=model):
+        resp = client.chat.completions.create(
+            model=model,
+            messages=_build_messages(prompt, history),
+            max_tokens=200
+        )
+    usage = getattr(resp, "usage", None)
+    if usage is not None and getattr(usage, "prompt_tokens", None):
+        PROMPT_METRICS.record_reported(usage.prompt_tokens)
+    return parse_llm_json_response(resp.choices[0].message.content.strip())
+
+def stream_with_client(client, model: str, prompt: str, history=None):
+    """
+    Same request as complete_with_client but with stream=True.
+    Yields raw text deltas as they arrive; feed them to json_stream.ReplyStreamParser.
+    Works with both openai.OpenAI and huggingface_hub.InferenceClient.
+    """
+    start = time.perf_counter()
     resp = client.chat.completions.create(
         model=model,
-        messages=[{"role": "system", "content": system_prompt},{"role": "user", "content": user_prompt}],
-        max_tokens=200
+        messages=_build_messages(prompt, history),
+        max_tokens=200,
+        stream=True
     )
-    return parse_llm_json_response(resp.choices[0].message.content.strip())
+    first = True
+    try:
+        for chunk in resp:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if first:
+                    first = False
+                    metrics.observe("llm_request_seconds", time.perf_counter() - start, kind="stream_first_token", model=model)
+                yield delta
+    finally:
+        metrics.observe("llm_request_seconds", time.perf_counter() - start, kind="stream_total", model=model)
+        # Closing early (consumer stopped iterating) drops the HTTP response
+        close = getattr(resp, "close", None)
+        if close:
+            close()
+
+
+_SENTENCE_END_RE = re.compile(r'(?<=[。！？!?…\n])|(?<=\.)(?=\s)')
+_CLAUSE_END_RE = re.compile(r'(?<=[、，,;；:：])')
+
+def split_into_clauses(text: str, max_chars: int = 60, min_chars: int = 8) -> list:
+    """
+    Split a reply into speakable segments for pipelined TTS.
+    Sentences are split at 。！？!?… / newlines / ". "; the first sentence and any sentence
+    longer than max_chars are split further at commas, so the first segment is short.
+    Segments shorter than min_chars are merged into the next one.
+    """
+    segments = []
+    for sentence in _SENTENCE_END_RE.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if not segments or len(sentence) > max_chars:
+            pieces = [p.strip() for p in _CLAUSE_END_RE.split(sentence) if p.strip()]
+        else:
+            pieces = [sentence]
+        for piece in pieces:
+            if segments and len(segments[-1]) < min_chars:
+                sep = " " if segments[-1][-1].isascii() else ""
+                segments[-1] = f"{segments[-1]}{sep}{piece}"
+            else:
+                segments.append(piece)
+    return segments
 
 
 def text_to_musicxml(text: str, outfile="temp.musicxml"):
+    # music21/romkan take ~1s to import; load them only when a MusicXML path is actually used
+    from music21 import stream, note, meter
     s = stream.Score()
     part = stream.Part()
     part.append(meter.TimeSignature("4/4"))
@@ -123,6 +252,7 @@ def musicxml_to_voicevox_json(musicxml_file):
     """
     Parse a MusicXML file and return VOICEVOX JSON dict with notes.
     """
+    from music21 import converter
     score = converter.parse(musicxml_file)
     notes_list = []
 
@@ -150,38 +280,55 @@ def musicxml_to_voicevox_json(musicxml_file):
 
     return {"notes": notes_list}
 
+# -------------------------
+# Direct lyrics -> VOICEVOX score (no music21, no temp file)
+# -------------------------
+# romkan.to_katakana only changes these single characters (case-insensitive)
+_SINGLE_ROMAJI = {"a": "ア", "i": "イ", "u": "ウ", "e": "エ", "o": "オ", "n": "ン"}
+_NOTE_LYRICS = {}
+
+def _note_lyric(ch: str) -> str:
+    """Lyric for a one-character note, as convert_lyrics_to_kana would produce it."""
+    kana = _NOTE_LYRICS.get(ch)
+    if kana is None:
+        low = ch.lower()[0]
+        kana = _SINGLE_ROMAJI.get(low, low)
+        if kana == "ー":
+            kana = "ア"
+        _NOTE_LYRICS[ch] = kana
+    return kana
+
+def build_voicevox_score(lyrics: str, key: int = 60, frame_length: int = 45, musicxml_path: str = None) -> dict:
+    """
+    Build the {"notes": [...]} score for /sing_frame_audio_query straight from lyrics.
+    Same output as text_to_musicxml -> musicxml_to_voicevox_json -> convert_lyrics_to_kana:
+    one C4 quarter note (45 frames) per non-space character, "-" as a rest, 15-frame rests
+    at both ends. Pass musicxml_path to also write the MusicXML file (uses music21).
+    """
+    if musicxml_path:
+        text_to_musicxml(lyrics, musicxml_path)
+    notes = [{"key": None, "frame_length": 15, "lyric": ""}]
+    append = notes.append
+    for ch in lyrics:
+        if not ch.strip():
+            continue
+        if ch == "-":
+            # music21 reads a lone "-" lyric back as empty, so the old path made it a rest
+            append({"key": None, "frame_length": frame_length, "lyric": ""})
+        else:
+            append({"key": key, "frame_length": frame_length, "lyric": _note_lyric(ch)})
+    append({"key": None, "frame_length": 15, "lyric": ""})
+    return {"notes": notes}
+
 def roman_to_kana(text: str):
     """
     Convert English or romanized text to katakana characters.
     Returns a string of katakana.
+    Greedy longest match (3, then 2, then 1 letters) over ROMAJI_TO_KATAKANA; space and
+    ~!,.? are kept, any other unknown character becomes ン.
     """
-    text = text.lower()
-    kana_text = []
-
-    i = 0
-    while i < len(text):
-        # 3-letter match
-        if i+2 < len(text) and text[i:i+3] in ROMAJI_TO_KATAKANA:
-            kana_text.append(ROMAJI_TO_KATAKANA[text[i:i+3]])
-            i += 3
-        # 2-letter match
-        elif i+1 < len(text) and text[i:i+2] in ROMAJI_TO_KATAKANA:
-            kana_text.append(ROMAJI_TO_KATAKANA[text[i:i+2]])
-            i += 2
-        # 1-letter match
-        elif text[i] in ROMAJI_TO_KATAKANA:
-            kana_text.append(ROMAJI_TO_KATAKANA[text[i]])
-            i += 1
-        # Space/punctuation → keep as is (optional: convert to small silence)
-        elif text[i] in " ~!,.?":
-            kana_text.append(text[i])
-            i += 1
-        else:
-            # fallback for unknown characters
-            kana_text.append("ン")
-            i += 1
-
-    return "".join(kana_text)
+    from llm_bridge.transliterate import get_transliterator
+    return get_transliterator().roman_to_kana(text)
 
 # -------------------------
 # 3️⃣ Ensure all note lyrics are valid single Katakana characters
@@ -192,6 +339,7 @@ def convert_lyrics_to_kana(voicevox_json):
     - Remove invalid characters like ー
     - Empty lyrics must have key=None
     """
+    import romkan
     for note in voicevox_json["notes"]:
         lyric = note.get("lyric", "").strip()
         if lyric:
@@ -207,7 +355,8 @@ def convert_lyrics_to_kana(voicevox_json):
     return voicevox_json
 
 
-def build_frame_synthesis_object(kana_lyrics, frame_length, f0_value, volume_value):
+def build_frame_synthesis_object(kana_lyrics, frame_length, f0_value, volume_value, compact: bool = False):
+    """compact=True returns an array-backed FrameAudioQuery instead of a dict."""
     phonemes = []
     for kana in kana_lyrics:
         if kana.strip() == "":
@@ -219,6 +368,11 @@ def build_frame_synthesis_object(kana_lyrics, frame_length, f0_value, volume_val
             "note_id": None
         })
 
+    if compact:
+        from llm_bridge.frame_query import FrameAudioQuery
+        return FrameAudioQuery.constant([p["phoneme"] for p in phonemes], frame_length, f0_value, volume_value,
+                                        note_ids=[None] * len(phonemes), output_stereo=True)
+
     num_frames = len(phonemes) * frame_length
 
     return {
@@ -232,6 +386,10 @@ def build_frame_synthesis_object(kana_lyrics, frame_length, f0_value, volume_val
 
 def validate_frame_audio_query(query: dict):
     """Raise ValueError with readable message when query is invalid for frame_synthesis."""
+    if not isinstance(query, dict):
+        # FrameAudioQuery
+        query.validate()
+        return
     if "phonemes" not in query or "f0" not in query or "volume" not in query:
         raise ValueError("Missing one of required keys: phonemes, f0, volume")
 
@@ -250,12 +408,14 @@ def validate_frame_audio_query(query: dict):
     if len(query["volume"]) != total_frames:
         raise ValueError(f"volume length ({len(query['volume'])}) != total_frames ({total_frames})")
 
-    # types
-    if not all(isinstance(x, (float, int)) for x in query["f0"]):
+    # types: one C-level conversion per array instead of an isinstance per frame
+    # (strings/None/nested lists give a non-numeric dtype)
+    import numpy as np
+    if np.asarray(query["f0"]).dtype.kind not in "biuf":
         raise ValueError("f0 array must contain numbers (float)")
-    if not all(isinstance(x, (float, int)) for x in query["volume"]):
+    if np.asarray(query["volume"]).dtype.kind not in "biuf":
         raise ValueError("volume array must contain numbers (float)")
-    
+
 
 def build_frame_audio_query_from_kana(kana_str: str,
                                       frame_length:int=10,
@@ -263,10 +423,12 @@ def build_frame_audio_query_from_kana(kana_str: str,
                                       volume_value:float=0.8,
                                       output_sampling_rate:int=24000,
                                       volume_scale:float=1.0,
-                                      output_stereo:bool=True):
+                                      output_stereo:bool=True,
+                                      compact:bool=False):
     """
     Build a minimal FrameAudioQuery compatible with voicevox_engine.model.FrameAudioQuery
     kana_str: string of katakana characters (each kana => one phoneme here)
+    compact: return an array-backed llm_bridge.frame_query.FrameAudioQuery instead of a dict
     """
     phonemes = []
     for ch in kana_str:
@@ -280,6 +442,14 @@ def build_frame_audio_query_from_kana(kana_str: str,
             raise ValueError(f"Unknown kana -> phoneme mapping for: {ch!r}. Add to KANA_TO_PHONEME.")
         phonemes.append({"phoneme": phon, "frame_length": int(frame_length)})
 
+    if compact:
+        from llm_bridge.frame_query import FrameAudioQuery
+        return FrameAudioQuery.constant([p["phoneme"] for p in phonemes], int(frame_length),
+                                        float(f0_value), float(volume_value),
+                                        volume_scale=volume_scale,
+                                        output_sampling_rate=output_sampling_rate,
+                                        output_stereo=output_stereo).validate()
+
     total_frames = sum(p["frame_length"] for p in phonemes)
     # f0 & volume must be arrays length == total_frames
     f0 = [float(f0_value)] * total_frames
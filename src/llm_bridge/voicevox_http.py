@@ -0,0 +1,211 @@
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+import metrics
+
+# (connect, read) timeouts per VOICEVOX endpoint, in seconds
+DEFAULT_TIMEOUTS = {
+    "/audio_query": (3.05, 10),
+    "/synthesis": (3.05, 30),
+    "/accent_phrases": (3.05, 10),
+    "/mora_data": (3.05, 10),
+    "/sing_frame_audio_query": (3.05, 15),
+    "/frame_synthesis": (3.05, 60),
+    "/initialize_speaker": (3.05, 120),   # loads a style model; slow on first call
+}
+DEFAULT_TIMEOUT = (3.05, 30)
+
+
+class VoiceVoxHTTP:
+    """
+    Keep-alive HTTP client for a VOICEVOX engine.
+    One requests.Session with a bounded connection pool (pool_block=True, so at most
+    `pool_size` sockets are ever open) and a timeout on every call.
+    """
+    def __init__(self, base_url: str, pool_size: int = 4, timeouts: dict = None):
+        self.base_url = base_url
+        self.timeouts = dict(DEFAULT_TIMEOUTS)
+        self.timeouts.update(timeouts or {})
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        self.session = requests.Session()
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._per_endpoint = {}
+
+    def request(self, method: str, endpoint: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeouts.get(endpoint, DEFAULT_TIMEOUT))
+        with self._lock:
+            self._requests += 1
+            self._per_endpoint[endpoint] = self._per_endpoint.get(endpoint, 0) + 1
+        with metrics.span("voicevox_request_seconds", endpoint=endpoint, engine=self.base_url):
+            return self.session.request(method, f"{self.base_url}{endpoint}", **kwargs)
+
+    def post(self, endpoint: str, **kwargs) -> requests.Response:
+        return self.request("POST", endpoint, **kwargs)
+
+    def get(self, endpoint: str, **kwargs) -> requests.Response:
+        return self.request("GET", endpoint, **kwargs)
+
+    def stats(self) -> dict:
+        """Request count, TCP connections opened, and how many requests reused a connection."""
+        pools = self.adapter.poolmanager.pools
+        connections = sum(pools[key].num_connections for key in pools.keys())
+        with self._lock:
+            requests_sent = self._requests
+            per_endpoint = dict(self._per_endpoint)
+        return {
+            "requests": requests_sent,
+            "connections_opened": connections,
+            "connections_reused": max(0, requests_sent - connections),
+            "per_endpoint": per_endpoint,
+        }
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class NoHealthyEngineError(requests.ConnectionError):
+    """Every engine in the pool failed its health probe or its last request."""
+
+
+class VoiceVoxEngine:
+    """One engine in a VoiceVoxPool: its HTTP client plus load, latency and health state."""
+    def __init__(self, base_url: str, pool_size: int = 4, timeouts: dict = None):
+        self.base_url = base_url
+        self.http = VoiceVoxHTTP(base_url, pool_size=pool_size, timeouts=timeouts)
+        self.latency = metrics.LatencyTracker(window=100)
+        self.outstanding = 0
+        self.healthy = True
+        self.probe_failures = 0
+        self.errors = 0
+        self.styles = set()          # styles this engine synthesized or initialized successfully
+        self.version = None
+
+    def stats(self) -> dict:
+        return {"url": self.base_url, "healthy": self.healthy, "outstanding": self.outstanding,
+                "errors": self.errors, "styles": len(self.styles), "version": self.version,
+                **metrics.latency_ms(self.latency, "latency_"),
+                "http": self.http.stats()}
+
+
+class VoiceVoxPool:
+    """
+    Several VOICEVOX engines behind the VoiceVoxHTTP interface (request/post/get/stats/close).
+
+    Each request goes to the healthy engine with the fewest outstanding requests, except
+    that a request for a style (params["speaker"]) prefers an engine that already has the
+    style loaded, as long as that engine is at most `affinity_slack` requests busier than
+    the least busy one. Connection errors and timeouts eject the engine and the request is
+    retried once on another; a background probe (GET /version every `probe_interval` s)
+    ejects engines after `eject_after` failed probes and readmits them on the first success.
+    """
+    def __init__(self, base_urls, pool_size: int = 4, timeouts: dict = None, affinity_slack: int = 1,
+                 probe_interval: float = 5.0, eject_after: int = 2):
+        if not base_urls:
+            raise ValueError("VoiceVoxPool needs at least one engine URL")
+        self.engines = [VoiceVoxEngine(url, pool_size=pool_size, timeouts=timeouts) for url in base_urls]
+        self.base_url = self.engines[0].base_url
+        self.affinity_slack = affinity_slack
+        self.probe_interval = probe_interval
+        self.eject_after = eject_after
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._prober = None
+        if len(self.engines) > 1 and probe_interval > 0:
+            self._prober = threading.Thread(target=self._probe_loop, name="voicevox-probe", daemon=True)
+            self._prober.start()
+
+    def _acquire(self, style, exclude=()) -> VoiceVoxEngine:
+        with self._lock:
+            candidates = [e for e in self.engines if e.healthy and e not in exclude]
+            if not candidates:
+                # nothing known to be up: try the rest rather than failing without a request
+                candidates = [e for e in self.engines if e not in exclude]
+            if not candidates:
+                raise NoHealthyEngineError("no VOICEVOX engine available")
+            engine = min(candidates, key=lambda e: e.outstanding)
+            if style is not None and style not in engine.styles:
+                warm = [e for e in candidates if style in e.styles]
+                if warm:
+                    best_warm = min(warm, key=lambda e: e.outstanding)
+                    if best_warm.outstanding <= engine.outstanding + self.affinity_slack:
+                        engine = best_warm
+            engine.outstanding += 1
+            return engine
+
+    def request(self, method: str, endpoint: str, **kwargs) -> requests.Response:
+        style = (kwargs.get("params") or {}).get("speaker")
+        tried = []
+        while True:
+            engine = self._acquire(style, exclude=tried)
+            t0 = time.perf_counter()
+            try:
+                resp = engine.http.request(method, endpoint, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                # the engine looks down: eject it and retry once elsewhere
+                with self._lock:
+                    engine.errors += 1
+                    engine.healthy = False
+                tried.append(engine)
+                if len(tried) >= min(2, len(self.engines)):
+                    raise
+                continue
+            except Exception:
+                with self._lock:
+                    engine.errors += 1
+                raise
+            finally:
+                with self._lock:
+                    engine.outstanding -= 1
+            with self._lock:
+                engine.latency.record(time.perf_counter() - t0)
+                if style is not None and resp.ok:
+                    engine.styles.add(style)
+            return resp
+
+    def post(self, endpoint: str, **kwargs) -> requests.Response:
+        return self.request("POST", endpoint, **kwargs)
+
+    def get(self, endpoint: str, **kwargs) -> requests.Response:
+        return self.request("GET", endpoint, **kwargs)
+
+    def probe(self) -> None:
+        """One round of health checks; also run periodically by the probe thread."""
+        for engine in self.engines:
+            try:
+                resp = engine.http.get("/version", timeout=(1.0, 2.0))
+                resp.raise_for_status()
+                version = resp.text.strip('"\n ')
+                ok = True
+            except requests.RequestException:
+                ok = False
+            with self._lock:
+                if ok:
+                    if not engine.healthy:
+                        print(f"[voicevox] {engine.base_url} is back")
+                    engine.healthy, engine.probe_failures, engine.version = True, 0, version
+                else:
+                    engine.probe_failures += 1
+                    if engine.healthy and engine.probe_failures >= self.eject_after:
+                        print(f"[voicevox] {engine.base_url} is down, ejected")
+                        engine.healthy = False
+
+    def _probe_loop(self) -> None:
+        while not self._closed.wait(self.probe_interval):
+            self.probe()
+
+    def stats(self) -> dict:
+        with self._lock:
+            engines = [e.stats() for e in self.engines]
+        return {"engines": engines,
+                "healthy": sum(e["healthy"] for e in engines),
+                "outstanding": sum(e["outstanding"] for e in engines),
+                "requests": sum(e["http"]["requests"] for e in engines)}
+
+    def close(self) -> None:
+        self._closed.set()
+        for engine in self.engines:
+            engine.http.close()
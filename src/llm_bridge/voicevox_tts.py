@@ -1,31 +1,113 @@
-import numpy as np
 import requests
-import sounddevice as sd
-import soundfile as sf
 import io
 import threading
 import json  
 import random
-from constants import EMOTION_TO_SPEAKER, EN_DICT, SINGING_SPEAKERS, ROMAJI_TO_KATAKANA
-from llm_bridge.utils import build_frame_synthesis_object, build_frame_audio_query_from_kana
+import os
+from constants import EMOTION_TO_SPEAKER, EN_DICT, SINGING_SPEAKERS, ROMAJI_TO_KATAKANA, SING_TEACHER_SPEAKER
+from llm_bridge.voicevox_http import VoiceVoxHTTP, VoiceVoxPool
+from llm_bridge.audio_cache import AudioCache
+from llm_bridge.speaker_policy import get_speaker_policy
+from llm_bridge.speaker_warmup import SpeakerWarmup, resolve_styles
+from llm_bridge.transliterate import get_transliterator
+from llm_bridge.utils import build_frame_synthesis_object, build_frame_audio_query_from_kana, split_into_clauses
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+ALL_SINGERS = [s for group in SINGING_SPEAKERS.values() for s in group]
+
+def _read_wav(wav_io):
+    # numpy/soundfile/sounddevice are imported on first use, not when this module is imported
+    import soundfile as sf
+    return sf.read(wav_io, dtype="float32")
+
 
 class VoiceVoxTTS:
-    def __init__(self, host: str = "127.0.0.1", port: int = 50021):
-        self.base_url = f"http://{host}:{port}"
+    def __init__(self, host: str = "127.0.0.1", port: int = 50021,
+                 pool_size: int = 4, timeouts: dict = None, cache: AudioCache = None, warmup=None,
+                 endpoints=None):
+        """
+        warmup: style ids (or a spec like "neutral,happy,3002", see speaker_warmup.resolve_styles)
+        to load on the engine in the background; defaults to env VOICEVOX_WARMUP (empty = off).
+        endpoints: engine base URLs to balance over; defaults to env VOICEVOX_ENDPOINTS
+        (comma separated), else the single engine at host:port.
+        """
+        if endpoints is None:
+            endpoints = [u.strip().rstrip("/") for u in os.getenv("VOICEVOX_ENDPOINTS", "").split(",") if u.strip()]
+        endpoints = endpoints or [f"http://{host}:{port}"]
+        self.base_url = endpoints[0]
+        # Keep-alive pooled client(s); per-endpoint timeouts live in voicevox_http.DEFAULT_TIMEOUTS.
+        # Several engines: least-outstanding-requests with style affinity and health probes.
+        if len(endpoints) > 1:
+            self.http = VoiceVoxPool(endpoints, pool_size=pool_size, timeouts=timeouts,
+                                     probe_interval=float(os.getenv("VOICEVOX_PROBE_SEC", "5")))
+        else:
+            self.http = VoiceVoxHTTP(self.base_url, pool_size=pool_size, timeouts=timeouts)
+        # Synthesized audio cache (memory LRU + optional disk tier, see AudioCache.from_env)
+        self.cache = cache if cache is not None else AudioCache.from_env()
+        # One long-lived output stream per device, opened on first use
+        self._players = {}
         self._lock = threading.Lock()
+        self._generation = 0
+        # Which styles the engine has loaded; pre-warms VOICEVOX_WARMUP in the background
+        self.warmup = SpeakerWarmup.from_env(self.http)
+        if warmup is None:
+            warmup = os.getenv("VOICEVOX_WARMUP", "")
+        styles = resolve_styles(warmup) if isinstance(warmup, str) else list(warmup)
+        if styles:
+            print(f"[warmup] loading {len(styles)} VOICEVOX styles in the background")
+            self.warmup.start(styles)
+        # Which style each utterance uses (VOICEVOX_SPEAKER_POLICY, see speaker_policy)
+        self.speaker_policy = get_speaker_policy(is_warm=self.warmup.is_warm)
+
+    def stats(self) -> dict:
+        return {"http": self.http.stats(), "cache": self.cache.stats(), "warmup": self.warmup.stats(),
+                "speakers": self.speaker_policy.stats(),
+                "players": [p.stats() for p in list(self._players.values())]}
+
+    def close(self) -> None:
+        """Stop the warm-up, close the output streams and the engine connections."""
+        self.warmup.close()
+        with self._lock:
+            players, self._players = list(self._players.values()), {}
+        for player in players:
+            player.close()
+        self.http.close()
 
-    def speak_with_emotion(self, text: str, emotion: str):      
+    def _player(self, device_index):
+        from llm_bridge.audio_player import AudioPlayer
+        with self._lock:
+            player = self._players.get(device_index)
+            if player is None:
+                player = self._players[device_index] = AudioPlayer(device_index)
+            return player
+
+    def stop(self) -> None:
+        """Barge-in: drop queued and playing audio on every device, and stop in-flight pipelined replies."""
+        with self._lock:
+            self._generation += 1
+            players = list(self._players.values())
+        for player in players:
+            player.flush()
+
+    def _pick_speaker(self, emotion):
         if isinstance(emotion, list):
-            speaker = random.choice(emotion)
-        else:
-            speaker_list = EMOTION_TO_SPEAKER.get(emotion, [4])
-            speaker = random.choice(speaker_list)
+            return self.speaker_policy.choose(emotion)
+        return self.speaker_policy.choose(EMOTION_TO_SPEAKER.get(emotion, [4]), key=emotion)
 
-        text_kana = self._preprocess(text)
+    def _pick_singer(self):
+        return self.speaker_policy.choose(ALL_SINGERS, key="sing")
+
+    def _synthesize(self, text_kana: str, speaker: int):
+        """/audio_query + /synthesis for one piece of text. Returns (data, samplerate), data is 2D."""
+        import numpy as np
+        key = self.cache.make_key("talk", text_kana, speaker, {"enable_katakana_english": True})
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
 
         # Generate audio query
-        query = requests.post(
-            f"{self.base_url}/audio_query",
+        query = self.http.post(
+            "/audio_query",
             params={"text": text_kana, "speaker": speaker, "enable_katakana_english": True}
         )
         query.raise_for_status()
@@ -34,77 +116,99 @@ class VoiceVoxTTS:
         query_data = query.json()
 
         # Synthesize speech
-        synth = requests.post(
-            f"{self.base_url}/synthesis",
+        synth = self.http.post(
+            "/synthesis",
             params={"speaker": speaker},
             data=json.dumps(query_data),
             headers={"Content-Type": "application/json"}
         )
         synth.raise_for_status()
-        
-        
+
         # Load wav
         wav_io = io.BytesIO(synth.content)
         try:
-            data, samplerate = sf.read(wav_io, dtype='float32')
+            data, samplerate = _read_wav(wav_io)
         except RuntimeError:
-            # If file is empty/invalid, generate 1s of silence
-            samplerate = 44100
-            data = np.zeros((samplerate, 1), dtype='float32')
-            
+            # If file is empty/invalid, generate 1s of silence (not cached) at VOICEVOX's
+            # default rate so the output stream is not reopened for it
+            samplerate = 24000
+            return np.zeros((samplerate, 1), dtype='float32'), samplerate
+
+        self.warmup.mark_warm(speaker)
         # 🔹 Ensure 2D shape (channels)
         if data.ndim == 1:
             data = data[:, np.newaxis]
+        return self.cache.put(key, data, samplerate)
+
+    def _play(self, data, samplerate, device_index=21, wait: bool = True):
+        handle = self._player(device_index).play(data, samplerate)
+        if wait:
+            handle.wait()
+        return handle
 
-        device_index=21
-
-        # Print all devices with channel info
-        #devices = sd.query_devices()
-        #for i, dev in enumerate(devices):
-        #    print(f"Device {i}: {dev['name']}")
-        #    print(f"   Max output channels: {dev['max_output_channels']}")
-        #    print(f"   Max input channels:  {dev['max_input_channels']}")
-
-        # Make sure at least one channelk
-        dev_info = sd.query_devices(device_index)
-        #print(sd.query_devices())
-        max_channels = dev_info['max_output_channels']
-    
-        if max_channels == 0:
-            raise ValueError(f"Device {device_index} has 0 output channels!")
-    
+    def speak_with_emotion(self, text: str, emotion: str):      
+        speaker = self._pick_speaker(emotion)
+        text_kana = self._preprocess(text)
+        data, samplerate = self._synthesize(text_kana, speaker)
         print(f"Speaker ID: {speaker}")
+        self._play(data, samplerate)
 
-        # Expand/reduce channels to match device
-        if data.shape[1] < max_channels:
-            repeats = max_channels // data.shape[1]
-            remainder = max_channels % data.shape[1]
-            data = np.tile(data, (1, repeats))
-            if remainder > 0:
-                data = np.hstack([data, data[:, :remainder]])
-        elif data.shape[1] > max_channels:
-            data = data[:, :max_channels]
-    
-        # Play safely
-        with self._lock:
-            sd.play(data, samplerate, device=device_index)
-            sd.wait()
-    
-        # # Play audio
-        # wav_io = io.BytesIO(synth.content)
-        # data, samplerate = sf.read(wav_io, dtype="float32")
-        # with self._lock:
-        #     sd.play(data, samplerate)
-        #     sd.wait()
+    def speak_pipelined(self, text, emotion, device_index=21):
+        """
+        Talk mode for long replies: split into clauses and synthesize clause N+1 while
+        clause N plays, so audio starts after one short clause instead of the whole reply.
+        `text` may also be an iterable of segments (e.g. sentences arriving from a stream).
+        The speaker is picked once and kept for every segment.
+        """
+        generation = self._generation
+        last = None
+        # Synthesis of each segment overlaps playback of the ones already queued
+        for data, samplerate in self.synthesize_talk(text, emotion):
+            if generation != self._generation:
+                return   # stop() was called: a newer reply took over
+            last = self._play(data, samplerate, device_index=device_index, wait=False)
+        if last is not None:
+            last.wait()
+
+    def synthesize_talk(self, text, emotion):
+        """Synthesis half of speak_pipelined: yields (data, samplerate) per clause, one speaker throughout."""
+        speaker = self.pick_speaker(emotion)
+        segments = split_into_clauses(text) if isinstance(text, str) else text
+        for segment in segments:
+            audio = self.synthesize_clause(segment, speaker)
+            if audio is not None:
+                yield audio
+
+    def pick_speaker(self, emotion) -> int:
+        """Style id for an emotion name or a pool of ids, through the speaker policy."""
+        speaker = self._pick_speaker(emotion)
+        print(f"Speaker ID: {speaker}")
+        return speaker
+
+    def synthesize_clause(self, segment: str, speaker: int):
+        """(data, samplerate) for one clause, or None if nothing in it is speakable."""
+        text_kana = self._preprocess(segment)
+        if not text_kana.strip():
+            return None
+        return self._synthesize(text_kana, speaker)
+
+    def synthesize_song(self, voicevox_json, effects=None):
+        """Synthesis half of sing(): (data, samplerate) for a score, in a singer picked by the speaker policy."""
+        return self._sing_synthesize(voicevox_json, self._pick_singer(), effects)
+
+    def play(self, data, samplerate, device_index=21, wait: bool = True):
+        """Queue audio on a device's output stream; returns its PlaybackHandle."""
+        return self._play(data, samplerate, device_index=device_index, wait=wait)
 
     # ------------------------
     # NEW: SINGING
     # ------------------------
-    def sing(self, voicevox_json: str, lyrics: str, emotion: str):
+    def sing(self, voicevox_json: str, lyrics: str, emotion: str, effects=None):
         """
         voicevox_json: the Score-like object produced by musicxml_to_voicevox_json()
         lyrics: the kana lyrics string (you said you run convert_lyrics_to_kana before calling sing)
         emotion: the emotion string -> used to select singer style (speaker id)
+        effects: optional llm_bridge.effects.EffectChain applied to the frame query's f0/volume
         """
         # 1) pick emotion/style id and singer (speaker) consistently
         if isinstance(emotion, list):
@@ -113,18 +217,34 @@ class VoiceVoxTTS:
             speaker_list = EMOTION_TO_SPEAKER.get(emotion, [4])
             emotionId = random.choice(speaker_list)
 
-        # pick a singing speaker (style_id) — but we must use the same id for query generation and frame_synthesis
-        all_singers = [s for group in SINGING_SPEAKERS.values() for s in group]
-        style_id = random.choice(all_singers)
+        # pick a singing speaker (style_id) for frame_synthesis; the query comes from SING_TEACHER_SPEAKER
+        style_id = self._pick_singer()
+
+        data, samplerate = self._sing_synthesize(voicevox_json, style_id, effects)
 
+        # Play song
+        self._play(data, samplerate, device_index=None)
+
+    def _sing_synthesize(self, voicevox_json, style_id: int, effects=None):
+        """/sing_frame_audio_query + /frame_synthesis for a score, through the audio cache."""
+        params = {"query_speaker": SING_TEACHER_SPEAKER}
+        if effects:
+            params["effects"] = effects.describe()
+        key = self.cache.make_key("sing", voicevox_json, style_id, params)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        from llm_bridge.frame_query import FrameAudioQuery
         # 2) Get initial frame audio query from engine (recommended) using the SAME style_id
         #    This gives you a valid query structure. If you want to override phonemes/f0,
         #    use the returned object as a base and then revalidate.
 
         try:
-            resp = requests.post(f"{self.base_url}/sing_frame_audio_query", params={"speaker": 6000}, json=voicevox_json, timeout=10)
+            resp = self.http.post("/sing_frame_audio_query", params={"speaker": SING_TEACHER_SPEAKER}, json=voicevox_json)
             resp.raise_for_status()
-            base_query = resp.json()
+            base_query = FrameAudioQuery.from_dict(resp.json())
+            self.warmup.mark_warm(SING_TEACHER_SPEAKER)
         except Exception as e:
             print("Error getting sing_frame_audio_query:", e)
             # print body if present
@@ -135,6 +255,8 @@ class VoiceVoxTTS:
             raise
 
         # print("initial query (from engine): keys:", list(base_query.keys()))
+        if effects:
+            effects.apply(base_query)
         
         # # === Safe place to add extra logic ===
         # # Example: adjust f0 or volume without touching phonemes
@@ -162,7 +284,8 @@ class VoiceVoxTTS:
         # 4) Use the SAME style_id when calling frame_synthesis
         try:
             # res = requests.post(f"{self.base_url}/frame_synthesis", params={"speaker": style_id}, json=custom_query, timeout=30)
-            res = requests.post(f"{self.base_url}/frame_synthesis", params={"speaker": style_id}, json=base_query, timeout=30)
+            res = self.http.post("/frame_synthesis", params={"speaker": style_id},
+                                 data=base_query.validate().to_json(), headers=JSON_HEADERS)
             res.raise_for_status()
         except requests.exceptions.HTTPError as e:
             print("VOICEVOX API returned an error!")
@@ -173,39 +296,22 @@ class VoiceVoxTTS:
                 print("Response text:", e.response.text)
             raise
 
-        
-        # Play song
+        self.warmup.mark_warm(style_id)
         wav_io = io.BytesIO(res.content)
-        data, samplerate = sf.read(wav_io, dtype="float32")
-        with self._lock:
-            sd.play(data, samplerate)
-            sd.wait()
+        data, samplerate = _read_wav(wav_io)
+        return self.cache.put(key, data, samplerate)
 
     def _preprocess(self, text: str) -> str:
-        """Convert English words/acronyms to Katakana for VOICEVOX."""
-        result = []
-        for token in text.split():
-            upper_token = token.upper()
-            if upper_token in EN_DICT:
-                result.append(EN_DICT[upper_token])
-            elif token.isascii() and token.isupper():
-                katakana = " ".join([EN_DICT.get(c, f"{c}") for c in upper_token])
-                result.append(katakana)
-            else:
-                result.append(token)
-        return " ".join(result)
+        """Convert English words/phrases/acronyms to Katakana for VOICEVOX."""
+        return get_transliterator().transliterate(text)
 
     def speak_with_emotion3(self, text: str, emotion: str):
-        if isinstance(emotion, list):
-            speaker = random.choice(emotion)
-        else:
-            speaker_list = EMOTION_TO_SPEAKER.get(emotion, [4])
-            speaker = random.choice(speaker_list)
+        speaker = self._pick_speaker(emotion)
 
         text_kana = self._preprocess(text)
 
-        query = requests.post(
-            f"{self.base_url}/audio_query",
+        query = self.http.post(
+            "/audio_query",
             params={"text": text_kana, "speaker": speaker, "enable_katakana_english": True}
         )
         query.raise_for_status()
@@ -223,8 +329,8 @@ class VoiceVoxTTS:
               {"pitchScale": query_data["pitchScale"],
                "intonationScale": query_data["intonationScale"]})
 
-        synth = requests.post(
-            f"{self.base_url}/synthesis",
+        synth = self.http.post(
+            "/synthesis",
             params={"speaker": speaker},
             data=json.dumps(query_data),
             headers={"Content-Type": "application/json"}
@@ -232,17 +338,8 @@ class VoiceVoxTTS:
         synth.raise_for_status()
 
         wav_io = io.BytesIO(synth.content)
-        data, samplerate = sf.read(wav_io, dtype="float32")
-        if data.ndim == 1:
-            data = data[:, np.newaxis]
-        device_index = 22
-        dev_info = sd.query_devices(device_index)
-        max_channels = dev_info['max_output_channels']
-        if data.shape[1] < max_channels:
-            data = np.tile(data, (1, max_channels // data.shape[1]))
-        with self._lock:
-            sd.play(data, samplerate, device=device_index)
-            sd.wait()
+        data, samplerate = _read_wav(wav_io)
+        self._play(data, samplerate, device_index=22)
 
     def sing3(self, voicevox_json: str, lyrics: str, emotion: str):
         if isinstance(emotion, list):
@@ -251,35 +348,33 @@ class VoiceVoxTTS:
             speaker_list = EMOTION_TO_SPEAKER.get(emotion, [4])
             emotionId = random.choice(speaker_list)
 
-        all_singers = [s for group in SINGING_SPEAKERS.values() for s in group]
-        style_id = random.choice(all_singers)
+        style_id = self._pick_singer()
 
-        resp = requests.post(f"{self.base_url}/sing_frame_audio_query",
-                             params={"speaker": 6000}, json=voicevox_json, timeout=10)
+        from llm_bridge.frame_query import FrameAudioQuery
+        resp = self.http.post("/sing_frame_audio_query",
+                              params={"speaker": SING_TEACHER_SPEAKER}, json=voicevox_json)
         resp.raise_for_status()
-        base_query = resp.json()
+        base_query = FrameAudioQuery.from_dict(resp.json())
 
         print("\n[SING custom] before tweaks:",
-              {"f0_first10": base_query["f0"][:10],
-               "volume_first10": base_query["volume"][:10]})
+              {"f0_first10": base_query.f0[:10].tolist(),
+               "volume_first10": base_query.volume[:10].tolist()})
 
         # === Apply tweaks ===
-        base_query["f0"] = [f * 1.2 if f > 0 else 0 for f in base_query["f0"]]
-        base_query["volume"] = [v * 0.8 for v in base_query["volume"]]
+        from llm_bridge.effects import SING3_EFFECTS
+        SING3_EFFECTS.apply(base_query)
 
         print("[SING custom] after tweaks:",
-              {"f0_first10": base_query["f0"][:10],
-               "volume_first10": base_query["volume"][:10]})
+              {"f0_first10": base_query.f0[:10].tolist(),
+               "volume_first10": base_query.volume[:10].tolist()})
 
-        res = requests.post(f"{self.base_url}/frame_synthesis",
-                            params={"speaker": style_id}, json=base_query, timeout=30)
+        res = self.http.post("/frame_synthesis", params={"speaker": style_id},
+                             data=base_query.validate().to_json(), headers=JSON_HEADERS)
         res.raise_for_status()
 
         wav_io = io.BytesIO(res.content)
-        data, samplerate = sf.read(wav_io, dtype="float32")
-        with self._lock:
-            sd.play(data, samplerate)
-            sd.wait()
+        data, samplerate = _read_wav(wav_io)
+        self._play(data, samplerate, device_index=None)
 
     def speak_with_emotion4(self, text: str, emotion: str):
         """
@@ -290,12 +385,10 @@ class VoiceVoxTTS:
          4) assemble AudioQuery-like object and call /synthesis
         Prints before/after tweaks.
         """
+        import numpy as np
+
         # --- choose speaker ---
-        if isinstance(emotion, list):
-            speaker = random.choice(emotion)
-        else:
-            speaker_list = EMOTION_TO_SPEAKER.get(emotion, [4])
-            speaker = random.choice(speaker_list)
+        speaker = self._pick_speaker(emotion)
 
         # prepare text
         text_kana = self._preprocess(text)
@@ -303,8 +396,8 @@ class VoiceVoxTTS:
         try:
             # 1) get accent phrases
             print(f"\n[ACCEPT] Requesting /accent_phrases for speaker={speaker} text='{text_kana}'")
-            r = requests.post(
-                f"{self.base_url}/accent_phrases",
+            r = self.http.post(
+                "/accent_phrases",
                 params={"text": text_kana, "speaker": speaker, "enable_katakana_english": True}
             )
             r.raise_for_status()
@@ -313,11 +406,10 @@ class VoiceVoxTTS:
 
             # 2) get mora data
             print(f"[MORA] Requesting /mora_data for speaker={speaker} with {len(accent_phrases)} accent_phrases")
-            r2 = requests.post(
-                f"{self.base_url}/mora_data",
+            r2 = self.http.post(
+                "/mora_data",
                 params={"speaker": speaker},
-                json=accent_phrases,
-                timeout=10
+                json=accent_phrases
             )
             r2.raise_for_status()
             mora_result = r2.json()
@@ -352,44 +444,23 @@ class VoiceVoxTTS:
             ))
 
             # 4) synthesize
-            synth = requests.post(
-                f"{self.base_url}/synthesis",
+            synth = self.http.post(
+                "/synthesis",
                 params={"speaker": speaker},
                 data=json.dumps(audio_query),
-                headers={"Content-Type": "application/json"},
-                timeout=30
+                headers={"Content-Type": "application/json"}
             )
             synth.raise_for_status()
 
             # play back
             wav_io = io.BytesIO(synth.content)
             try:
-                data, samplerate = sf.read(wav_io, dtype='float32')
+                data, samplerate = _read_wav(wav_io)
             except RuntimeError:
                 samplerate = 44100
                 data = np.zeros((samplerate, 1), dtype='float32')
 
-            if data.ndim == 1:
-                data = data[:, np.newaxis]
-
-            device_index = 22
-            dev_info = sd.query_devices(device_index)
-            max_channels = dev_info['max_output_channels']
-            if max_channels == 0:
-                raise ValueError(f"Device {device_index} has 0 output channels!")
-
-            if data.shape[1] < max_channels:
-                repeats = max_channels // data.shape[1]
-                remainder = max_channels % data.shape[1]
-                data = np.tile(data, (1, repeats))
-                if remainder > 0:
-                    data = np.hstack([data, data[:, :remainder]])
-            elif data.shape[1] > max_channels:
-                data = data[:, :max_channels]
-
-            with self._lock:
-                sd.play(data, samplerate, device=device_index)
-                sd.wait()
+            self._play(data, samplerate, device_index=22)
 
         except requests.exceptions.HTTPError as e:
             print("HTTP error during speak_natural:", e)
@@ -422,66 +493,52 @@ class VoiceVoxTTS:
             emotionId = random.choice(speaker_list)
 
         # --- choose singing style_id ---
-        all_singers = [s for group in SINGING_SPEAKERS.values() for s in group]
-        if not all_singers:
+        if not ALL_SINGERS:
             raise RuntimeError("No singing speakers available in SINGING_SPEAKERS constant")
-        style_id = random.choice(all_singers)
+        style_id = self._pick_singer()
 
         # --- convert lyrics to Katakana for printing/logging ---
         lyrics_kana = self._preprocess(lyrics)
         print(f"[SING EN] Using style_id={style_id}, emotionId={emotionId}")
         print("[SING EN] Katakana lyrics:", lyrics_kana)
 
+        from llm_bridge.frame_query import FrameAudioQuery
         try:
             # --- 1) Request a valid frame_audio_query from VOICEVOX ---
             print(f"[SING EN] Requesting /sing_frame_audio_query with style_id={style_id}")
-            resp = requests.post(
-                f"{self.base_url}/sing_frame_audio_query",
-                params={"speaker": 6000},
-                json=voicevox_json,
-                timeout=15
+            resp = self.http.post(
+                "/sing_frame_audio_query",
+                params={"speaker": SING_TEACHER_SPEAKER},
+                json=voicevox_json
             )
             resp.raise_for_status()
-            frame_query = resp.json()
+            frame_query = FrameAudioQuery.from_dict(resp.json())
 
-            print("[SING EN] Frame query built:", len(frame_query.get("f0", [])), "frames")
-            print("[SING EN] Sample phonemes:", frame_query.get("phoneme", [])[:10])
+            print("[SING EN] Frame query built:", len(frame_query), "frames")
+            print("[SING EN] Sample phonemes:", frame_query.phonemes[:10])
 
             # --- 2) Optional tweaks for naturalness ---
-            # small longitudinal pitch modulation to simulate vibrato
-            import math
-            f0 = frame_query.get("f0", [])
-            for i in range(len(f0)):
-                if f0[i] > 0:
-                    wobble = 1.0 + 0.01 * math.sin(2 * math.pi * i / 120)
-                    f0[i] *= wobble
-            frame_query["f0"] = f0
-
-            # slightly reduce volume to avoid clipping
-            if "volume" in frame_query:
-                frame_query["volume"] = [v * 0.95 for v in frame_query["volume"]]
+            # small longitudinal pitch modulation to simulate vibrato,
+            # slightly reduced volume to avoid clipping
+            from llm_bridge.effects import SING4_EFFECTS
+            SING4_EFFECTS.apply(frame_query)
 
             print("[SING EN] f0 and volume tweaked for naturalness")
 
             # --- 3) POST full frame_audio_query to /frame_synthesis ---
             print(f"[SING EN] Calling /frame_synthesis with style_id={style_id}")
-            res = requests.post(
-                f"{self.base_url}/frame_synthesis",
+            res = self.http.post(
+                "/frame_synthesis",
                 params={"speaker": style_id},
-                json=frame_query,
-                timeout=60
+                data=frame_query.validate().to_json(),
+                headers=JSON_HEADERS
             )
             res.raise_for_status()
 
             # --- 4) Play the returned audio ---
             wav_io = io.BytesIO(res.content)
-            data, samplerate = sf.read(wav_io, dtype="float32")
-            if data.ndim == 1:
-                data = data[:, np.newaxis]
-
-            with self._lock:
-                sd.play(data, samplerate)
-                sd.wait()
+            data, samplerate = _read_wav(wav_io)
+            self._play(data, samplerate, device_index=None)
 
         except requests.exceptions.HTTPError as e:
             print("VOICEVOX API returned an error during sing!")
@@ -0,0 +1,236 @@
+"""
+Lightweight latency instrumentation shared by llm_bridge and osc_chatbox.
+
+    with metrics.span("voicevox_request_seconds", endpoint="/synthesis"):
+        ...
+    metrics.observe("llm_request_seconds", 0.82, kind="stream_first_token", model=model)
+
+Spans feed Prometheus-style histograms. Each chat turn runs under a trace id (a
+contextvar, so it follows asyncio tasks and threads started with a copied context);
+METRICS_TRACE=1 prints every span with it, to follow one turn through the stages.
+Everything is off unless METRICS=1 or METRICS_PORT is set: span() then returns a shared
+no-op context manager and observe() returns after one flag check.
+METRICS_PORT serves the histograms at http://127.0.0.1:PORT/metrics in Prometheus text format.
+"""
+import contextvars
+import itertools
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+# Seconds; covers a 1 ms UDP send up to a 30 s song synthesis
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+HELP = {
+    "llm_request_seconds": "LLM request duration (complete, stream_first_token, stream_total)",
+    "llm_retry_sleep_seconds": "Backoff sleeps in retry_with_backoff",
+    "llm_turn_seconds": "retry_with_backoff total, all attempts of one turn",
+    "voicevox_request_seconds": "VOICEVOX HTTP request duration per endpoint",
+    "chatbox_say_seconds": "ChatboxClient.say until its last page was sent (includes rate-limit waits)",
+    "audio_device_open_seconds": "Opening an audio output stream",
+    "turn_stage_seconds": "Chat pipeline stage duration",
+    "tts_queue_wait_seconds": "Time a TTS job waited for a synthesis worker",
+}
+
+_enabled = False
+_trace_print = False
+_NOOP = nullcontext()
+_TRACE_ID = contextvars.ContextVar("trace_id", default=None)
+_trace_ids = itertools.count(1)
+_lock = threading.Lock()
+_histograms = {}     # name -> {label items: _Histogram}
+_server = None
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self, buckets):
+        self.counts = [0] * (len(buckets) + 1)   # last one is +Inf
+        self.total = 0.0
+        self.count = 0
+
+
+def enabled() -> bool:
+    return _enabled
+
+def enable(on: bool = True, trace_print: bool = None) -> None:
+    global _enabled, _trace_print
+    _enabled = on
+    if trace_print is not None:
+        _trace_print = trace_print
+
+
+# ---------------------------------------------
+# Trace ids
+# ---------------------------------------------
+def new_trace_id() -> str:
+    return f"t{os.getpid() % 10000:04d}-{next(_trace_ids):05d}"
+
+def current_trace():
+    return _TRACE_ID.get()
+
+@contextmanager
+def trace(trace_id: str = None):
+    """Run the block under `trace_id` (a new one if None); yields the id."""
+    token = _TRACE_ID.set(trace_id or new_trace_id())
+    try:
+        yield _TRACE_ID.get()
+    finally:
+        _TRACE_ID.reset(token)
+
+
+# ---------------------------------------------
+# Recording
+# ---------------------------------------------
+def observe(name: str, seconds: float, **labels) -> None:
+    if not _enabled:
+        return
+    key = tuple(sorted(labels.items()))
+    index = bisect_left(DEFAULT_BUCKETS, seconds)
+    with _lock:
+        series = _histograms.setdefault(name, {})
+        hist = series.get(key)
+        if hist is None:
+            hist = series[key] = _Histogram(DEFAULT_BUCKETS)
+        hist.counts[index] += 1
+        hist.total += seconds
+        hist.count += 1
+    if _trace_print:
+        extra = " ".join(f"{k}={v}" for k, v in key)
+        print(f"[trace {_TRACE_ID.get() or '-'}] {name} {extra} {seconds * 1e3:.1f}ms")
+
+class _Span:
+    __slots__ = ("name", "labels", "start")
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.labels["error"] = exc_type.__name__
+        observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+def span(name: str, **labels):
+    """Context manager timing its block into histogram `name`; a shared no-op while disabled."""
+    if not _enabled:
+        return _NOOP
+    return _Span(name, labels)
+
+
+# ---------------------------------------------
+# Sliding windows
+# ---------------------------------------------
+class LatencyTracker:
+    """Sliding window of latencies (seconds), e.g. for one provider or one stage."""
+    def __init__(self, window: int = 50):
+        self.samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.samples.append(seconds)
+
+    def quantile(self, q: float):
+        """q-quantile of the window (nearest rank), or None while it is empty."""
+        with self._lock:
+            ordered = sorted(self.samples)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def __len__(self):
+        return len(self.samples)
+
+
+def latency_ms(tracker: LatencyTracker, prefix: str = "") -> dict:
+    """{prefix}p50_ms / {prefix}p95_ms of the window, rounded to 0.1 ms (None while empty)."""
+    out = {}
+    for name, q in (("p50", 0.5), ("p95", 0.95)):
+        value = tracker.quantile(q)
+        out[f"{prefix}{name}_ms"] = None if value is None else round(value * 1e3, 1)
+    return out
+
+
+# ---------------------------------------------
+# Export
+# ---------------------------------------------
+def _escape_label(value) -> str:
+    # Prometheus text format: backslash, double quote and newline are escaped in label values
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(items) -> str:
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape_label(v)}"' for k, v in items) + "}"
+
+def render() -> str:
+    """All histograms in Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        snapshot = {name: {key: (list(h.counts), h.total, h.count) for key, h in series.items()}
+                    for name, series in _histograms.items()}
+    for name, series in sorted(snapshot.items()):
+        lines.append(f"# HELP {name} {HELP.get(name, name)}")
+        lines.append(f"# TYPE {name} histogram")
+        for key, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, n in zip(DEFAULT_BUCKETS + ("+Inf",), counts):
+                cumulative += n
+                lines.append(f"{name}_bucket{_format_labels(key + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(key)} {total:.6f}")
+            lines.append(f"{name}_count{_format_labels(key)} {count}")
+    return "\n".join(lines) + "\n"
+
+def summary() -> dict:
+    """{name: {labels: {"count", "mean_ms"}}} for debug printing."""
+    with _lock:
+        return {name: {_format_labels(key) or "-": {"count": h.count, "mean_ms": round(h.total / h.count * 1e3, 1)}
+                       for key, h in series.items() if h.count}
+                for name, series in _histograms.items()}
+
+def reset() -> None:
+    with _lock:
+        _histograms.clear()
+
+def serve(port: int, host: str = "127.0.0.1"):
+    """Serve render() at /metrics on a daemon thread; returns the server."""
+    global _server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    _server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+    print(f"[metrics] serving http://{host}:{_server.server_address[1]}/metrics")
+    return _server
+
+def start_from_env() -> None:
+    """METRICS=1 records; METRICS_PORT also serves /metrics; METRICS_TRACE=1 prints spans."""
+    port = os.getenv("METRICS_PORT")
+    if os.getenv("METRICS", "0") == "1" or port:
+        enable(True, trace_print=os.getenv("METRICS_TRACE", "0") == "1")
+    if port and _server is None:
+        serve(int(port))
@@ -1,38 +1,75 @@
-import time
-from pythonosc.udp_client import SimpleUDPClient
+import socket
+from pythonosc.osc_message_builder import OscMessageBuilder
 from typing import Iterable
+from .scheduler import SendHandle, SendScheduler, TokenBucket, PRIORITY_NORMAL
 
 def _chunk(text: str, n: int):
     for i in range(0, len(text), n):
         yield text[i:i+n]
 
+class OscUDPSender:
+    """
+    Same send_message() as pythonosc's SimpleUDPClient, without importing
+    pythonosc.udp_client (which pulls in asyncio through its dispatcher).
+    """
+    def __init__(self, host: str, port: int):
+        # like SimpleUDPClient: the first address the resolver gives (IPv4, IPv6 or a hostname)
+        family, _, _, _, self.address = socket.getaddrinfo(host, port, type=socket.SOCK_DGRAM)[0]
+        self._sock = socket.socket(family, socket.SOCK_DGRAM)
+
+    def send_message(self, address: str, value) -> None:
+        builder = OscMessageBuilder(address=address)
+        if value is None:
+            pass
+        elif not isinstance(value, Iterable) or isinstance(value, (str, bytes)):
+            builder.add_arg(value)
+        else:
+            for val in value:
+                builder.add_arg(val)
+        self._sock.sendto(builder.build().dgram, self.address)
+
 class ChatboxClient:
+    """
+    Sends to VRChat's chatbox without blocking the caller.
+    Pages (max_chars_per_msg blocks) go out through a background token bucket:
+    `burst` pages may be sent back to back, then one more every `delay` seconds.
+    """
     def __init__(self, host: str = "127.0.0.1", port: int = 9000,
                  max_len: int = 1400, max_chars_per_msg: int = 2048,
-                 delay: float = 5.0, debug: bool = False):
-        self.client = SimpleUDPClient(host, port)
+                 delay: float = 5.0, burst: int = 1, debug: bool = False):
+        self.client = OscUDPSender(host, port)
         self.max_len = max_len
         self.max_chars_per_msg = max_chars_per_msg
         self.delay = delay
         self.debug = debug
+        self.scheduler = SendScheduler(self.client, TokenBucket(burst, delay), debug=debug)
 
-    def typing(self, is_typing: bool) -> None:
-        if self.debug:
-            print(f"[osc] /chatbox/typing -> {is_typing}")
-        self.client.send_message("/chatbox/typing", is_typing)
+    def typing(self, is_typing: bool, priority: int = PRIORITY_NORMAL) -> None:
+        self.scheduler.submit_typing(is_typing, priority=priority)
 
-    def say(self, text: str, press_enter: bool = True) -> None:
+    def say(self, text: str, press_enter: bool = True,
+            priority: int = PRIORITY_NORMAL, replace: bool = False) -> SendHandle:
+        """
+        Queue `text` and return immediately with a SendHandle.
+        replace=True drops pages still queued in the same lane (e.g. an older reply).
+        """
         blocks = list(_chunk(text, self.max_chars_per_msg))
+        pages = []
         for b_idx, block in enumerate(blocks):
             is_last_block = (b_idx == len(blocks) - 1)
-            if self.debug:
-                print(f"[osc] Sending block {b_idx+1}/{len(blocks)} ({len(block)} chars)")
             chunks = list(_chunk(block, self.max_len))
-            for c_idx, chunk in enumerate(chunks):
-                is_last_chunk = (c_idx == len(chunks) - 1)
-                enter_flag = bool(press_enter and is_last_block and is_last_chunk)
-                if self.debug:
-                    print(f"[osc] /chatbox/input -> chunk {c_idx+1}/{len(chunks)} (enter={enter_flag})")
-                self.client.send_message("/chatbox/input", [chunk, enter_flag])
-            if not is_last_block:
-                time.sleep(self.delay)
+            pages.append([
+                (chunk, bool(press_enter and is_last_block and c_idx == len(chunks) - 1))
+                for c_idx, chunk in enumerate(chunks)
+            ])
+        return self.scheduler.submit_pages(SendHandle(text), pages, priority=priority, replace=replace)
+
+    def draft(self, text: str, priority: int = PRIORITY_NORMAL) -> None:
+        """Show `text` in the chatbox input without pressing enter (last max_len chars)."""
+        self.scheduler.submit_draft(text[-self.max_len:], priority=priority)
+
+    def flush(self, timeout=None) -> bool:
+        return self.scheduler.flush(timeout)
+
+    def close(self, timeout=None) -> None:
+        self.scheduler.close(timeout)
@@ -0,0 +1,283 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, InvalidStateError
+import metrics
+
+# Priority lanes: lower number is dispatched first.
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+
+class TokenBucket:
+    """
+    Token bucket for VRChat's chatbox rate limit.
+    Holds up to `capacity` tokens and regains one every `refill_interval` seconds.
+    """
+    def __init__(self, capacity: float = 1.0, refill_interval: float = 5.0, clock=time.monotonic):
+        self.capacity = float(capacity)
+        self.refill_interval = float(refill_interval)
+        self.tokens = float(capacity)
+        self._clock = clock
+        self._stamp = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        if self.refill_interval <= 0:
+            self.tokens = self.capacity
+        else:
+            self.tokens = min(self.capacity, self.tokens + (now - self._stamp) / self.refill_interval)
+        self._stamp = now
+
+    def wait_time(self) -> float:
+        """Seconds until a token is available (0.0 if one is available now)."""
+        self._refill()
+        if self.tokens >= 1.0:
+            return 0.0
+        return (1.0 - self.tokens) * self.refill_interval
+
+    def consume(self) -> None:
+        self._refill()
+        self.tokens -= 1.0
+
+
+class SendHandle(Future):
+    """
+    Returned by ChatboxClient.say(). Resolves to the number of pages sent.
+    Call wait() to block, `await handle` from asyncio, or cancel() to drop unsent pages.
+    """
+    def __init__(self, text: str = ""):
+        super().__init__()
+        self.text = text
+        self.pages_total = 0
+        self.pages_sent = 0
+        self.created = time.perf_counter()
+
+    def wait(self, timeout=None) -> int:
+        return self.result(timeout)
+
+    def __await__(self):
+        import asyncio   # only needed by asyncio callers; keeps send_chatbox.py startup small
+        return asyncio.wrap_future(self).__await__()
+
+
+class _Page:
+    __slots__ = ("handle", "index", "chunks")
+
+    def __init__(self, handle: SendHandle, index: int, chunks):
+        self.handle = handle
+        self.index = index
+        self.chunks = chunks   # list of (text, enter_flag)
+
+
+class _Typing:
+    __slots__ = ("state",)
+
+    def __init__(self, state: bool):
+        self.state = state
+
+
+class _Draft:
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class SendScheduler:
+    """
+    Background sender for one OSC client.
+    - one deque per priority lane, FIFO within a lane
+    - each page (one 2048-char block) costs one token; typing toggles and drafts are free
+    - consecutive queued typing toggles (or drafts) collapse to the last one, and
+      toggles that would not change the indicator are not sent
+    """
+    def __init__(self, client, bucket: TokenBucket, debug: bool = False):
+        self.client = client
+        self.bucket = bucket
+        self.debug = debug
+        self._lanes = {PRIORITY_HIGH: deque(), PRIORITY_NORMAL: deque(), PRIORITY_LOW: deque()}
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self._busy = False
+        self._typing_sent = None
+
+    # ------------------------
+    # Producer side
+    # ------------------------
+    def submit_pages(self, handle: SendHandle, pages, priority: int = PRIORITY_NORMAL, replace: bool = False) -> SendHandle:
+        with self._cond:
+            lane = self._lane(priority)
+            if replace:
+                self._drop_pages(lane)
+            handle.pages_total = len(pages)
+            if not pages:
+                handle.set_result(0)
+                return handle
+            for idx, chunks in enumerate(pages):
+                lane.append(_Page(handle, idx, chunks))
+            self._wake()
+        return handle
+
+    def submit_typing(self, is_typing: bool, priority: int = PRIORITY_NORMAL) -> None:
+        with self._cond:
+            lane = self._lane(priority)
+            if lane and isinstance(lane[-1], _Typing):
+                lane[-1].state = is_typing
+            else:
+                lane.append(_Typing(is_typing))
+            self._wake()
+
+    def submit_draft(self, text: str, priority: int = PRIORITY_NORMAL) -> None:
+        """Queue an un-entered /chatbox/input update; a newer draft overwrites a queued one."""
+        with self._cond:
+            lane = self._lane(priority)
+            if lane and isinstance(lane[-1], _Draft):
+                lane[-1].text = text
+            else:
+                lane.append(_Draft(text))
+            self._wake()
+
+    def pending(self) -> int:
+        with self._cond:
+            return sum(len(lane) for lane in self._lanes.values())
+
+    def flush(self, timeout=None) -> bool:
+        """Block until everything queued so far has been sent. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._busy or any(self._lanes.values()):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout=None) -> None:
+        self.flush(timeout)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    # ------------------------
+    # Dispatcher
+    # ------------------------
+    def _lane(self, priority: int) -> deque:
+        if priority not in self._lanes:
+            raise ValueError(f"Unknown priority lane: {priority}")
+        return self._lanes[priority]
+
+    def _drop_pages(self, lane: deque) -> None:
+        stale = [i for i in lane if isinstance(i, _Page)]
+        for item in stale:
+            lane.remove(item)
+            item.handle.cancel()
+            if self.debug:
+                print(f"[osc] Dropping queued page {item.index+1}/{item.handle.pages_total} (replaced)")
+
+    def _wake(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="chatbox-sender", daemon=True)
+            self._thread.start()
+        self._cond.notify_all()
+
+    def _next_item(self):
+        """Pop the next sendable item, waiting on the bucket if needed. None means stop."""
+        with self._cond:
+            while True:
+                self._busy = False
+                lane = next((l for _, l in sorted(self._lanes.items()) if l), None)
+                if lane is None:
+                    self._cond.notify_all()
+                    if self._stopping:
+                        return None
+                    self._cond.wait()
+                    continue
+                item = lane[0]
+                if isinstance(item, _Page):
+                    if item.handle.done():   # cancelled, or an earlier page failed
+                        lane.popleft()
+                        continue
+                    wait = self.bucket.wait_time()
+                    if wait > 0:
+                        self._cond.wait(wait)
+                        continue
+                    self.bucket.consume()
+                lane.popleft()
+                self._busy = True
+                return item
+
+    def _run(self) -> None:
+        while True:
+            item = self._next_item()
+            if item is None:
+                return
+            try:
+                if isinstance(item, _Typing):
+                    self._send_typing(item.state)
+                elif isinstance(item, _Draft):
+                    self._send_draft(item.text)
+                else:
+                    self._send_page(item)
+            except Exception as e:
+                print(f"[osc] sender error: {e}")
+            finally:
+                # flush()/close() wait on _busy; never leave it set
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def _send_typing(self, state: bool) -> None:
+        if state == self._typing_sent:
+            return
+        if self.debug:
+            print(f"[osc] /chatbox/typing -> {state}")
+        try:
+            self.client.send_message("/chatbox/typing", state)
+            self._typing_sent = state
+        except Exception as e:
+            print(f"[osc] typing send failed: {e}")
+
+    def _send_draft(self, text: str) -> None:
+        if self.debug:
+            print(f"[osc] /chatbox/input -> draft ({len(text)} chars, enter=False)")
+        try:
+            self.client.send_message("/chatbox/input", [text, False])
+        except Exception as e:
+            print(f"[osc] draft send failed: {e}")
+
+    def _send_page(self, page: _Page) -> None:
+        handle = page.handle
+        if self.debug:
+            print(f"[osc] Sending block {page.index+1}/{handle.pages_total}")
+        try:
+            for c_idx, (chunk, enter_flag) in enumerate(page.chunks):
+                if self.debug:
+                    print(f"[osc] /chatbox/input -> chunk {c_idx+1}/{len(page.chunks)} (enter={enter_flag})")
+                self.client.send_message("/chatbox/input", [chunk, enter_flag])
+        except Exception as e:
+            # e.g. OSError, or python-osc's BuildError on text it cannot encode
+            self._resolve(handle, error=e)
+            return
+        with self._cond:
+            handle.pages_sent += 1
+            last = page.index == handle.pages_total - 1
+        if last and self._resolve(handle, result=handle.pages_sent):
+            metrics.observe("chatbox_say_seconds", time.perf_counter() - handle.created, pages=handle.pages_total)
+
+    @staticmethod
+    def _resolve(handle: SendHandle, result=None, error: Exception = None) -> bool:
+        """Set the handle's outcome; False if it was already done (e.g. cancel() from the caller's thread)."""
+        try:
+            if error is not None:
+                handle.set_exception(error)
+            else:
+                handle.set_result(result)
+            return True
+        except InvalidStateError:
+            return False
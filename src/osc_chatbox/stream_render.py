@@ -0,0 +1,41 @@
+import time
+from .osc_io import ChatboxClient
+from .scheduler import SendHandle, PRIORITY_NORMAL
+
+
+class ChatboxStreamRenderer:
+    """
+    Renders a growing reply into the chatbox while the LLM is still generating.
+    update() pushes the text so far as an un-entered draft, at most once every
+    `min_interval` seconds; commit() sends the final text with enter.
+    """
+    def __init__(self, osc: ChatboxClient, min_interval: float = 0.4,
+                 priority: int = PRIORITY_NORMAL, clock=time.monotonic):
+        self.osc = osc
+        self.min_interval = min_interval
+        self.priority = priority
+        self._clock = clock
+        self._last_push = None
+        self._last_text = ""
+        self._pending = ""
+        self.first_text_at = None
+
+    def update(self, text: str) -> None:
+        if not text or text == self._last_text:
+            return
+        self._pending = text
+        now = self._clock()
+        if self._last_push is not None and now - self._last_push < self.min_interval:
+            return
+        if self.first_text_at is None:
+            self.first_text_at = now
+        self._push(now)
+
+    def _push(self, now: float) -> None:
+        self.osc.draft(self._pending, priority=self.priority)
+        self._last_text = self._pending
+        self._last_push = now
+
+    def commit(self, text: str, press_enter: bool = True) -> SendHandle:
+        self._pending = ""
+        return self.osc.say(text, press_enter=press_enter, priority=self.priority, replace=True)